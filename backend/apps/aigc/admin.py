@@ -5,28 +5,37 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import AIGCGenerationTask, AIGCContent
+from .models import AIGCGenerationTask, AIGCContent, AIGCBatchJob, AIGCCampaign, PRIORITY_INTERACTIVE
 
 
 @admin.register(AIGCGenerationTask)
 class AIGCGenerationTaskAdmin(admin.ModelAdmin):
     """AIGC生成任务管理"""
     list_display = (
-        'task_id', 'task_type', 'song_link', 'operator', 'status', 
-        'contents_count', 'created_at', 'completed_at'
+        'task_id', 'task_type', 'song_link', 'operator', 'status', 'priority',
+        'coalesced_with', 'contents_count', 'created_at', 'completed_at'
+    )
+    list_filter = (
+        'task_type', 'status', 'priority', ('coalesced_with', admin.EmptyFieldListFilter),
+        ('batch_job', admin.EmptyFieldListFilter), 'campaign', 'created_at'
     )
-    list_filter = ('task_type', 'status', 'created_at')
     search_fields = ('song__title', 'song__artist', 'operator__phone')
     readonly_fields = (
-        'task_id', 'status', 'error_message', 
-        'created_at', 'completed_at', 'contents_display', 'parameters_example'
+        'task_id', 'status', 'priority', 'error_message', 
+        'created_at', 'completed_at', 'remote_task_id', 'remote_submitted_at',
+        'checkpoints', 'coalesced_with', 'batch_job', 'campaign', 'contents_display', 'parameters_example'
     )
     fieldsets = (
         ('基本信息', {
             'fields': ('task_id', 'task_type', 'song', 'operator')
         }),
         ('任务状态', {
-            'fields': ('status', 'error_message', 'created_at', 'completed_at')
+            'fields': ('status', 'priority', 'error_message', 'created_at', 'completed_at',
+                       'remote_task_id', 'remote_submitted_at', 'coalesced_with', 'batch_job', 'campaign')
+        }),
+        ('阶段检查点', {
+            'fields': ('checkpoints',),
+            'classes': ('collapse',)
         }),
         ('生成参数', {
             'fields': ('parameters_example', 'parameters'),
@@ -35,6 +44,8 @@ class AIGCGenerationTaskAdmin(admin.ModelAdmin):
                           '<code>{"style": "beautiful", "count": 2, "lyrics_section": "chorus"}</code><br><br>'
                           '<strong>评论摘要 (comment_summary):</strong><br>'
                           '<code>{"comment_range": "hot", "summary_style": "objective"}</code><br><br>'
+                          '<strong>生成结果缓存:</strong> 配图和摘要默认复用相同请求的结果，'
+                          '需要重新生成时加上 <code>"use_cache": false</code><br><br>'
                               '<strong>歌词视频 (lyric_video):</strong><br>'
                               '<code>{"style": "beautiful", "duration": 5, "resolution": "720p", "use_existing_image": true}</code><br><br>'
                               '<strong>文生视频 (text_to_video):</strong><br>'
@@ -79,13 +90,13 @@ class AIGCGenerationTaskAdmin(admin.ModelAdmin):
                 "count": 2,
                 "lyrics_section": "chorus"
             }
-            description = '<p><strong>歌词配图参数说明：</strong></p><ul><li>style: 图片风格（beautiful/abstract/realistic/minimalist/artistic）</li><li>count: 生成数量（1-3）</li><li>lyrics_section: 歌词段落（chorus/verse/all）</li></ul>'
+            description = '<p><strong>歌词配图参数说明：</strong></p><ul><li>style: 图片风格（beautiful/abstract/realistic/minimalist/artistic）</li><li>count: 生成数量（1-3）</li><li>lyrics_section: 歌词段落（chorus/verse/all）</li><li>use_cache: 是否复用相同请求的生成结果（默认true）</li></ul>'
         elif task_type == 'comment_summary':
             example = {
                 "comment_range": "hot",
                 "summary_style": "objective"
             }
-            description = '<p><strong>评论摘要参数说明：</strong></p><ul><li>comment_range: 评论范围（all/hot/latest）</li><li>summary_style: 摘要风格（objective/subjective/emotional）</li></ul>'
+            description = '<p><strong>评论摘要参数说明：</strong></p><ul><li>comment_range: 评论范围（all/hot/latest）</li><li>summary_style: 摘要风格（objective/subjective/emotional）</li><li>use_cache: 是否复用相同请求的生成结果（默认true）</li></ul>'
         elif task_type == 'lyric_video':
             example = {
                 "style": "beautiful",
@@ -93,7 +104,7 @@ class AIGCGenerationTaskAdmin(admin.ModelAdmin):
                 "resolution": "720p",
                 "use_existing_image": True
             }
-            description = '<p><strong>歌词视频参数说明：</strong></p><ul><li>style: 视频风格（beautiful/abstract/realistic/minimalist/artistic）</li><li>duration: 视频时长（秒，5-10）</li><li>resolution: 分辨率（480p/720p/1080p）</li><li>use_existing_image: 是否使用已有配图（true/false）</li></ul>'
+            description = '<p><strong>歌词视频参数说明：</strong></p><ul><li>style: 视频风格（beautiful/abstract/realistic/minimalist/artistic）</li><li>duration: 视频时长（秒，5-10）</li><li>resolution: 分辨率（480p/720p/1080p）</li><li>use_existing_image: 是否优先使用已发布/缓存的配图作为首帧（true/false，false时生成新配图）</li></ul>'
         elif task_type == 'text_to_video':
             example = {
                 "style": "beautiful",
@@ -101,7 +112,7 @@ class AIGCGenerationTaskAdmin(admin.ModelAdmin):
                 "resolution": "720p",
                 "mood": "治愈"
             }
-            description = '<p><strong>文生视频参数说明：</strong></p><ul><li>style: 视频风格（beautiful/abstract/realistic/minimalist/artistic）</li><li>duration: 视频时长（秒，5-10）</li><li>resolution: 分辨率（480p/720p/1080p）</li><li>mood: 视频氛围（治愈/激情/浪漫/宁静等）</li></ul>'
+            description = '<p><strong>文生视频参数说明：</strong></p><ul><li>style: 视频风格（beautiful/abstract/realistic/minimalist/artistic）</li><li>duration: 视频时长（秒，5-10）</li><li>resolution: 分辨率（480p/720p/1080p）</li><li>mood: 视频氛围（治愈/激情/浪漫/宁静等）</li><li>use_existing_image: 是否优先使用已发布/缓存的配图作为首帧（默认true）</li></ul>'
         else:
             # 默认显示两个示例
             example = {
@@ -181,14 +192,18 @@ class AIGCGenerationTaskAdmin(admin.ModelAdmin):
         """
         保存模型时自动触发Celery任务
         """
+        # 管理后台新建的任务为交互优先级，排在批量任务之前
+        if not change:
+            obj.priority = PRIORITY_INTERACTIVE
+        
         # 保存任务
         super().save_model(request, obj, form, change)
         
         # 如果是新建任务（不是修改），且状态为pending，则触发Celery任务
         if not change and obj.status == 'pending':
             try:
-                from .tasks import generate_aigc_content
-                generate_aigc_content.delay(obj.task_id)
+                from .tasks import enqueue_generation
+                enqueue_generation(obj)
                 self.message_user(
                     request,
                     f'任务已创建并已加入处理队列（任务ID: {obj.task_id}）',
@@ -205,6 +220,116 @@ class AIGCGenerationTaskAdmin(admin.ModelAdmin):
                 )
 
 
+@admin.register(AIGCBatchJob)
+class AIGCBatchJobAdmin(admin.ModelAdmin):
+    """AIGC批量推理作业管理（通过 submit_comment_summary_batch 命令创建）"""
+    list_display = (
+        'job_id', 'task_type', 'status', 'request_count', 'succeeded_count',
+        'failed_count', 'remote_batch_id', 'submitted_at', 'completed_at'
+    )
+    list_filter = ('task_type', 'status', 'created_at')
+    search_fields = ('remote_batch_id',)
+    readonly_fields = (
+        'job_id', 'task_type', 'operator', 'status', 'parameters', 'remote_batch_id',
+        'input_file_id', 'output_file_id', 'error_file_id', 'request_count',
+        'succeeded_count', 'failed_count', 'error_message', 'created_at',
+        'submitted_at', 'completed_at'
+    )
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(AIGCCampaign)
+class AIGCCampaignAdmin(admin.ModelAdmin):
+    """AIGC批量生成活动管理（保存新活动时按筛选条件创建子任务并开始投递）"""
+    list_display = (
+        'campaign_id', 'name', 'task_type', 'status', 'total_tasks',
+        'rate_per_minute', 'progress_summary', 'operator', 'created_at'
+    )
+    list_filter = ('task_type', 'status', 'created_at')
+    search_fields = ('name',)
+    actions = ['pause_selected', 'resume_selected', 'cancel_selected']
+    
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return ('progress_display',)
+        return (
+            'campaign_id', 'name', 'task_type', 'parameters', 'song_filter', 'operator',
+            'status', 'rate_per_minute', 'total_tasks', 'last_dispatched_task_id',
+            'next_dispatch_at', 'created_at', 'dispatched_at', 'progress_display'
+        )
+    
+    def get_fields(self, request, obj=None):
+        if obj is None:
+            return ('name', 'task_type', 'parameters', 'song_filter', 'rate_per_minute')
+        return super().get_fields(request, obj)
+    
+    def progress_summary(self, obj):
+        """进度概要（列表页）"""
+        progress = obj.progress()
+        return f"{progress['finished']}/{progress['total']}（失败 {progress['failed']}）"
+    progress_summary.short_description = '进度'
+    
+    def progress_display(self, obj):
+        """进度详情"""
+        if obj is None or obj.pk is None:
+            return '-'
+        progress = obj.progress()
+        eta = f"{progress['eta_seconds'] // 60} 分钟" if progress['eta_seconds'] is not None else '-'
+        return format_html(
+            '完成 {} / {}（{}%），失败 {}，执行中 {}，已投递 {}，预计剩余 {}',
+            progress['completed'], progress['total'], progress['percent'], progress['failed'],
+            progress['processing'], progress['dispatched'], eta
+        )
+    progress_display.short_description = '进度'
+    
+    def save_model(self, request, obj, form, change):
+        """新建活动时创建子任务并开始投递"""
+        if change:
+            super().save_model(request, obj, form, change)
+            return
+        from .services.campaigns import create_campaign
+        create_campaign(
+            name=obj.name,
+            task_type=obj.task_type,
+            parameters=obj.parameters,
+            song_filter=obj.song_filter,
+            operator=request.user,
+            rate_per_minute=obj.rate_per_minute,
+            campaign=obj
+        )
+        self.message_user(request, f'活动已创建，共 {obj.total_tasks} 首歌曲，按每分钟 {obj.rate_per_minute} 个任务投递')
+    
+    def pause_selected(self, request, queryset):
+        """暂停投递"""
+        count = queryset.filter(status='running').update(status='paused')
+        self.message_user(request, f'已暂停 {count} 个活动')
+    pause_selected.short_description = '暂停选中的活动'
+    
+    def resume_selected(self, request, queryset):
+        """恢复投递"""
+        from .services.campaigns import start_dispatch
+        count = 0
+        for campaign in queryset.filter(status='paused'):
+            campaign.status = 'running'
+            campaign.save(update_fields=['status'])
+            start_dispatch(campaign)
+            count += 1
+        self.message_user(request, f'已恢复 {count} 个活动')
+    resume_selected.short_description = '恢复选中的活动'
+    
+    def cancel_selected(self, request, queryset):
+        """取消活动（未投递的任务不再执行）"""
+        from .services.campaigns import cancel_campaign
+        count = 0
+        for campaign in queryset.filter(status__in=('running', 'paused')):
+            cancel_campaign(campaign)
+            count += 1
+        self.message_user(request, f'已取消 {count} 个活动')
+    cancel_selected.short_description = '取消选中的活动'
+
+
 @admin.register(AIGCContent)
 class AIGCContentAdmin(admin.ModelAdmin):
     """AIGC内容管理"""
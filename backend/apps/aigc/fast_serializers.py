@@ -0,0 +1,63 @@
+"""
+AIGC快速序列化器（用于热点列表接口）
+"""
+from utils.fast_serializer import FastField, FastSerializer, format_datetime
+from utils.storage.oss_storage import image_storage, video_storage
+
+
+class AIGCContentFastSerializer(FastSerializer):
+    """AIGC内容快速序列化器（输出与 AIGCContentSerializer 一致）"""
+    fields = {
+        'content_id': FastField('content_id'),
+        'content_type': FastField('content_type'),
+        'display_url': FastField(
+            method='get_display_url',
+            columns=('content_id', 'content_type', 'content_url', 'content_file', 'content_video_file')
+        ),
+        'content_text': FastField('content_text'),
+        'metadata': FastField('metadata'),
+        'status': FastField('status'),
+        'published_at': FastField(method='get_published_at', columns=('published_at',)),
+        'usage_count': FastField('usage_count'),
+        'task_type': FastField('task__task_type'),
+        'song_id': FastField('task__song_id'),
+        'song_title': FastField('task__song__title'),
+        'song_artist': FastField('task__song__artist'),
+        'created_at': FastField(method='get_created_at', columns=('created_at',)),
+        'updated_at': FastField(method='get_updated_at', columns=('updated_at',)),
+    }
+
+    def get_display_url(self, row):
+        """
+        获取内容显示URL（规则同 AIGCContent.display_url）
+
+        context中stable_urls为True时（静态快照），已存入OSS的图片/视频返回固定的代理地址，不生成签名URL
+        """
+        content_type = row['content_type']
+        stored = (content_type == 'video' and row['content_video_file']) or \
+            (content_type == 'image' and row['content_file'])
+        if stored and self.context.get('stable_urls'):
+            return f'/api/aigc/contents/{row["content_id"]}/media/'
+
+        if content_type == 'video' and row['content_video_file']:
+            try:
+                return video_storage.url(row['content_video_file'])
+            except Exception:
+                return row['content_url'] or ''
+
+        if content_type == 'image' and row['content_file']:
+            try:
+                return image_storage.url(row['content_file'])
+            except Exception:
+                return row['content_url'] or ''
+
+        return row['content_url'] or ''
+
+    def get_published_at(self, row):
+        return format_datetime(row['published_at'])
+
+    def get_created_at(self, row):
+        return format_datetime(row['created_at'])
+
+    def get_updated_at(self, row):
+        return format_datetime(row['updated_at'])
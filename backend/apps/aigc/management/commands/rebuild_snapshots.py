@@ -0,0 +1,50 @@
+"""
+重建歌曲静态快照
+
+用法：
+    python manage.py rebuild_snapshots                 # 异步重建所有激活歌曲
+    python manage.py rebuild_snapshots --sync          # 在当前进程同步重建
+    python manage.py rebuild_snapshots --song-id 1 2   # 仅重建指定歌曲
+    python manage.py rebuild_snapshots --only aigc     # 仅重建指定类型快照
+"""
+from django.core.management.base import BaseCommand
+from apps.songs.models import Song
+from apps.aigc.services.snapshot_publisher import SNAPSHOT_BUILDERS, snapshot_publisher
+
+
+class Command(BaseCommand):
+    help = '重建歌曲静态JSON快照（歌曲详情、AIGC内容、精彩评论）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--song-id', type=int, nargs='+', help='仅重建指定歌曲ID')
+        parser.add_argument(
+            '--only', nargs='+', choices=list(SNAPSHOT_BUILDERS.keys()),
+            help='仅重建指定类型的快照'
+        )
+        parser.add_argument('--sync', action='store_true', help='在当前进程同步执行，不投递Celery任务')
+
+    def handle(self, *args, **options):
+        songs = Song.objects.filter(is_active=True).order_by('song_id')
+        if options['song_id']:
+            songs = songs.filter(song_id__in=options['song_id'])
+
+        names = options['only']
+        total = 0
+        failed = 0
+
+        for song in songs.iterator():
+            total += 1
+            if options['sync']:
+                try:
+                    snapshot_publisher.publish_song(song, names)
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'歌曲 {song.song_id} 快照发布失败: {str(e)}')
+            else:
+                from apps.aigc.tasks import publish_song_snapshots
+                publish_song_snapshots.delay(song.song_id, names)
+
+        if options['sync']:
+            self.stdout.write(self.style.SUCCESS(f'快照重建完成: 共 {total} 首，失败 {failed} 首'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'已投递 {total} 个快照发布任务'))
@@ -0,0 +1,88 @@
+"""
+批量生成评论摘要（DashScope批量推理）
+
+为有评论的歌曲创建评论摘要任务，写入批量推理作业提交，结果在作业完成后批量入库（待审核）。
+适合大批量回填，不占用实时接口配额；单首歌曲仍使用实时任务。
+
+用法：
+    python manage.py submit_comment_summary_batch                      # 所有有评论的激活歌曲
+    python manage.py submit_comment_summary_batch --song-id 1 2        # 仅指定歌曲
+    python manage.py submit_comment_summary_batch --min-comments 20    # 仅评论数不少于20条的歌曲
+    python manage.py submit_comment_summary_batch --comment-range latest --no-cache
+    python manage.py submit_comment_summary_batch --dry-run            # 只统计，不创建作业
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from apps.songs.models import Song
+from apps.aigc.models import AIGCBatchJob, AIGCGenerationTask, PRIORITY_BULK
+from utils.task_queues import QUEUE_TEXT, queue_options
+
+
+class Command(BaseCommand):
+    help = '通过批量推理作业为多首歌曲生成评论摘要'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--song-id', type=int, nargs='+', help='仅处理指定歌曲ID')
+        parser.add_argument(
+            '--comment-range', choices=['hot', 'latest', 'all'], default='hot',
+            help='摘要使用的评论范围（默认hot）'
+        )
+        parser.add_argument('--min-comments', type=int, default=1, help='歌曲的最少评论数（默认1）')
+        parser.add_argument('--limit', type=int, help='最多处理的歌曲数量')
+        parser.add_argument('--no-cache', action='store_true', help='不复用生成结果缓存')
+        parser.add_argument('--dry-run', action='store_true', help='只统计符合条件的歌曲，不创建作业')
+
+    def handle(self, *args, **options):
+        songs = Song.objects.filter(is_active=True).annotate(
+            comment_total=Count('comment', filter=Q(comment__is_active=True, comment__parent=None))
+        ).filter(comment_total__gte=max(options['min_comments'], 1)).order_by('song_id')
+        if options['song_id']:
+            songs = songs.filter(song_id__in=options['song_id'])
+        song_ids = list(songs.values_list('song_id', flat=True))
+        if options['limit']:
+            song_ids = song_ids[:options['limit']]
+
+        if options['dry_run']:
+            self.stdout.write(f'符合条件的歌曲: {len(song_ids)} 首')
+            return
+        if not song_ids:
+            self.stdout.write('没有符合条件的歌曲')
+            return
+
+        parameters = {'comment_range': options['comment_range']}
+        if options['no_cache']:
+            parameters['use_cache'] = False
+
+        from apps.aigc.tasks import submit_batch_job
+
+        chunk_size = settings.AIGC_BATCH_MAX_REQUESTS
+        job_ids = []
+        for start in range(0, len(song_ids), chunk_size):
+            chunk = song_ids[start:start + chunk_size]
+            with transaction.atomic():
+                job = AIGCBatchJob.objects.create(
+                    task_type='comment_summary',
+                    parameters=parameters,
+                    request_count=len(chunk)
+                )
+                AIGCGenerationTask.objects.bulk_create(
+                    [
+                        AIGCGenerationTask(
+                            task_type='comment_summary',
+                            song_id=song_id,
+                            parameters=parameters,
+                            priority=PRIORITY_BULK,
+                            batch_job=job
+                        )
+                        for song_id in chunk
+                    ],
+                    batch_size=1000
+                )
+            submit_batch_job.apply_async(args=[job.job_id], **queue_options(QUEUE_TEXT))
+            job_ids.append(job.job_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'已创建 {len(job_ids)} 个批量推理作业（{len(song_ids)} 首歌曲）: {", ".join(map(str, job_ids))}'
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aigc', '0003_alter_aigcgenerationtask_task_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aigcgenerationtask',
+            name='remote_task_id',
+            field=models.CharField(blank=True, db_index=True, help_text='DashScope异步任务ID（视频生成），由轮询任务查询结果', max_length=100, null=True, verbose_name='远程任务ID'),
+        ),
+        migrations.AddField(
+            model_name='aigcgenerationtask',
+            name='remote_submitted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='远程任务提交时间'),
+        ),
+    ]
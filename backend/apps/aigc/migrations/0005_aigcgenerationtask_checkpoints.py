@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aigc', '0004_aigcgenerationtask_remote_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aigcgenerationtask',
+            name='checkpoints',
+            field=models.JSONField(blank=True, default=dict, help_text='已完成阶段的结果（如已生成的图片、DashScope文件、远程任务ID、已转存的产物），重试时从最后完成的阶段继续', verbose_name='阶段检查点'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aigc', '0005_aigcgenerationtask_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aigcgenerationtask',
+            name='coalesced_with',
+            field=models.ForeignKey(blank=True, help_text='与正在执行的相同任务合并时，指向该任务，结束后复用其结果', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='followers', to='aigc.aigcgenerationtask', verbose_name='合并到任务'),
+        ),
+    ]
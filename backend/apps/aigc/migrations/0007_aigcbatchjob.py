@@ -0,0 +1,48 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aigc', '0006_aigcgenerationtask_coalesced_with'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIGCBatchJob',
+            fields=[
+                ('job_id', models.AutoField(primary_key=True, serialize=False, verbose_name='作业ID')),
+                ('task_type', models.CharField(choices=[('lyric_image', '歌词配图'), ('comment_summary', '评论摘要'), ('lyric_video', '歌词视频'), ('text_to_video', '文生视频')], default='comment_summary', max_length=50, verbose_name='任务类型')),
+                ('status', models.CharField(choices=[('pending', '待提交'), ('in_progress', '执行中'), ('completed', '已完成'), ('failed', '失败'), ('expired', '已过期'), ('cancelled', '已取消')], db_index=True, default='pending', max_length=20, verbose_name='作业状态')),
+                ('parameters', models.JSONField(default=dict, help_text='作业内所有任务共用的参数，如评论范围', verbose_name='生成参数')),
+                ('remote_batch_id', models.CharField(blank=True, db_index=True, max_length=100, null=True, verbose_name='远程作业ID')),
+                ('input_file_id', models.CharField(blank=True, max_length=100, null=True, verbose_name='输入文件ID')),
+                ('output_file_id', models.CharField(blank=True, max_length=100, null=True, verbose_name='结果文件ID')),
+                ('error_file_id', models.CharField(blank=True, max_length=100, null=True, verbose_name='错误文件ID')),
+                ('request_count', models.IntegerField(default=0, verbose_name='请求数')),
+                ('succeeded_count', models.IntegerField(default=0, verbose_name='成功数')),
+                ('failed_count', models.IntegerField(default=0, verbose_name='失败数')),
+                ('error_message', models.TextField(blank=True, null=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='创建时间')),
+                ('submitted_at', models.DateTimeField(blank=True, null=True, verbose_name='提交时间')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('operator', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='aigc_batch_jobs', to=settings.AUTH_USER_MODEL, verbose_name='操作人员')),
+            ],
+            options={
+                'verbose_name': 'AIGC批量推理作业',
+                'verbose_name_plural': 'AIGC批量推理作业',
+                'db_table': 'aigc_batch_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='aigcgenerationtask',
+            name='batch_job',
+            field=models.ForeignKey(blank=True, help_text='通过批量推理作业生成时，指向该作业', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='aigc.aigcbatchjob', verbose_name='批量推理作业'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aigc', '0007_aigcbatchjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIGCCampaign',
+            fields=[
+                ('campaign_id', models.AutoField(primary_key=True, serialize=False, verbose_name='活动ID')),
+                ('name', models.CharField(max_length=100, verbose_name='活动名称')),
+                ('task_type', models.CharField(choices=[('lyric_image', '歌词配图'), ('comment_summary', '评论摘要'), ('lyric_video', '歌词视频'), ('text_to_video', '文生视频')], max_length=50, verbose_name='任务类型')),
+                ('parameters', models.JSONField(blank=True, default=dict, help_text='所有子任务共用的生成参数，格式与单个任务相同', verbose_name='生成参数')),
+                ('song_filter', models.JSONField(blank=True, default=dict, help_text='如 {"genre": ["pop", "rock"], "without_published_image": true, "min_play_count": 100, "limit": 5000}，也可以用 song_ids 指定歌曲', verbose_name='歌曲筛选条件')),
+                ('status', models.CharField(choices=[('running', '分发中'), ('paused', '已暂停'), ('dispatched', '已全部分发'), ('cancelled', '已取消')], db_index=True, default='running', max_length=20, verbose_name='活动状态')),
+                ('rate_per_minute', models.IntegerField(default=10, verbose_name='每分钟投递任务数')),
+                ('total_tasks', models.IntegerField(default=0, verbose_name='子任务数')),
+                ('last_dispatched_task_id', models.IntegerField(default=0, help_text='子任务按任务ID顺序投递，不大于该ID的任务已投递', verbose_name='已投递到的任务ID')),
+                ('next_dispatch_at', models.DateTimeField(blank=True, null=True, verbose_name='下次投递时间')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='创建时间')),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True, verbose_name='全部分发时间')),
+                ('operator', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='aigc_campaigns', to=settings.AUTH_USER_MODEL, verbose_name='操作人员')),
+            ],
+            options={
+                'verbose_name': 'AIGC批量生成活动',
+                'verbose_name_plural': 'AIGC批量生成活动',
+                'db_table': 'aigc_campaigns',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='aigcgenerationtask',
+            name='campaign',
+            field=models.ForeignKey(blank=True, help_text='由批量生成活动创建时，指向该活动', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='aigc.aigccampaign', verbose_name='批量生成活动'),
+        ),
+        migrations.AddIndex(
+            model_name='aigcgenerationtask',
+            index=models.Index(fields=['campaign', 'status'], name='aigc_genera_campaig_44f770_idx'),
+        ),
+    ]
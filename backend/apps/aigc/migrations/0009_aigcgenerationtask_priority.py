@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aigc', '0008_aigccampaign'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aigcgenerationtask',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, '交互（运营手动创建）'), (5, '普通'), (9, '批量（活动、回填、自动刷新）')], db_index=True, default=5, help_text='交互任务优先执行；批量任务进入单独的批量队列，由批量worker保证最低处理能力', verbose_name='优先级'),
+        ),
+    ]
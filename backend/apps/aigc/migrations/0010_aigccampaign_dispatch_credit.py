@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aigc', '0009_aigcgenerationtask_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aigccampaign',
+            name='dispatch_credit',
+            field=models.FloatField(default=0, help_text='每次投递按限速累计可投递数，不足1个的部分留到下次，保证不超过每分钟投递数', verbose_name='投递余量'),
+        ),
+    ]
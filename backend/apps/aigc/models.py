@@ -2,6 +2,7 @@
 AIGC内容生成模型
 """
 from django.db import models
+from django.db.models import Count, F, Q
 from django.utils import timezone
 from apps.users.models import User
 from apps.songs.models import Song
@@ -24,6 +25,16 @@ TASK_STATUS_CHOICES = [
     ('failed', '失败'),
 ]
 
+# 任务优先级（数值越小越先执行，与Celery Redis消息优先级一致）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BULK = 9
+TASK_PRIORITY_CHOICES = [
+    (PRIORITY_INTERACTIVE, '交互（运营手动创建）'),
+    (PRIORITY_NORMAL, '普通'),
+    (PRIORITY_BULK, '批量（活动、回填、自动刷新）'),
+]
+
 # 内容状态
 CONTENT_STATUS_CHOICES = [
     ('pending_review', '待审核'),
@@ -48,6 +59,24 @@ SUMMARY_STYLE_CHOICES = [
     ('emotional', '情感分析'),
 ]
 
+# 批量推理作业状态
+BATCH_STATUS_CHOICES = [
+    ('pending', '待提交'),
+    ('in_progress', '执行中'),
+    ('completed', '已完成'),
+    ('failed', '失败'),
+    ('expired', '已过期'),
+    ('cancelled', '已取消'),
+]
+
+# 批量生成活动状态
+CAMPAIGN_STATUS_CHOICES = [
+    ('running', '分发中'),
+    ('paused', '已暂停'),
+    ('dispatched', '已全部分发'),
+    ('cancelled', '已取消'),
+]
+
 
 class AIGCGenerationTask(models.Model):
     """AIGC生成任务模型"""
@@ -79,6 +108,13 @@ class AIGCGenerationTask(models.Model):
         verbose_name='任务状态',
         db_index=True
     )
+    priority = models.PositiveSmallIntegerField(
+        choices=TASK_PRIORITY_CHOICES,
+        default=PRIORITY_NORMAL,
+        verbose_name='优先级',
+        help_text='交互任务优先执行；批量任务进入单独的批量队列，由批量worker保证最低处理能力',
+        db_index=True
+    )
     parameters = models.JSONField(
         default=dict,
         verbose_name='生成参数',
@@ -99,6 +135,52 @@ class AIGCGenerationTask(models.Model):
         blank=True,
         verbose_name='完成时间'
     )
+    remote_task_id = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        verbose_name='远程任务ID',
+        help_text='DashScope异步任务ID（视频生成），由轮询任务查询结果',
+        db_index=True
+    )
+    remote_submitted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='远程任务提交时间'
+    )
+    coalesced_with = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='followers',
+        verbose_name='合并到任务',
+        help_text='与正在执行的相同任务合并时，指向该任务，结束后复用其结果'
+    )
+    checkpoints = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='阶段检查点',
+        help_text='已完成阶段的结果（如已生成的图片、DashScope文件、远程任务ID、已转存的产物），重试时从最后完成的阶段继续'
+    )
+    batch_job = models.ForeignKey(
+        'AIGCBatchJob',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='tasks',
+        verbose_name='批量推理作业',
+        help_text='通过批量推理作业生成时，指向该作业'
+    )
+    campaign = models.ForeignKey(
+        'AIGCCampaign',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='tasks',
+        verbose_name='批量生成活动',
+        help_text='由批量生成活动创建时，指向该活动'
+    )
     
     class Meta:
         db_table = 'aigc_generation_tasks'
@@ -108,10 +190,20 @@ class AIGCGenerationTask(models.Model):
         indexes = [
             models.Index(fields=['song', 'task_type', 'status']),
             models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['campaign', 'status']),
         ]
     
     def __str__(self):
         return f'{self.get_task_type_display()} - {self.song.title} ({self.get_status_display()})'
+    
+    def get_checkpoint(self, stage):
+        """获取阶段检查点数据（阶段未完成时返回None）"""
+        return (self.checkpoints or {}).get(stage)
+    
+    def save_checkpoint(self, stage, data=True):
+        """记录阶段检查点并立即保存"""
+        self.checkpoints = {**(self.checkpoints or {}), stage: data}
+        self.save(update_fields=['checkpoints'])
 
 
 class AIGCContent(models.Model):
@@ -265,9 +357,224 @@ class AIGCContent(models.Model):
             self.status = 'published'
             self.published_at = timezone.now()
             self.save()
+            
+            # 发布后刷新歌曲静态快照
+            from .services.snapshot_publisher import schedule_song_snapshot
+            schedule_song_snapshot(self.task.song_id, ['aigc'])
     
     def increment_usage(self):
         """增加使用次数"""
         self.usage_count += 1
         self.save(update_fields=['usage_count'])
 
+
+
+class AIGCBatchJob(models.Model):
+    """
+    批量推理作业模型
+    
+    多首歌曲的生成请求写入一个JSONL文件提交到DashScope批量推理接口，
+    完成后下载结果文件，批量写入AIGCContent。每首歌对应一个AIGCGenerationTask（batch_job指向本作业）
+    """
+    job_id = models.AutoField(primary_key=True, verbose_name='作业ID')
+    task_type = models.CharField(
+        max_length=50,
+        choices=TASK_TYPE_CHOICES,
+        default='comment_summary',
+        verbose_name='任务类型'
+    )
+    operator = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='aigc_batch_jobs',
+        verbose_name='操作人员'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=BATCH_STATUS_CHOICES,
+        default='pending',
+        verbose_name='作业状态',
+        db_index=True
+    )
+    parameters = models.JSONField(
+        default=dict,
+        verbose_name='生成参数',
+        help_text='作业内所有任务共用的参数，如评论范围'
+    )
+    remote_batch_id = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        verbose_name='远程作业ID',
+        db_index=True
+    )
+    input_file_id = models.CharField(max_length=100, null=True, blank=True, verbose_name='输入文件ID')
+    output_file_id = models.CharField(max_length=100, null=True, blank=True, verbose_name='结果文件ID')
+    error_file_id = models.CharField(max_length=100, null=True, blank=True, verbose_name='错误文件ID')
+    request_count = models.IntegerField(default=0, verbose_name='请求数')
+    succeeded_count = models.IntegerField(default=0, verbose_name='成功数')
+    failed_count = models.IntegerField(default=0, verbose_name='失败数')
+    error_message = models.TextField(
+        null=True,
+        blank=True,
+        verbose_name='错误信息'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='创建时间',
+        db_index=True
+    )
+    submitted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='提交时间'
+    )
+    completed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='完成时间'
+    )
+    
+    class Meta:
+        db_table = 'aigc_batch_jobs'
+        verbose_name = 'AIGC批量推理作业'
+        verbose_name_plural = 'AIGC批量推理作业'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f'{self.get_task_type_display()}批量作业 #{self.job_id} ({self.get_status_display()})'
+
+
+class AIGCCampaign(models.Model):
+    """
+    批量生成活动模型
+    
+    按歌曲筛选条件一次性为多首歌曲创建生成任务（status=pending，campaign指向本活动），
+    由 dispatch_campaign 任务按 rate_per_minute 限速逐批投递到队列
+    """
+    campaign_id = models.AutoField(primary_key=True, verbose_name='活动ID')
+    name = models.CharField(max_length=100, verbose_name='活动名称')
+    task_type = models.CharField(
+        max_length=50,
+        choices=TASK_TYPE_CHOICES,
+        verbose_name='任务类型'
+    )
+    parameters = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='生成参数',
+        help_text='所有子任务共用的生成参数，格式与单个任务相同'
+    )
+    song_filter = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='歌曲筛选条件',
+        help_text='如 {"genre": ["pop", "rock"], "without_published_image": true, "min_play_count": 100, "limit": 5000}，'
+                  '也可以用 song_ids 指定歌曲'
+    )
+    operator = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='aigc_campaigns',
+        verbose_name='操作人员'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=CAMPAIGN_STATUS_CHOICES,
+        default='running',
+        verbose_name='活动状态',
+        db_index=True
+    )
+    rate_per_minute = models.IntegerField(
+        default=10,
+        verbose_name='每分钟投递任务数'
+    )
+    total_tasks = models.IntegerField(default=0, verbose_name='子任务数')
+    last_dispatched_task_id = models.IntegerField(
+        default=0,
+        verbose_name='已投递到的任务ID',
+        help_text='子任务按任务ID顺序投递，不大于该ID的任务已投递'
+    )
+    dispatch_credit = models.FloatField(
+        default=0,
+        verbose_name='投递余量',
+        help_text='每次投递按限速累计可投递数，不足1个的部分留到下次，保证不超过每分钟投递数'
+    )
+    next_dispatch_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='下次投递时间'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='创建时间',
+        db_index=True
+    )
+    dispatched_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='全部分发时间'
+    )
+    
+    class Meta:
+        db_table = 'aigc_campaigns'
+        verbose_name = 'AIGC批量生成活动'
+        verbose_name_plural = 'AIGC批量生成活动'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
+    
+    # 进度计数的名称（with_progress 标注为 progress_<名称>）
+    PROGRESS_COUNTS = ('total', 'dispatched', 'completed', 'failed', 'processing')
+    
+    @classmethod
+    def with_progress(cls, queryset):
+        """为活动列表一次性标注子任务计数，progress() 直接使用，不再逐个活动查询"""
+        return queryset.annotate(
+            progress_total=Count('tasks'),
+            progress_dispatched=Count('tasks', filter=Q(tasks__task_id__lte=F('last_dispatched_task_id'))),
+            progress_completed=Count('tasks', filter=Q(tasks__status='completed')),
+            progress_failed=Count('tasks', filter=Q(tasks__status='failed')),
+            progress_processing=Count('tasks', filter=Q(tasks__status='processing')),
+        )
+    
+    def progress(self) -> dict:
+        """
+        活动进度（子任务按状态计数只用一次聚合查询，已通过 with_progress 标注时不再查询）
+        
+        预计剩余时间取实际完成速度和投递限速两者中较慢的估算
+        """
+        if hasattr(self, 'progress_total'):
+            counts = {name: getattr(self, f'progress_{name}') for name in self.PROGRESS_COUNTS}
+        else:
+            counts = self.tasks.aggregate(
+                total=Count('task_id'),
+                dispatched=Count('task_id', filter=Q(task_id__lte=self.last_dispatched_task_id)),
+                completed=Count('task_id', filter=Q(status='completed')),
+                failed=Count('task_id', filter=Q(status='failed')),
+                processing=Count('task_id', filter=Q(status='processing')),
+            )
+        finished = counts['completed'] + counts['failed']
+        remaining = counts['total'] - finished
+        
+        eta_seconds = None
+        if remaining and self.status not in ('paused', 'cancelled'):
+            undispatched = counts['total'] - counts['dispatched']
+            eta_seconds = undispatched * 60 / max(self.rate_per_minute, 1)
+            elapsed = (timezone.now() - self.created_at).total_seconds()
+            if finished and elapsed > 0:
+                eta_seconds = max(eta_seconds, remaining * elapsed / finished)
+            eta_seconds = int(eta_seconds)
+        
+        return {
+            **counts,
+            'pending': counts['total'] - finished - counts['processing'],
+            'finished': finished,
+            'percent': round(finished * 100 / counts['total'], 1) if counts['total'] else 100.0,
+            'eta_seconds': eta_seconds,
+        }
@@ -2,12 +2,14 @@
 AIGC序列化器
 """
 from rest_framework import serializers
-from .models import AIGCGenerationTask, AIGCContent
+from .models import AIGCGenerationTask, AIGCContent, AIGCCampaign
+from apps.songs.models import GENRE_CHOICES
 from apps.songs.serializers import SongSerializer
+from utils.sparse_fields import SparseFieldsetMixin
 
 
-class AIGCContentSerializer(serializers.ModelSerializer):
-    """AIGC内容序列化器（用于API返回，支持Web和iOS）"""
+class AIGCContentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """AIGC内容序列化器（用于API返回，支持Web和iOS，支持 ?fields=/?exclude= 稀疏字段）"""
     display_url = serializers.SerializerMethodField()
     task_type = serializers.CharField(source='task.task_type', read_only=True)
     song_id = serializers.IntegerField(source='task.song.song_id', read_only=True)
@@ -37,22 +39,29 @@ class AIGCGenerationTaskSerializer(serializers.ModelSerializer):
     song = SongSerializer(read_only=True)
     contents = AIGCContentSerializer(many=True, read_only=True)
     contents_count = serializers.SerializerMethodField()
+    generation_cache = serializers.SerializerMethodField()
     
     class Meta:
         model = AIGCGenerationTask
         fields = (
             'task_id', 'task_type', 'song', 'operator', 'status',
             'parameters', 'error_message', 'contents', 'contents_count',
-            'created_at', 'completed_at'
+            'created_at', 'completed_at', 'remote_task_id', 'remote_submitted_at',
+            'generation_cache', 'coalesced_with', 'priority', 'campaign'
         )
         read_only_fields = (
             'task_id', 'status', 'error_message', 
-            'created_at', 'completed_at'
+            'created_at', 'completed_at', 'remote_task_id', 'remote_submitted_at',
+            'coalesced_with', 'priority', 'campaign'
         )
     
     def get_contents_count(self, obj):
         """获取生成内容数量"""
         return obj.aigccontent_set.count()
+    
+    def get_generation_cache(self, obj):
+        """生成结果缓存状态（hit/miss/bypass，未查询缓存时为None）"""
+        return (obj.get_checkpoint('generation_cache') or {}).get('status')
 
 
 class AIGCContentCreateSerializer(serializers.Serializer):
@@ -77,3 +86,44 @@ class AIGCContentReviewSerializer(serializers.Serializer):
         max_length=500
     )
 
+
+
+class AIGCCampaignSerializer(serializers.ModelSerializer):
+    """批量生成活动序列化器（含聚合进度）"""
+    progress = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = AIGCCampaign
+        fields = (
+            'campaign_id', 'name', 'task_type', 'parameters', 'song_filter',
+            'operator', 'status', 'rate_per_minute', 'total_tasks', 'progress',
+            'created_at', 'dispatched_at'
+        )
+        read_only_fields = fields
+    
+    def get_progress(self, obj):
+        return obj.progress()
+
+
+class AIGCCampaignSongFilterSerializer(serializers.Serializer):
+    """批量生成活动的歌曲筛选条件"""
+    song_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    genre = serializers.ListField(
+        child=serializers.ChoiceField(choices=[value for value, _ in GENRE_CHOICES]),
+        required=False
+    )
+    without_published_image = serializers.BooleanField(required=False, default=False)
+    min_play_count = serializers.IntegerField(required=False, min_value=0)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+
+class AIGCCampaignCreateSerializer(serializers.Serializer):
+    """创建批量生成活动的序列化器"""
+    name = serializers.CharField(max_length=100)
+    task_type = serializers.ChoiceField(
+        choices=['lyric_image', 'comment_summary', 'lyric_video', 'text_to_video'],
+        required=True
+    )
+    parameters = serializers.JSONField(required=False, default=dict)
+    song_filter = AIGCCampaignSongFilterSerializer(required=False, default=dict)
+    rate_per_minute = serializers.IntegerField(required=False, min_value=1, max_value=600)
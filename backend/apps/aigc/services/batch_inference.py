@@ -0,0 +1,142 @@
+"""
+DashScope批量推理（Batch）
+大批量回填（如上千首歌的评论摘要）时不逐条调用实时接口：请求写入一个JSONL文件，
+上传后创建批量作业，由服务端在完成窗口内执行，结束后下载结果文件批量入库。
+批量推理不占用实时接口的限流配额，费用也低于实时调用。
+
+使用OpenAI兼容接口（/files、/batches），地址由 AIGC_BATCH_API_BASE 配置，
+测试时可以指向本地的兼容服务。
+
+请求文件每行一个请求：
+    {"custom_id": "task-1", "method": "POST", "url": "/v1/chat/completions", "body": {...}}
+结果文件每行一个结果：
+    {"custom_id": "task-1", "response": {"status_code": 200, "body": {"choices": [...]}}, "error": null}
+"""
+import json
+import logging
+import requests
+from types import SimpleNamespace
+from django.conf import settings
+from .wanxiang_service import classify_response_error, dashscope_breaker
+
+logger = logging.getLogger(__name__)
+
+CHAT_COMPLETIONS_URL = '/v1/chat/completions'
+
+# 远程作业状态 -> 本地作业状态（其余状态视为执行中）
+REMOTE_FINAL_STATUS = {
+    'completed': 'completed',
+    'failed': 'failed',
+    'expired': 'expired',
+    'cancelled': 'cancelled',
+}
+
+
+def build_request_line(custom_id: str, request: dict) -> str:
+    """
+    将文字生成请求（wanxiang_service.build_text_request 的返回值）转换为请求文件的一行
+
+    Args:
+        custom_id: 请求标识，结果文件中原样返回
+        request: 文字生成请求参数
+    """
+    return json.dumps({
+        'custom_id': custom_id,
+        'method': 'POST',
+        'url': CHAT_COMPLETIONS_URL,
+        'body': request,
+    }, ensure_ascii=False)
+
+
+def parse_result_line(line: str) -> dict:
+    """
+    解析结果文件（或错误文件）的一行
+
+    Returns:
+        dict: {'custom_id', 'text', 'error'}，成功时 error 为None
+    """
+    item = json.loads(line)
+    response = item.get('response') or {}
+    body = response.get('body') or {}
+    error = item.get('error') or body.get('error')
+    if error or response.get('status_code', 200) != 200:
+        if isinstance(error, dict):
+            error = f'[{error.get("code")}] {error.get("message")}'
+        return {'custom_id': item.get('custom_id'), 'text': None,
+                'error': error or f'HTTP {response.get("status_code")}'}
+    try:
+        text = body['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError):
+        return {'custom_id': item.get('custom_id'), 'text': None, 'error': '结果格式异常'}
+    return {'custom_id': item.get('custom_id'), 'text': text, 'error': None}
+
+
+class BatchInferenceClient:
+    """批量推理接口客户端（OpenAI兼容的 /files 和 /batches）"""
+
+    @property
+    def base_url(self) -> str:
+        return settings.AIGC_BATCH_API_BASE.rstrip('/')
+
+    def _request(self, method: str, path: str, label: str, **kwargs):
+        """发送请求（经过DashScope熔断器），非2xx响应按错误码转换为对应的阿里万相异常"""
+        response = dashscope_breaker.call(
+            requests.request,
+            method,
+            f'{self.base_url}{path}',
+            headers={'Authorization': f'Bearer {settings.ALIBABA_WANXIANG_API_KEY}'},
+            timeout=settings.AIGC_BATCH_HTTP_TIMEOUT,
+            **kwargs
+        )
+        if response.ok:
+            return response
+        try:
+            error = response.json().get('error') or {}
+        except ValueError:
+            error = {}
+        raise classify_response_error(SimpleNamespace(
+            status_code=response.status_code,
+            code=error.get('code') or '',
+            message=error.get('message') or response.text[:200]
+        ), label)
+
+    def upload_file(self, content: bytes, filename: str) -> str:
+        """
+        上传请求文件
+
+        Returns:
+            str: 文件ID
+        """
+        response = self._request(
+            'POST', '/files', '上传批量请求文件',
+            files={'file': (filename, content, 'application/jsonl')},
+            data={'purpose': 'batch'}
+        )
+        return response.json()['id']
+
+    def create_batch(self, input_file_id: str, metadata: dict = None) -> dict:
+        """创建批量作业，返回作业信息（id、status等）"""
+        response = self._request(
+            'POST', '/batches', '创建批量作业',
+            json={
+                'input_file_id': input_file_id,
+                'endpoint': CHAT_COMPLETIONS_URL,
+                'completion_window': settings.AIGC_BATCH_COMPLETION_WINDOW,
+                'metadata': metadata or {},
+            }
+        )
+        return response.json()
+
+    def retrieve_batch(self, batch_id: str) -> dict:
+        """查询批量作业"""
+        return self._request('GET', f'/batches/{batch_id}', '查询批量作业').json()
+
+    def download_file(self, file_id: str) -> str:
+        """下载结果文件或错误文件内容"""
+        response = self._request('GET', f'/files/{file_id}/content', '下载批量结果文件')
+        response.encoding = 'utf-8'
+        return response.text
+
+
+# 创建全局客户端实例
+batch_client = BatchInferenceClient()
@@ -0,0 +1,124 @@
+"""
+批量生成活动
+按歌曲筛选条件一次性创建子任务（pending），由 dispatch_campaign 任务按活动的限速逐批投递：
+每 AIGC_CAMPAIGN_TICK 秒投递 rate_per_minute * TICK / 60 个任务，
+活动已投递但未结束的任务达到 AIGC_CAMPAIGN_MAX_IN_FLIGHT 时暂不投递，避免队列积压。
+"""
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from apps.songs.models import Song
+
+logger = logging.getLogger(__name__)
+
+
+def campaign_songs(song_filter: dict):
+    """
+    按筛选条件查询歌曲（按歌曲ID排序）
+
+    支持的条件：
+    - song_ids: 指定歌曲ID（管理后台选中的歌曲）
+    - genre: 音乐类型（字符串或列表）
+    - without_published_image: 只选没有已发布配图的歌曲
+    - min_play_count: 最少播放次数
+    - limit: 最多歌曲数
+    """
+    from ..models import AIGCContent
+
+    songs = Song.objects.filter(is_active=True)
+    if song_filter.get('song_ids'):
+        songs = songs.filter(song_id__in=song_filter['song_ids'])
+    genre = song_filter.get('genre')
+    if genre:
+        songs = songs.filter(genre__in=[genre] if isinstance(genre, str) else genre)
+    if song_filter.get('min_play_count'):
+        songs = songs.filter(play_count__gte=song_filter['min_play_count'])
+    if song_filter.get('without_published_image'):
+        songs = songs.exclude(Exists(AIGCContent.objects.filter(
+            task__song=OuterRef('pk'), content_type='image', status='published'
+        )))
+
+    songs = songs.order_by('song_id')
+    limit = min(song_filter.get('limit') or settings.AIGC_CAMPAIGN_MAX_SONGS, settings.AIGC_CAMPAIGN_MAX_SONGS)
+    return songs[:limit]
+
+
+def create_campaign(name: str, task_type: str, parameters: dict, song_filter: dict,
+                    operator=None, rate_per_minute: int = None, campaign=None):
+    """
+    创建活动和全部子任务，并开始投递
+
+    Args:
+        campaign: 已填写字段但未保存的活动（管理后台表单），为None时新建
+
+    Returns:
+        AIGCCampaign: 活动（没有符合条件的歌曲时子任务数为0，直接标记为已全部分发）
+    """
+    from ..models import AIGCCampaign, AIGCGenerationTask, PRIORITY_BULK
+
+    song_ids = list(campaign_songs(song_filter).values_list('song_id', flat=True))
+
+    if campaign is None:
+        campaign = AIGCCampaign()
+    campaign.name = name
+    campaign.task_type = task_type
+    campaign.parameters = parameters or {}
+    campaign.song_filter = song_filter or {}
+    campaign.operator = operator
+    campaign.rate_per_minute = rate_per_minute or campaign.rate_per_minute or settings.AIGC_CAMPAIGN_RATE_PER_MINUTE
+    campaign.total_tasks = len(song_ids)
+    campaign.status = 'running' if song_ids else 'dispatched'
+
+    with transaction.atomic():
+        campaign.save()
+        AIGCGenerationTask.objects.bulk_create(
+            [
+                AIGCGenerationTask(
+                    task_type=task_type,
+                    song_id=song_id,
+                    operator=operator,
+                    parameters=campaign.parameters,
+                    status='pending',
+                    priority=PRIORITY_BULK,
+                    campaign=campaign
+                )
+                for song_id in song_ids
+            ],
+            batch_size=1000
+        )
+    logger.info(f'批量生成活动 {campaign.campaign_id} 已创建: {task_type}，{len(song_ids)} 首歌曲')
+
+    if song_ids:
+        start_dispatch(campaign)
+    return campaign
+
+
+def start_dispatch(campaign):
+    """开始（或恢复）投递（在当前事务提交后投递，避免worker读不到刚创建的活动）"""
+    from ..tasks import dispatch_campaign
+    from utils.task_queues import QUEUE_TEXT, queue_options
+
+    campaign_id = campaign.campaign_id
+    transaction.on_commit(
+        lambda: dispatch_campaign.apply_async(args=[campaign_id], **queue_options(QUEUE_TEXT))
+    )
+
+
+def cancel_campaign(campaign):
+    """取消活动：未投递的子任务标记失败，已投递的任务继续执行"""
+    from django.utils import timezone
+    from ..models import AIGCCampaign
+
+    with transaction.atomic():
+        # 与 dispatch_campaign 互斥：加锁后读取最新的投递进度，已投递的任务不会被标记失败
+        locked = AIGCCampaign.objects.select_for_update().get(campaign_id=campaign.campaign_id)
+        locked.status = 'cancelled'
+        locked.save(update_fields=['status'])
+        cancelled = locked.tasks.filter(
+            status='pending', task_id__gt=locked.last_dispatched_task_id
+        ).update(status='failed', error_message='批量生成活动已取消', completed_at=timezone.now())
+    campaign.status = locked.status
+    campaign.last_dispatched_task_id = locked.last_dispatched_task_id
+    logger.info(f'批量生成活动 {campaign.campaign_id} 已取消，{cancelled} 个未投递的任务不再执行')
+    return cancelled
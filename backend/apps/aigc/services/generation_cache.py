@@ -0,0 +1,113 @@
+"""
+生成结果缓存
+以（模型、完整提示词、尺寸/风格/数量、温度等）请求参数的哈希为键，
+缓存已转存到OSS的图片文件名或生成的文字，相同请求直接复用，不再调用模型。
+缓存不可用（Redis故障）时按未命中处理，不影响生成。
+"""
+import hashlib
+import json
+import logging
+import time
+from django.conf import settings
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCache:
+    """生成结果缓存（Redis）"""
+
+    KEY_PREFIX = 'aigc:gencache:'
+    INDEX_KEY = 'aigc:gencache:index'  # ZSET：缓存键 -> 写入时间，用于按数量淘汰
+    STATS_KEY = 'aigc:gencache:stats'  # HASH：{kind}:hits / {kind}:misses
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AIGC_GENERATION_CACHE_ENABLED
+
+    @staticmethod
+    def make_key(kind: str, request: dict) -> str:
+        """
+        计算缓存键
+
+        Args:
+            kind: 内容类型（image/text）
+            request: 模型请求参数（模型、完整提示词、尺寸、数量、温度等）
+        """
+        payload = json.dumps({'kind': kind, **request}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, kind: str, key: str, stats_kind: str = None):
+        """
+        读取缓存，记录命中/未命中次数（未命中或出错返回None）
+
+        Args:
+            kind: 内容类型（image/text）
+            key: 缓存键
+            stats_kind: 命中统计归入的类型（默认同kind；首帧查找等非生成请求单独统计，不影响生成命中率）
+        """
+        if not self.enabled:
+            return None
+        try:
+            client = get_redis()
+            raw = client.get(self.KEY_PREFIX + key)
+            client.hincrby(self.STATS_KEY, f'{stats_kind or kind}:{"hits" if raw else "misses"}', 1)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f'读取生成结果缓存失败: {str(e)}')
+            return None
+
+    def set(self, key: str, value: dict):
+        """写入缓存，并按TTL和最大条目数淘汰旧条目"""
+        if not self.enabled:
+            return
+        ttl = settings.AIGC_GENERATION_CACHE_TTL
+        now = time.time()
+        try:
+            client = get_redis()
+            pipe = client.pipeline()
+            pipe.set(self.KEY_PREFIX + key, json.dumps(value, ensure_ascii=False), ex=ttl)
+            pipe.zadd(self.INDEX_KEY, {key: now})
+            # 已过期的条目从索引中移除
+            pipe.zremrangebyscore(self.INDEX_KEY, 0, now - ttl)
+            pipe.execute()
+            self._evict(client)
+        except Exception as e:
+            logger.warning(f'写入生成结果缓存失败: {str(e)}')
+
+    def _evict(self, client):
+        """超过最大条目数时淘汰最早写入的条目"""
+        overflow = client.zcard(self.INDEX_KEY) - settings.AIGC_GENERATION_CACHE_MAX_ENTRIES
+        if overflow <= 0:
+            return
+        oldest = client.zpopmin(self.INDEX_KEY, overflow)
+        if oldest:
+            client.delete(*[self.KEY_PREFIX + key for key, _ in oldest])
+            logger.info(f'生成结果缓存淘汰 {len(oldest)} 条')
+
+    def stats(self) -> dict:
+        """各类型的命中率统计"""
+        try:
+            client = get_redis()
+            counters = client.hgetall(self.STATS_KEY)
+            entries = client.zcard(self.INDEX_KEY)
+        except Exception as e:
+            logger.warning(f'读取生成结果缓存统计失败: {str(e)}')
+            return {}
+
+        result = {'enabled': self.enabled, 'entries': entries}
+        kinds = {field.split(':', 1)[0] for field in counters}
+        for kind in sorted(kinds):
+            hits = int(counters.get(f'{kind}:hits', 0))
+            misses = int(counters.get(f'{kind}:misses', 0))
+            total = hits + misses
+            result[kind] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / total, 4) if total else 0.0,
+            }
+        return result
+
+
+# 创建全局缓存实例
+generation_cache = GenerationCache()
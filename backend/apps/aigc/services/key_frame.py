@@ -0,0 +1,97 @@
+"""
+视频首帧（key frame）查找
+歌词视频和文生视频共用：优先使用歌曲已发布的配图，其次使用生成结果缓存中
+相同请求的配图，都没有时才需要重新生成（由任务创建临时配图任务）。
+"""
+import logging
+from typing import Dict, Optional, Tuple
+from .prompt_builder import PromptBuilder
+from .wanxiang_service import wanxiang_service
+from .generation_cache import generation_cache
+from utils.storage.oss_storage import image_storage
+
+logger = logging.getLogger(__name__)
+
+# 首帧来源
+KEY_FRAME_PUBLISHED = 'published'
+KEY_FRAME_CACHED = 'cached'
+KEY_FRAME_GENERATED = 'generated'
+
+
+def build_lyric_image_request(song, style: str, count: int, lyrics_section: str) -> Tuple[str, Dict]:
+    """
+    构建歌词配图的提示词和模型请求参数（配图任务与首帧查找共用，保证缓存键一致）
+
+    Returns:
+        tuple: (提示词, 模型请求参数)
+    """
+    # 提取歌词关键段落
+    lyrics_key = PromptBuilder.extract_lyrics_key_section(section_type=lyrics_section, song=song)
+
+    # 构建提示词
+    prompt = PromptBuilder.build_lyric_image_prompt(
+        song_title=song.title,
+        artist=song.artist,
+        lyrics=lyrics_key,
+        style=style
+    )
+    return prompt, wanxiang_service.build_image_request(prompt, style, count)
+
+
+def find_published_key_frame(song) -> Optional[Dict]:
+    """歌曲最新发布的歌词配图"""
+    from ..models import AIGCContent
+
+    image_content = AIGCContent.objects.filter(
+        task__song=song,
+        task__task_type='lyric_image',
+        content_type='image',
+        status='published'
+    ).order_by('-published_at').first()
+    if image_content is None:
+        return None
+
+    image_url = image_content.display_url or image_content.content_url
+    if not image_url:
+        return None
+    return {
+        'image_url': image_url,
+        'oss_name': image_content.content_file.name or None,
+        'source': KEY_FRAME_PUBLISHED,
+        'content_id': image_content.content_id,
+    }
+
+
+def find_cached_key_frame(song, style: str, lyrics_section: str = 'chorus') -> Optional[Dict]:
+    """生成结果缓存中相同请求（单张配图）的图片"""
+    if not generation_cache.enabled:
+        return None
+
+    _, request = build_lyric_image_request(song, style, 1, lyrics_section)
+    # 首帧查找单独统计为key_frame，不计入配图生成的命中率
+    cached = generation_cache.get('image', generation_cache.make_key('image', request), stats_kind='key_frame')
+    if not cached or not cached.get('images'):
+        return None
+
+    filename = cached['images'][0]['filename']
+    return {
+        'image_url': image_storage.url(filename),
+        'oss_name': filename,
+        'source': KEY_FRAME_CACHED,
+        'cached_from_task_id': cached.get('task_id'),
+    }
+
+
+def find_key_frame(song, style: str, lyrics_section: str = 'chorus', use_cache: bool = True) -> Optional[Dict]:
+    """
+    查找可直接使用的视频首帧
+
+    Returns:
+        dict: {'image_url', 'oss_name', 'source', ...}，没有可用图片时返回None（需要生成）
+    """
+    key_frame = find_published_key_frame(song)
+    if key_frame is None and use_cache:
+        key_frame = find_cached_key_frame(song, style, lyrics_section)
+    if key_frame:
+        logger.info(f'歌曲 {song.song_id} 使用{key_frame["source"]}首帧: {key_frame["image_url"][:50]}...')
+    return key_frame
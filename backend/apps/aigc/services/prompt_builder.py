@@ -4,6 +4,7 @@ Prompt构建器
 """
 from typing import List, Dict
 from apps.comments.models import Comment
+from apps.songs.utils.lyrics_structure import build_lyrics_structure, extract_section
 
 
 class PromptBuilder:
@@ -111,22 +112,24 @@ class PromptBuilder:
         return prompt.strip()
     
     @staticmethod
-    def build_text_to_video_prompt(song_title: str, artist: str, lyrics: str, style: str = 'beautiful', mood: str = '治愈') -> str:
+    def build_text_to_video_prompt(song_title: str, artist: str, lyrics: str = '', style: str = 'beautiful',
+                                   mood: str = '治愈', song=None) -> str:
         """
         构建文生视频的提示词（直接基于歌词生成视频，不需要图片）
         
         Args:
             song_title: 歌曲标题
             artist: 艺术家
-            lyrics: 歌词内容
+            lyrics: 歌词内容（传入song时忽略）
             style: 视频风格
             mood: 视频氛围
+            song: 歌曲（Song，传入时直接使用保存的歌词结构索引）
         
         Returns:
             str: 完整的提示词
         """
         # 提取歌词关键段落（用于视频生成）
-        lyrics_key = PromptBuilder.extract_lyrics_key_section(lyrics, num_lines=10)
+        lyrics_key = PromptBuilder.extract_lyrics_key_section(lyrics, num_lines=10, song=song)
         
         style_map = {
             'beautiful': '唯美、流畅',
@@ -154,31 +157,22 @@ class PromptBuilder:
         return prompt.strip()
     
     @staticmethod
-    def extract_lyrics_key_section(lyrics: str, section_type: str = 'chorus', num_lines: int = 5) -> str:
+    def extract_lyrics_key_section(lyrics: str = '', section_type: str = 'chorus', num_lines: int = None,
+                                   song=None) -> str:
         """
         提取歌词关键段落
         
         Args:
-            lyrics: 完整歌词
+            lyrics: 完整歌词文本（临时计算索引，传入song时忽略）
             section_type: 段落类型（chorus: 副歌, verse: 主歌, all: 全部）
+            num_lines: 最多返回的行数（默认副歌8行、主歌4行）
+            song: 歌曲（Song，传入时直接使用保存的歌词结构索引）
         
         Returns:
-            str: 提取的歌词段落
+            str: 提取的歌词段落（不含LRC时间标签）
         """
+        if song is not None:
+            return song.lyrics_section(section_type, num_lines)
         if not lyrics:
             return ''
-        
-        # 简单的段落提取逻辑
-        # 实际可以根据歌词格式（如标记了[副歌]）来提取
-        lines = lyrics.split('\n')
-        
-        if section_type == 'chorus':
-            # 尝试找到副歌部分（通常包含重复的段落）
-            # 这里使用简单的启发式方法：找到最长的重复段落
-            # 实际应用中可能需要更复杂的逻辑
-            return '\n'.join(lines[:8])  # 返回前8行作为示例
-        elif section_type == 'verse':
-            return '\n'.join(lines[:4])  # 返回前4行
-        else:
-            return lyrics[:200]  # 返回前200字
-
+        return extract_section(build_lyrics_structure(lyrics), section_type, num_lines)
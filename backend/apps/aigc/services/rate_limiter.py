@@ -0,0 +1,183 @@
+"""
+DashScope调用限流（令牌桶）
+每个接口类型+模型一个令牌桶，状态保存在Redis中，所有worker、所有节点共享。
+取令牌在Lua脚本中原子完成（按Redis服务器时间补充令牌），令牌不足时调用方
+短暂等待，等待时间超过上限则抛出RateLimited，由Celery任务稍后重新投递。
+Redis不可用时不限流（只记录警告）。
+"""
+import logging
+import time
+from django.conf import settings
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 取令牌：KEYS[1]=桶，KEYS[2]=统计；ARGV=速率（令牌/秒）、容量、请求令牌数、桶名
+# 返回 {是否获得令牌, 需要等待的秒数, 剩余令牌数}
+ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+    allowed = 1
+else
+    wait = (requested - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+if allowed == 1 then
+    redis.call('HINCRBY', KEYS[2], ARGV[4] .. ':allowed', 1)
+else
+    redis.call('HINCRBY', KEYS[2], ARGV[4] .. ':throttled', 1)
+end
+return {allowed, tostring(wait), tostring(tokens)}
+"""
+
+
+class RateLimited(Exception):
+    """令牌不足（超过最长等待时间），需要稍后重试"""
+
+    def __init__(self, bucket: str, retry_after: float):
+        self.bucket = bucket
+        self.retry_after = retry_after
+        super().__init__(f'DashScope调用限流: {bucket}，{retry_after:.1f}秒后重试')
+
+
+class TokenBucketLimiter:
+    """基于Redis的分布式令牌桶"""
+
+    KEY_PREFIX = 'aigc:ratelimit:'
+    STATS_KEY = 'aigc:ratelimit:stats'  # HASH：{桶}:allowed / {桶}:throttled / {桶}:waited_ms
+
+    def __init__(self):
+        self._acquire_script = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AIGC_RATE_LIMIT_ENABLED
+
+    @staticmethod
+    def bucket_name(kind: str, model: str) -> str:
+        return f'{kind}:{model or "default"}'
+
+    @staticmethod
+    def bucket_config(kind: str):
+        """（速率, 容量），未配置的接口类型返回None（不限流）"""
+        return settings.AIGC_RATE_LIMITS.get(kind)
+
+    def acquire(self, kind: str, model: str, tokens: int = 1, max_wait: float = None):
+        """
+        获取令牌，不足时等待
+
+        Args:
+            kind: 接口类型（image/text/video/video_query）
+            model: 模型名称
+            tokens: 需要的令牌数
+            max_wait: 最长等待时间（秒），默认 AIGC_RATE_LIMIT_MAX_WAIT，0表示不等待
+
+        Raises:
+            RateLimited: 等待超过max_wait仍未获得令牌
+        """
+        config = self.bucket_config(kind)
+        if not self.enabled or not config:
+            return
+
+        rate, capacity = config
+        bucket = self.bucket_name(kind, model)
+        max_wait = settings.AIGC_RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        started = time.monotonic()
+
+        while True:
+            try:
+                allowed, wait = self._try_acquire(bucket, rate, capacity, tokens)
+            except Exception as e:
+                logger.warning(f'限流检查失败，不限流: {str(e)}')
+                return
+
+            if allowed:
+                waited = time.monotonic() - started
+                if waited > 0.001:
+                    self._record_wait(bucket, waited)
+                return
+
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                logger.info(f'DashScope调用限流: {bucket}，需等待 {wait:.2f} 秒，超过最长等待时间')
+                raise RateLimited(bucket, wait)
+            time.sleep(wait)
+
+    def _try_acquire(self, bucket: str, rate: float, capacity: int, tokens: int):
+        client = get_redis()
+        if self._acquire_script is None:
+            self._acquire_script = client.register_script(ACQUIRE_SCRIPT)
+        allowed, wait, _ = self._acquire_script(
+            keys=[self.KEY_PREFIX + bucket, self.STATS_KEY],
+            args=[rate, capacity, tokens, bucket]
+        )
+        return int(allowed) == 1, float(wait)
+
+    def _record_wait(self, bucket: str, waited: float):
+        try:
+            get_redis().hincrby(self.STATS_KEY, f'{bucket}:waited_ms', int(waited * 1000))
+        except Exception as e:
+            logger.warning(f'记录限流等待时间失败: {str(e)}')
+
+    def stats(self) -> dict:
+        """
+        各令牌桶的饱和度统计
+
+        Returns:
+            dict: {'enabled', 'buckets': {桶: {'rate', 'capacity', 'tokens', 'saturation',
+            'allowed', 'throttled', 'waited_ms'}}}
+        """
+        try:
+            client = get_redis()
+            counters = client.hgetall(self.STATS_KEY)
+            names = sorted({field.rsplit(':', 1)[0] for field in counters})
+            pipe = client.pipeline()
+            for name in names:
+                pipe.hmget(self.KEY_PREFIX + name, 'tokens', 'ts')
+            states = pipe.execute()
+        except Exception as e:
+            logger.warning(f'读取限流统计失败: {str(e)}')
+            return {}
+
+        now = time.time()
+        buckets = {}
+        for name, (tokens, ts) in zip(names, states):
+            config = self.bucket_config(name.split(':', 1)[0])
+            if not config:
+                continue
+            rate, capacity = config
+            if tokens is None:
+                current = float(capacity)
+            else:
+                # 按本机时间估算当前令牌数（与Redis时间的误差可忽略）
+                current = min(capacity, float(tokens) + max(0.0, now - float(ts)) * rate)
+            buckets[name] = {
+                'rate': rate,
+                'capacity': capacity,
+                'tokens': round(current, 2),
+                'saturation': round(1 - current / capacity, 4),
+                'allowed': int(counters.get(f'{name}:allowed', 0)),
+                'throttled': int(counters.get(f'{name}:throttled', 0)),
+                'waited_ms': int(counters.get(f'{name}:waited_ms', 0)),
+            }
+        return {'enabled': self.enabled, 'buckets': buckets}
+
+
+# 创建全局限流实例
+rate_limiter = TokenBucketLimiter()
@@ -0,0 +1,135 @@
+"""
+AIGC任务合并（single-flight）
+同一歌曲、同一任务类型、参数相同（补全默认值后）的任务同时只执行一个（leader），
+其余任务（follower）挂到leader上，leader结束后直接复用其结果，不再重复调用模型。
+leader通过Redis键 SET NX 选出，键值为leader的任务ID。
+"""
+import hashlib
+import json
+import logging
+from django.conf import settings
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 各任务类型的参数默认值（与 tasks.py 中的取值保持一致）
+PARAMETER_DEFAULTS = {
+    'lyric_image': {'style': 'beautiful', 'count': 2, 'lyrics_section': 'chorus'},
+    'comment_summary': {'comment_range': 'hot', 'summary_style': 'objective'},
+    'lyric_video': {
+        'style': 'beautiful', 'duration': 5, 'resolution': '720p',
+        'use_existing_image': True, 'lyrics_section': 'chorus'
+    },
+    'text_to_video': {
+        'style': 'beautiful', 'duration': 5, 'resolution': '720p',
+        'mood': '治愈', 'use_existing_image': True
+    },
+}
+
+# 不影响生成结果的参数
+IGNORED_PARAMETERS = ('use_cache',)
+
+# 比较并删除（只释放自己持有的键）
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class FlightInProgress(Exception):
+    """依赖的任务已合并到正在执行的任务，需要稍后再继续"""
+
+    def __init__(self, leader_id):
+        self.leader_id = leader_id
+        super().__init__(f'等待任务 {leader_id} 完成')
+
+
+def normalize_parameters(task_type: str, parameters: dict) -> dict:
+    """补全默认值并去掉不影响结果的参数"""
+    normalized = {**PARAMETER_DEFAULTS.get(task_type, {}), **(parameters or {})}
+    for name in IGNORED_PARAMETERS:
+        normalized.pop(name, None)
+    return normalized
+
+
+class SingleFlight:
+    """基于Redis的任务合并"""
+
+    KEY_PREFIX = 'aigc:flight:'
+
+    def __init__(self):
+        self._release_script = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AIGC_SINGLE_FLIGHT_ENABLED
+
+    def flight_key(self, song_id: int, task_type: str, parameters: dict) -> str:
+        """计算合并键"""
+        payload = json.dumps(normalize_parameters(task_type, parameters), sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+        return f'{self.KEY_PREFIX}{song_id}:{task_type}:{digest}'
+
+    def _key_for(self, task) -> str:
+        return self.flight_key(task.song_id, task.task_type, task.parameters)
+
+    def join(self, task):
+        """
+        尝试成为该请求的leader
+
+        Returns:
+            int: 正在执行的leader任务ID；自己成为（或本来就是）leader、
+            参数指定 use_cache=false、或Redis不可用时返回None
+        """
+        if not self.enabled or not (task.parameters or {}).get('use_cache', True):
+            return None
+
+        key = self._key_for(task)
+        ttl = settings.AIGC_SINGLE_FLIGHT_TTL
+        own_id = str(task.task_id)
+        try:
+            client = get_redis()
+            for _ in range(2):
+                if client.set(key, own_id, nx=True, ex=ttl):
+                    return None
+
+                leader_id = client.get(key)
+                if leader_id == own_id:
+                    # 重试中的leader，续期
+                    client.expire(key, ttl)
+                    return None
+                if leader_id and self._is_in_flight(int(leader_id)):
+                    return int(leader_id)
+
+                # leader已结束但键未释放（异常退出），清除后重新竞争
+                self._release(client, key, leader_id or '')
+        except Exception as e:
+            logger.warning(f'任务合并检查失败，按独立任务执行: {str(e)}')
+        return None
+
+    def leave(self, task):
+        """leader结束时释放键"""
+        if not self.enabled:
+            return
+        try:
+            self._release(get_redis(), self._key_for(task), str(task.task_id))
+        except Exception as e:
+            logger.warning(f'释放任务合并键失败: {str(e)}')
+
+    def _release(self, client, key, value):
+        if self._release_script is None:
+            self._release_script = client.register_script(RELEASE_SCRIPT)
+        self._release_script(keys=[key], args=[value])
+
+    @staticmethod
+    def _is_in_flight(task_id: int) -> bool:
+        from ..models import AIGCGenerationTask
+        return AIGCGenerationTask.objects.filter(
+            task_id=task_id, status__in=('pending', 'processing')
+        ).exists()
+
+
+# 创建全局实例
+single_flight = SingleFlight()
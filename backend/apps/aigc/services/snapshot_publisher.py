@@ -0,0 +1,321 @@
+"""
+静态快照发布器
+将歌曲详情、已发布AIGC内容、精彩评论渲染为版本化JSON写入OSS，
+客户端可直接从OSS/CDN读取，无需经过Django
+
+快照中不包含签名URL（每次签名结果不同，且会过期），
+OSS中的封面、MV、AIGC图片/视频使用固定的代理地址，访问时重定向到新签名的URL，
+因此内容不变时快照字节不变，版本号（内容哈希）不变，不会重复写入
+"""
+import gzip
+import hashlib
+import json
+import logging
+from contextlib import contextmanager
+from functools import partial
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from utils.redis_client import get_redis
+from utils.storage.oss_storage import snapshot_storage
+
+logger = logging.getLogger(__name__)
+
+# 快照格式版本（payload结构变化时递增，旧客户端可据此忽略）
+SNAPSHOT_SCHEMA_VERSION = 1
+
+# 歌曲详情中实时变化的计数（播放、点赞、评论数、文件大小），不写入长缓存的快照，由客户端调用接口获取
+DETAIL_VOLATILE_FIELDS = ('play_count', 'like_count', 'file_size', 'comments_count')
+
+# manifest读-改-写的锁（同一首歌的多个发布任务串行，避免后写入的覆盖先写入的快照）
+MANIFEST_LOCK_TIMEOUT = 120
+MANIFEST_LOCK_WAIT = 30
+
+
+class SnapshotLocked(Exception):
+    """同一首歌的快照正在发布（稍后重试）"""
+    retryable = True
+
+
+def build_song_aigc_payload(song, request=None, stable_urls=False) -> dict:
+    """
+    构建歌曲已发布AIGC内容的数据（与 song_aigc_content 接口的data一致）
+
+    Args:
+        song: 歌曲对象
+        request: 请求对象（可选，用于 ?fields= 稀疏字段）
+        stable_urls: 已存入OSS的图片/视频使用固定的代理地址（快照用），而不是签名URL
+    """
+    from apps.aigc.models import AIGCContent
+    from apps.aigc.fast_serializers import AIGCContentFastSerializer
+
+    # 一次查询取出全部已发布内容，再按类型分组
+    contents = AIGCContent.objects.filter(
+        task__song=song,
+        status='published'
+    ).order_by('-published_at')
+    serializer = AIGCContentFastSerializer(context={'request': request, 'stable_urls': stable_urls})
+    # 分组所需的列即使未被请求也要查询
+    group_columns = tuple(
+        column for column in ('content_type', 'task__task_type') if column not in serializer.columns
+    )
+    rows = contents.values(*(serializer.columns + group_columns))
+
+    groups = {
+        ('image', 'lyric_image'): [],
+        ('text', 'comment_summary'): [],
+        ('video', 'lyric_video'): [],
+        ('video', 'text_to_video'): [],
+    }
+    for row in rows:
+        group = groups.get((row['content_type'], row['task__task_type']))
+        if group is not None:
+            group.append(row)
+
+    comment_summaries = serializer.serialize_rows(groups[('text', 'comment_summary')][:1])
+
+    return {
+        'song_id': song.song_id,
+        'song_title': song.title,
+        'song_artist': song.artist,
+        'lyric_images': serializer.serialize_rows(groups[('image', 'lyric_image')]),
+        'comment_summary': comment_summaries[0] if comment_summaries else None,
+        'lyric_videos': serializer.serialize_rows(groups[('video', 'lyric_video')]),
+        'text_to_videos': serializer.serialize_rows(groups[('video', 'text_to_video')])
+    }
+
+
+def build_song_detail_payload(song) -> dict:
+    """
+    构建歌曲详情数据（与 SongDetailView.retrieve 的data一致，
+    签名URL替换为代理地址，不包含实时变化的计数 DETAIL_VOLATILE_FIELDS）
+    """
+    from apps.songs.serializers import SongSerializer
+
+    # file_size需要读取OSS对象信息，直接从字段列表中去掉，不做无用的请求
+    serializer = SongSerializer(song)
+    for name in DETAIL_VOLATILE_FIELDS:
+        serializer.fields.pop(name, None)
+    data = serializer.data
+
+    # 替换file_url为代理URL
+    if data.get('file_url'):
+        data['file_url'] = f'/api/songs/{song.song_id}/stream/'
+    # 封面、MV替换为重定向地址（访问时再签名）
+    if data.get('cover_url'):
+        data['cover_url'] = f'/api/songs/{song.song_id}/cover/'
+    if data.get('mv_video_url'):
+        data['mv_video_url'] = f'/api/songs/{song.song_id}/mv/'
+    return data
+
+
+def build_featured_comments_payload(song) -> list:
+    """构建精彩评论数据（点赞数最高的3条主评论，匿名视角，is_liked恒为False）"""
+    from apps.comments.models import Comment
+    from apps.comments.fast_serializers import CommentFastSerializer
+
+    featured_comments = Comment.objects.filter(
+        song=song,
+        is_active=True,
+        parent=None
+    ).order_by('-like_count', '-created_at')[:3]
+    return CommentFastSerializer().serialize(featured_comments)
+
+
+# 快照名称 -> payload构建函数
+SNAPSHOT_BUILDERS = {
+    'detail': build_song_detail_payload,
+    'aigc': partial(build_song_aigc_payload, stable_urls=True),
+    'featured_comments': build_featured_comments_payload,
+}
+
+
+class SnapshotPublisher:
+    """快照发布器"""
+
+    def __init__(self, storage=None):
+        self.storage = storage or snapshot_storage
+        self.gzip_enabled = getattr(settings, 'SNAPSHOT_GZIP', True)
+        self.max_age = getattr(settings, 'SNAPSHOT_MAX_AGE', 86400)
+        self.manifest_max_age = getattr(settings, 'SNAPSHOT_MANIFEST_MAX_AGE', 60)
+        self.base_url = getattr(settings, 'SNAPSHOT_BASE_URL', '')
+
+    @staticmethod
+    def render(payload) -> bytes:
+        """渲染为紧凑JSON（UTF-8）"""
+        return json.dumps(
+            payload,
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+            separators=(',', ':')
+        ).encode('utf-8')
+
+    def _headers(self, max_age: int, immutable: bool = False) -> dict:
+        """构建对象响应头"""
+        cache_control = f'public, max-age={max_age}'
+        if immutable:
+            cache_control += ', immutable'
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Cache-Control': cache_control,
+            # 快照只包含公开数据，允许客户端直接读取
+            'x-oss-object-acl': 'public-read',
+        }
+        if self.gzip_enabled:
+            headers['Content-Encoding'] = 'gzip'
+        return headers
+
+    def _encode(self, body: bytes) -> bytes:
+        """按配置压缩（mtime固定为0，保证相同内容得到相同字节）"""
+        if self.gzip_enabled:
+            return gzip.compress(body, mtime=0)
+        return body
+
+    def publish_song(self, song, names=None) -> dict:
+        """
+        发布歌曲的全部（或指定）快照并更新manifest
+
+        版本号取内容哈希，内容不变时对象名不变，可设置长缓存；
+        manifest为固定对象名，短缓存，指向当前各快照版本
+
+        Args:
+            song: 歌曲对象
+            names: 需要发布的快照名称列表，默认全部
+
+        Returns:
+            dict: manifest内容
+        """
+        names = names or list(SNAPSHOT_BUILDERS.keys())
+        with self._manifest_lock(song.song_id):
+            return self._publish_locked(song, names)
+
+    def _publish_locked(self, song, names) -> dict:
+        """持有manifest锁时发布快照并更新manifest"""
+        manifest = self._load_manifest(song.song_id)
+
+        for name in names:
+            body = self.render(SNAPSHOT_BUILDERS[name](song))
+            version = hashlib.sha1(body).hexdigest()[:16]
+            object_name = f'songs/{song.song_id}/{name}.{version}.json'
+
+            current = manifest['snapshots'].get(name)
+            if current and current.get('version') == version:
+                logger.debug(f'快照未变化，跳过: {object_name}')
+                continue
+
+            self.storage.put_object(
+                object_name,
+                self._encode(body),
+                headers=self._headers(self.max_age, immutable=True)
+            )
+            manifest['snapshots'][name] = {
+                'version': version,
+                'url': self.storage.public_url(object_name, self.base_url),
+                'size': len(body),
+            }
+
+        manifest['generated_at'] = timezone.now().isoformat()
+        self.storage.put_object(
+            self._manifest_name(song.song_id),
+            self._encode(self.render(manifest)),
+            headers=self._headers(self.manifest_max_age)
+        )
+        logger.info(f'歌曲 {song.song_id} 快照发布完成: {", ".join(names)}')
+        return manifest
+
+    @staticmethod
+    def _manifest_name(song_id: int) -> str:
+        return f'songs/{song_id}/manifest.json'
+
+    @contextmanager
+    def _manifest_lock(self, song_id: int):
+        """
+        同一首歌的manifest读-改-写加锁（Redis不可用时不加锁，按原方式发布）
+
+        Raises:
+            SnapshotLocked: 等待超过 MANIFEST_LOCK_WAIT 秒仍未获得锁
+        """
+        lock = None
+        try:
+            lock = get_redis().lock(
+                f'snapshot:lock:{song_id}', timeout=MANIFEST_LOCK_TIMEOUT, blocking_timeout=MANIFEST_LOCK_WAIT
+            )
+            acquired = lock.acquire()
+        except Exception as e:
+            logger.warning(f'获取快照锁失败，不加锁发布: song_id={song_id}, 错误: {str(e)}')
+            lock = None
+            acquired = True
+        if not acquired:
+            raise SnapshotLocked(f'歌曲 {song_id} 的快照正在发布')
+        try:
+            yield
+        finally:
+            if lock is not None:
+                try:
+                    lock.release()
+                except Exception as e:
+                    logger.warning(f'释放快照锁失败: song_id={song_id}, 错误: {str(e)}')
+
+    def _load_manifest(self, song_id: int) -> dict:
+        """
+        读取已有manifest（不存在或内容损坏时返回空manifest）
+
+        读取失败（OSS超时、熔断等）时抛出异常，由发布任务重试，
+        不能当作空manifest写回，否则会丢掉本次未发布的其他快照
+        """
+        manifest = {
+            'schema_version': SNAPSHOT_SCHEMA_VERSION,
+            'song_id': song_id,
+            'snapshots': {},
+        }
+        try:
+            raw = self.storage._open(self._manifest_name(song_id)).read()
+        except FileNotFoundError:
+            return manifest
+
+        try:
+            if raw[:2] == b'\x1f\x8b':
+                raw = gzip.decompress(raw)
+            existing = json.loads(raw.decode('utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f'快照manifest内容损坏，将重新生成: song_id={song_id}, 错误: {str(e)}')
+            return manifest
+        if existing.get('schema_version') == SNAPSHOT_SCHEMA_VERSION:
+            manifest['snapshots'] = existing.get('snapshots', {})
+        return manifest
+
+
+def schedule_song_snapshot(song_id: int, names=None, debounce: int = 0):
+    """
+    在当前事务提交后异步发布歌曲快照（未开启快照时忽略）
+
+    Args:
+        song_id: 歌曲ID
+        names: 需要发布的快照名称列表，默认全部
+        debounce: 防抖时间（秒），大于0时延迟发布，期间同一快照的重复请求合并为一次
+                  （发布时重新读取数据，延迟期间的变化都会包含在内）
+    """
+    if not getattr(settings, 'SNAPSHOT_ENABLED', True):
+        return
+
+    from django.db import transaction
+
+    def _enqueue():
+        try:
+            from apps.aigc.tasks import publish_song_snapshots
+            if debounce > 0:
+                key = f'snapshot:debounce:{song_id}:{",".join(names or SNAPSHOT_BUILDERS)}'
+                try:
+                    if not get_redis().set(key, '1', nx=True, ex=debounce):
+                        return
+                except Exception as e:
+                    logger.warning(f'快照防抖失败，直接发布: song_id={song_id}, 错误: {str(e)}')
+            publish_song_snapshots.apply_async(args=[song_id, names], countdown=debounce or None)
+        except Exception as e:
+            logger.error(f'触发快照发布任务失败: song_id={song_id}, 错误: {str(e)}', exc_info=True)
+
+    transaction.on_commit(_enqueue)
+
+
+# 创建全局发布器实例
+snapshot_publisher = SnapshotPublisher()
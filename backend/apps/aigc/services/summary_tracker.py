@@ -0,0 +1,61 @@
+"""
+评论摘要增量刷新
+发表评论、点赞/取消点赞、删除评论时将歌曲加入Redis集合（脏歌曲），
+定时任务只检查这些歌曲：用选中评论的ID和点赞数档位计算指纹，
+与最近一次摘要记录的指纹（AIGCContent.metadata.comment_fingerprint）不同时才重新生成。
+
+点赞数按2的幂分档（0、1、2-3、4-7、8-15…），热门评论多几个赞不会触发重新生成，
+入选评论变化或点赞数量级变化时才会触发。
+"""
+import hashlib
+import logging
+from django.conf import settings
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def like_bucket(like_count: int) -> int:
+    """点赞数档位（按2的幂分档）"""
+    return max(like_count or 0, 0).bit_length()
+
+
+def comment_fingerprint(comments) -> str:
+    """选中评论的指纹（评论ID + 点赞数档位，与评论顺序无关）"""
+    parts = sorted(f'{comment.comment_id}:{like_bucket(comment.like_count)}' for comment in comments)
+    return hashlib.sha1(','.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class SummaryTracker:
+    """记录评论有变化的歌曲（Redis SET）"""
+
+    DIRTY_KEY = 'aigc:summary:dirty'
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AIGC_SUMMARY_REFRESH_ENABLED
+
+    def mark_dirty(self, song_id: int):
+        """标记歌曲评论有变化（Redis不可用时只记录警告，不影响评论操作）"""
+        if not self.enabled:
+            return
+        try:
+            get_redis().sadd(self.DIRTY_KEY, song_id)
+        except Exception as e:
+            logger.warning(f'标记歌曲 {song_id} 评论变化失败: {str(e)}')
+
+    def pop_dirty(self, count: int) -> list:
+        """取出最多count首有变化的歌曲"""
+        items = get_redis().spop(self.DIRTY_KEY, count) or []
+        return [int(item) for item in items]
+
+    def pending_count(self) -> int:
+        try:
+            return get_redis().scard(self.DIRTY_KEY)
+        except Exception as e:
+            logger.warning(f'读取待刷新摘要的歌曲数失败: {str(e)}')
+            return 0
+
+
+# 创建全局实例
+summary_tracker = SummaryTracker()
@@ -2,24 +2,104 @@
 阿里万相（通义万相）服务
 使用阿里云DashScope SDK
 """
+import hashlib
+import io
 import json
 import logging
 import requests
 import time
 from django.conf import settings
 from typing import Dict, List, Optional
+from utils.redis_client import get_redis
+from utils.storage.oss_storage import image_storage
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from .rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
 # 尝试导入dashscope SDK
 try:
     import dashscope
-    from dashscope import ImageSynthesis, Generation, VideoSynthesis, Files
+    from dashscope import ImageSynthesis, Generation, VideoSynthesis
     DASHSCOPE_AVAILABLE = True
 except ImportError:
     DASHSCOPE_AVAILABLE = False
     logger.warning('DashScope SDK未安装，请运行: pip install dashscope')
 
+# 尝试导入Pillow（用于缩小视频首帧图片）
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    logger.warning('Pillow未安装，视频首帧图片不会缩小，请运行: pip install Pillow')
+
+
+class WanxiangError(Exception):
+    """阿里万相调用失败（retryable 表示重试是否可能成功）"""
+    retryable = False
+
+
+class WanxiangThrottled(WanxiangError):
+    """服务端限流（429 / Throttling.*），稍后重试"""
+    retryable = True
+
+
+class WanxiangTransientError(WanxiangError):
+    """临时错误（网络异常、超时、服务端5xx等），可以重试"""
+    retryable = True
+
+
+class WanxiangInvalidInput(WanxiangError, ValueError):
+    """参数或配置错误（API密钥、模型、请求参数、账户状态等），重试不会成功"""
+    retryable = False
+
+
+class WanxiangContentPolicy(WanxiangError):
+    """内容安全审核未通过，重试不会成功"""
+    retryable = False
+
+
+# DashScope错误码 -> 异常类型（按前缀匹配）
+ERROR_CODE_CLASSES = (
+    ('Throttling', WanxiangThrottled),
+    ('DataInspectionFailed', WanxiangContentPolicy),
+    ('IPInfringementSuspect', WanxiangContentPolicy),
+    ('InvalidParameter', WanxiangInvalidInput),
+    ('InvalidApiKey', WanxiangInvalidInput),
+    ('InvalidURL', WanxiangInvalidInput),
+    ('Arrearage', WanxiangInvalidInput),
+    ('AccessDenied', WanxiangInvalidInput),
+    ('ModelNotFound', WanxiangInvalidInput),
+)
+
+
+def classify_response_error(rsp, label: str) -> WanxiangError:
+    """
+    根据DashScope返回的HTTP状态码和错误码生成对应类型的异常
+
+    Args:
+        rsp: DashScope SDK返回的响应
+        label: 操作名称（用于错误信息）
+    """
+    status_code = getattr(rsp, 'status_code', None)
+    code = getattr(rsp, 'code', None) or ''
+    error_msg = getattr(rsp, 'message', None) or '未知错误'
+    message = f'{label}失败: [{code or status_code}] {error_msg}'
+    
+    for prefix, error_class in ERROR_CODE_CLASSES:
+        if code.startswith(prefix):
+            return error_class(message)
+    if status_code == 429:
+        return WanxiangThrottled(message)
+    if status_code in (400, 401, 403, 404):
+        return WanxiangInvalidInput(message)
+    return WanxiangTransientError(message)
+
+
+# DashScope熔断器（图片、文字、视频、Files共用）
+dashscope_breaker = CircuitBreaker('dashscope')
+
 
 class WanxiangService:
     """阿里万相服务类"""
@@ -39,24 +119,15 @@ class WanxiangService:
             dashscope.api_key = self.api_key
             dashscope.base_url = f"https://{self.endpoint}/api/v1"
     
-    def generate_image(self, prompt: str, style: str = 'beautiful', count: int = 1) -> List[Dict]:
+    def build_image_request(self, prompt: str, style: str = 'beautiful', count: int = 1) -> Dict:
         """
-        生成图片（使用DashScope SDK）
+        构建图片生成请求参数（也用作生成结果缓存的键）
         
         Args:
             prompt: 图片描述提示词
             style: 图片风格（beautiful, abstract, realistic, minimalist, artistic）
             count: 生成数量（1-3）
-        
-        Returns:
-            List[Dict]: 生成的图片信息列表，每个包含url和metadata
         """
-        if not self.api_key:
-            raise ValueError('阿里万相API密钥未配置')
-        
-        if not DASHSCOPE_AVAILABLE:
-            raise ValueError('DashScope SDK未安装，请运行: pip install dashscope')
-        
         # 构建完整的prompt
         style_map = {
             'beautiful': '唯美风格',
@@ -68,14 +139,44 @@ class WanxiangService:
         style_text = style_map.get(style, '唯美风格')
         full_prompt = f'{prompt}，{style_text}，高质量，精美'
         
+        return {
+            'model': self.model_image,
+            'prompt': full_prompt,
+            'n': min(count, 3),  # 最多3张
+            'size': '1024*1024',
+            'quality': 'standard',
+            'style': style
+        }
+    
+    def generate_image(self, prompt: str, style: str = 'beautiful', count: int = 1) -> List[Dict]:
+        """
+        生成图片（使用DashScope SDK）
+        
+        Args:
+            prompt: 图片描述提示词
+            style: 图片风格（beautiful, abstract, realistic, minimalist, artistic）
+            count: 生成数量（1-3）
+        
+        Returns:
+            List[Dict]: 生成的图片信息列表，每个包含url和metadata
+        """
+        self._check_config()
+        
+        request = self.build_image_request(prompt, style, count)
+        full_prompt = request['prompt']
+        
+        # 限流：令牌不足且等待超时时抛出RateLimited（不包装为普通异常，由任务重新投递）
+        rate_limiter.acquire('image', request['model'])
+        
         try:
             # 使用DashScope SDK调用图片生成API
-            rsp = ImageSynthesis.call(
-                model=self.model_image,
+            rsp = self._call_dashscope(
+                ImageSynthesis.call,
+                model=request['model'],
                 prompt=full_prompt,
-                n=min(count, 3),  # 最多3张
-                size='1024*1024',
-                quality='standard'
+                n=request['n'],
+                size=request['size'],
+                quality=request['quality']
             )
             
             if rsp.status_code == 200:
@@ -93,18 +194,35 @@ class WanxiangService:
                             })
                 
                 if not images:
-                    raise Exception('API返回成功但未生成图片')
+                    raise WanxiangTransientError('API返回成功但未生成图片')
                 
                 logger.info(f'阿里万相图片生成成功，返回 {len(images)} 张图片')
                 return images
             else:
-                error_msg = rsp.message if hasattr(rsp, 'message') else '未知错误'
-                logger.error(f'阿里万相图片生成失败: {error_msg}, Request ID: {rsp.request_id if hasattr(rsp, "request_id") else "N/A"}')
-                raise Exception(f'图片生成失败: {error_msg}')
+                error = classify_response_error(rsp, '图片生成')
+                logger.error(f'阿里万相{error}, Request ID: {rsp.request_id if hasattr(rsp, "request_id") else "N/A"}')
+                raise error
         
+        except WanxiangError:
+            raise
         except Exception as e:
+            # SDK或网络异常按临时错误处理
             logger.error(f'阿里万相图片生成异常: {str(e)}', exc_info=True)
-            raise Exception(f'图片生成失败: {str(e)}')
+            raise WanxiangTransientError(f'图片生成失败: {str(e)}') from e
+    
+    def build_text_request(self, prompt: str, max_tokens: int = 500) -> Dict:
+        """构建文字生成请求参数（也用作生成结果缓存的键）"""
+        return {
+            'model': self.model_text,
+            'messages': [
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ],
+            'max_tokens': max_tokens,
+            'temperature': 0.7
+        }
     
     def generate_text(self, prompt: str, max_tokens: int = 500) -> str:
         """
@@ -117,29 +235,22 @@ class WanxiangService:
         Returns:
             str: 生成的文字内容
         """
-        if not self.api_key:
-            raise ValueError('阿里万相API密钥未配置')
+        self._check_config()
         
-        if not DASHSCOPE_AVAILABLE:
-            raise ValueError('DashScope SDK未安装，请运行: pip install dashscope')
+        request = self.build_text_request(prompt, max_tokens)
+        rate_limiter.acquire('text', request['model'])
         
         try:
             # 使用DashScope SDK调用文字生成API（通义千问）
             from dashscope import Generation
             
-            messages = [
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ]
-            
-            rsp = Generation.call(
-                model=self.model_text,
-                messages=messages,
+            rsp = self._call_dashscope(
+                Generation.call,
+                model=request['model'],
+                messages=request['messages'],
                 result_format='message',
-                max_tokens=max_tokens,
-                temperature=0.7
+                max_tokens=request['max_tokens'],
+                temperature=request['temperature']
             )
             
             if rsp.status_code == 200:
@@ -148,93 +259,299 @@ class WanxiangService:
                 elif 'output' in rsp and 'text' in rsp.output:
                     return rsp.output.text
                 else:
-                    raise Exception('API返回格式异常')
+                    raise WanxiangTransientError('API返回格式异常')
             else:
-                error_msg = rsp.message if hasattr(rsp, 'message') else '未知错误'
-                logger.error(f'阿里万相文字生成失败: {error_msg}')
-                raise Exception(f'文字生成失败: {error_msg}')
+                error = classify_response_error(rsp, '文字生成')
+                logger.error(f'阿里万相{error}')
+                raise error
         
+        except WanxiangError:
+            raise
         except Exception as e:
             logger.error(f'阿里万相文字生成异常: {str(e)}', exc_info=True)
-            raise Exception(f'文字生成失败: {str(e)}')
+            raise WanxiangTransientError(f'文字生成失败: {str(e)}') from e
     
-    def upload_image_to_dashscope(self, image_url: str) -> str:
+    def stream_text(self, prompt: str, max_tokens: int = 500):
+        """
+        流式生成文字内容（增量输出，模型每生成一段就返回一段）
+        
+        Args:
+            prompt: 文字生成提示词
+            max_tokens: 最大token数
+        
+        Yields:
+            str: 新生成的文字片段
+        """
+        self._check_config()
+        
+        request = self.build_text_request(prompt, max_tokens)
+        rate_limiter.acquire('text', request['model'])
+        
+        responses = None
+        try:
+            from dashscope import Generation
+            
+            responses = self._call_dashscope(
+                Generation.call,
+                model=request['model'],
+                messages=request['messages'],
+                result_format='message',
+                max_tokens=request['max_tokens'],
+                temperature=request['temperature'],
+                stream=True,
+                incremental_output=True
+            )
+            
+            for rsp in responses:
+                if rsp.status_code != 200:
+                    error = classify_response_error(rsp, '文字生成')
+                    logger.error(f'阿里万相{error}')
+                    raise error
+                choices = self._output_value(rsp.output, 'choices')
+                if choices:
+                    delta = choices[0].message.content
+                    if delta:
+                        yield delta
+        
+        except WanxiangError:
+            raise
+        except Exception as e:
+            if responses is not None:
+                # 流式输出过程中断开（网络异常等），发起调用时的异常已由_call_dashscope记录
+                dashscope_breaker.record_failure()
+            logger.error(f'阿里万相流式文字生成异常: {str(e)}', exc_info=True)
+            raise WanxiangTransientError(f'文字生成失败: {str(e)}') from e
+    
+    def upload_image_to_dashscope(self, image_url: str, oss_name: Optional[str] = None) -> str:
         """
         将图片上传到DashScope Files服务，返回DashScope文件URL
         
+        上传结果按图片标识（OSS对象+ETag，或外部URL）缓存，有效期内重复使用同一file_id；
+        图片直接在内存中读取（OSS对象从OSS读取），超过模型输入尺寸时先缩小
+        
         Args:
             image_url: 原始图片URL
+            oss_name: 图片在image_storage中的文件名（已知时从OSS读取并按ETag缓存）
         
         Returns:
             str: DashScope Files服务返回的文件ID（格式：fileid://xxx）或原始URL
         """
         try:
-            import tempfile
-            import os
-            
-            # 下载图片
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
+            cache_id = self._image_cache_id(image_url, oss_name)
+            cached = self._get_cached_file_url(cache_id)
+            if cached:
+                logger.info(f'复用DashScope Files上传结果: {cached}')
+                return cached
             
-            # 保存到临时文件
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg', mode='wb') as tmp_file:
-                tmp_file.write(response.content)
-                tmp_path = tmp_file.name
+            data = self._read_image_bytes(image_url, oss_name)
+            data = self._downscale_image(data)
             
-            try:
-                # 上传到DashScope Files服务
-                # purpose='file-extract' 用于文件提取，也可以尝试其他purpose
-                upload_rsp = Files.upload(file_path=tmp_path, purpose='file-extract')
-                
-                if upload_rsp.status_code == 200 and upload_rsp.output:
-                    # 提取file_id（output结构：{'uploaded_files': [{'file_id': '...'}]}）
-                    uploaded_files = getattr(upload_rsp.output, 'uploaded_files', None)
-                    if uploaded_files and len(uploaded_files) > 0:
-                        file_id = uploaded_files[0].get('file_id') if isinstance(uploaded_files[0], dict) else getattr(uploaded_files[0], 'file_id', None)
-                        if file_id:
-                            # 使用fileid://格式
-                            dashscope_url = f'fileid://{file_id}'
-                            logger.info(f'图片已上传到DashScope Files，file_id: {file_id}')
-                            return dashscope_url
-                    
-                    # 如果没有file_id，尝试其他格式
-                    file_id = getattr(upload_rsp.output, 'file_id', None)
-                    if file_id:
-                        dashscope_url = f'fileid://{file_id}'
-                        logger.info(f'图片已上传到DashScope Files，file_id: {file_id}')
-                        return dashscope_url
-                
-                error_msg = upload_rsp.message if hasattr(upload_rsp, 'message') else '未知错误'
-                logger.warning(f'上传图片到DashScope Files失败，未获取到file_id: {error_msg}')
-                return image_url
-            finally:
-                # 清理临时文件
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+            file_id = self._upload_file_bytes(data, f'{hashlib.sha1(cache_id.encode()).hexdigest()[:16]}.jpg')
+            dashscope_url = f'fileid://{file_id}'
+            logger.info(f'图片已上传到DashScope Files，file_id: {file_id}')
+            self._set_cached_file_url(cache_id, dashscope_url)
+            return dashscope_url
         except Exception as e:
             logger.warning(f'上传图片到DashScope Files失败，使用原始URL: {str(e)}')
             return image_url
     
-    def generate_text_to_video(self, prompt: str, duration: int = 5, resolution: str = '720p') -> Dict:
+    @staticmethod
+    def _image_cache_id(image_url: str, oss_name: Optional[str]) -> str:
+        """图片标识：OSS对象使用路径+ETag（内容变化时失效），外部URL去掉签名参数"""
+        if oss_name:
+            full_path = image_storage._get_full_path(oss_name)
+            etag = image_storage.bucket.head_object(full_path).etag
+            return f'oss:{full_path}:{etag}'
+        return f'url:{image_url.split("?", 1)[0]}'
+    
+    @staticmethod
+    def _file_cache_key(cache_id: str) -> str:
+        return 'aigc:dsfile:' + hashlib.sha256(cache_id.encode('utf-8')).hexdigest()
+    
+    def _get_cached_file_url(self, cache_id: str) -> Optional[str]:
+        """读取已上传的DashScope文件URL（Redis不可用时视为未缓存）"""
+        try:
+            return get_redis().get(self._file_cache_key(cache_id))
+        except Exception as e:
+            logger.warning(f'读取DashScope文件缓存失败: {str(e)}')
+            return None
+    
+    def _set_cached_file_url(self, cache_id: str, dashscope_url: str):
+        try:
+            get_redis().set(self._file_cache_key(cache_id), dashscope_url, ex=settings.AIGC_DASHSCOPE_FILE_TTL)
+        except Exception as e:
+            logger.warning(f'写入DashScope文件缓存失败: {str(e)}')
+    
+    @staticmethod
+    def _read_image_bytes(image_url: str, oss_name: Optional[str]) -> bytes:
+        """在内存中读取图片（OSS对象直接从OSS读取，不经过签名URL）"""
+        if oss_name:
+            return image_storage.bucket.get_object(image_storage._get_full_path(oss_name)).read()
+        response = requests.get(image_url, timeout=30)
+        response.raise_for_status()
+        return response.content
+    
+    @staticmethod
+    def _downscale_image(data: bytes) -> bytes:
+        """图片超过模型输入尺寸时等比缩小（未安装Pillow或未配置时原样返回）"""
+        max_side = settings.AIGC_VIDEO_FRAME_MAX_SIDE
+        if not PIL_AVAILABLE or not max_side:
+            return data
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                if max(image.size) <= max_side:
+                    return data
+                original_size = image.size
+                image = image.convert('RGB')
+                image.thumbnail((max_side, max_side), Image.LANCZOS)
+                output = io.BytesIO()
+                image.save(output, format='JPEG', quality=90)
+            logger.info(f'首帧图片缩小: {original_size} -> {image.size}')
+            return output.getvalue()
+        except Exception as e:
+            logger.warning(f'缩小图片失败，使用原图: {str(e)}')
+            return data
+    
+    def _upload_file_bytes(self, data: bytes, filename: str) -> str:
         """
-        文生视频（直接基于文本提示词生成视频，不需要图片）
-        
-        Args:
-            prompt: 视频描述提示词
-            duration: 视频时长（秒，通常5-10秒）
-            resolution: 视频分辨率（480p, 720p, 1080p）
+        直接调用DashScope Files接口上传内存中的文件（无需临时文件）
         
         Returns:
-            Dict: 生成的视频信息，包含url和metadata
+            str: file_id
         """
+        response = dashscope_breaker.call(
+            requests.post,
+            f'https://{self.endpoint}/api/v1/files',
+            headers={'Authorization': f'Bearer {self.api_key}'},
+            files={'files': (filename, data, 'image/jpeg')},
+            # purpose='file-extract' 用于文件提取
+            data={'purpose': 'file-extract', 'descriptions': filename},
+            timeout=60
+        )
+        response.raise_for_status()
+        result = response.json()
+        
+        # 返回结构：{'data': {'uploaded_files': [{'file_id': '...'}]}}
+        uploaded_files = (result.get('data') or {}).get('uploaded_files') or []
+        if uploaded_files and uploaded_files[0].get('file_id'):
+            return uploaded_files[0]['file_id']
+        
+        error_msg = result.get('message') or (result.get('data') or {}).get('failed_uploads') or '未知错误'
+        raise Exception(f'未获取到file_id: {error_msg}')
+    
+    def _call_dashscope(self, func, *args, **kwargs):
+        """
+        经过熔断器调用DashScope SDK
+        
+        网络异常和5xx响应计为故障；熔断中时抛出WanxiangTransientError（可重试），不再请求DashScope
+        """
+        try:
+            dashscope_breaker.before_call()
+        except CircuitOpenError as e:
+            raise WanxiangTransientError(str(e)) from e
+        
+        try:
+            rsp = func(*args, **kwargs)
+        except Exception:
+            dashscope_breaker.record_failure()
+            raise
+        
+        if (getattr(rsp, 'status_code', None) or 200) >= 500:
+            dashscope_breaker.record_failure()
+        else:
+            dashscope_breaker.record_success()
+        return rsp
+    
+    def _check_config(self):
+        """检查API密钥和SDK"""
         if not self.api_key:
-            raise ValueError('阿里万相API密钥未配置')
+            raise WanxiangInvalidInput('阿里万相API密钥未配置')
         
         if not DASHSCOPE_AVAILABLE:
-            raise ValueError('DashScope SDK未安装，请运行: pip install dashscope')
+            raise WanxiangInvalidInput('DashScope SDK未安装，请运行: pip install dashscope')
+    
+    def _check_video_config(self):
+        """检查视频生成所需的配置"""
+        self._check_config()
         
         if not self.model_video:
-            raise ValueError('视频生成模型未配置，请在.env中设置ALIBABA_WANXIANG_MODEL_VIDEO')
+            raise WanxiangInvalidInput('视频生成模型未配置，请在.env中设置ALIBABA_WANXIANG_MODEL_VIDEO')
+    
+    @staticmethod
+    def _output_value(output, key):
+        """读取DashScope返回output中的字段（兼容对象和字典两种格式）"""
+        if output is None:
+            return None
+        if isinstance(output, dict):
+            return output.get(key)
+        return getattr(output, key, None)
+    
+    def prepare_first_frame_url(self, image_url: str, oss_name: Optional[str] = None) -> str:
+        """
+        准备首帧图片URL（优先上传到DashScope Files，否则修正OSS endpoint）
+        
+        Args:
+            image_url: 首帧图片URL
+            oss_name: 图片在image_storage中的文件名（可选）
+        """
+        # 先尝试上传图片到DashScope Files服务（wan2.2-i2v-flash可能需要）
+        logger.info(f'上传图片到DashScope Files: {image_url[:50]}...')
+        dashscope_image_url = self.upload_image_to_dashscope(image_url, oss_name)
+        
+        # 如果上传成功返回了fileid://格式，使用DashScope URL
+        if dashscope_image_url.startswith('fileid://'):
+            logger.info(f'使用DashScope Files URL: {dashscope_image_url}')
+            return dashscope_image_url
+        
+        # 否则使用原始URL（但确保endpoint正确）
+        # 从Django配置中获取OSS endpoint，而不是硬编码
+        configured_endpoint = settings.OSS_ENDPOINT.replace('https://', '').replace('http://', '').strip('/')
+        if 'oss-rg-china-mainland' in dashscope_image_url:
+            # 如果配置的endpoint包含区域信息，使用它；否则使用默认的北京区域
+            if 'oss-cn-' in configured_endpoint:
+                # 从配置的endpoint提取区域信息
+                region_match = configured_endpoint.split('oss-cn-')[1].split('.')[0]
+                target_endpoint = f'oss-cn-{region_match}'
+            else:
+                target_endpoint = 'oss-cn-beijing'
+            dashscope_image_url = dashscope_image_url.replace('oss-rg-china-mainland', target_endpoint)
+            logger.info(f'已修正URL endpoint: {dashscope_image_url[:50]}...')
+        return dashscope_image_url
+    
+    def _submission_result(self, rsp, metadata: Dict, label: str) -> Dict:
+        """解析视频任务提交结果"""
+        if rsp.status_code != 200:
+            error = classify_response_error(rsp, label)
+            logger.error(f'阿里万相{error}, Request ID: {rsp.request_id if hasattr(rsp, "request_id") else "N/A"}')
+            raise error
+        
+        task_id = self._output_value(rsp.output, 'task_id')
+        video_url = self._output_value(rsp.output, 'video_url')
+        if not task_id and not video_url:
+            raise WanxiangTransientError('API返回成功但未生成视频URL或任务ID')
+        
+        metadata['task_id'] = task_id
+        logger.info(f'{label}任务已提交，Task ID: {task_id}')
+        return {
+            'task_id': task_id,
+            'url': video_url,
+            'metadata': metadata
+        }
+    
+    def submit_text_to_video(self, prompt: str, duration: int = 5, resolution: str = '720p') -> Dict:
+        """
+        提交文生视频任务（不等待结果）
+        
+        Args:
+            prompt: 视频描述提示词
+            duration: 视频时长（秒，通常5-10秒）
+            resolution: 视频分辨率（480p, 720p, 1080p）
+        
+        Returns:
+            Dict: 包含task_id（DashScope任务ID）、url（同步返回时的视频URL）和metadata
+        """
+        self._check_video_config()
+        rate_limiter.acquire('video', self.model_video)
         
         try:
             # 解析分辨率到尺寸
@@ -245,151 +562,55 @@ class WanxiangService:
             }
             size = resolution_map.get(resolution, '720*720')
             
-            # 使用DashScope SDK调用视频生成API（文生视频）
-            # 只需要prompt参数，不需要img_url
-            logger.info(f'调用文生视频API，模型: {self.model_video}, 提示词: {prompt[:50]}...')
-            rsp = VideoSynthesis.call(
+            # 异步提交文生视频任务，只需要prompt参数，不需要img_url
+            logger.info(f'提交文生视频任务，模型: {self.model_video}, 提示词: {prompt[:50]}...')
+            rsp = self._call_dashscope(
+                VideoSynthesis.async_call,
                 model=self.model_video,
-                prompt=prompt,  # 只使用prompt参数（文生视频）
+                prompt=prompt,
                 duration=duration,
                 size=size
             )
-            
-            # 视频生成是异步的，需要检查任务状态
-            if rsp.status_code == 200:
-                # 检查是否有task_id（异步任务）
-                if hasattr(rsp.output, 'task_id') and rsp.output.task_id:
-                    # 异步任务，需要轮询获取结果
-                    task_id = rsp.output.task_id
-                    logger.info(f'文生视频任务已创建，Task ID: {task_id}，开始轮询结果...')
-                    
-                    # 轮询获取结果（最多等待5分钟）
-                    max_wait_time = 300  # 5分钟
-                    start_time = time.time()
-                    poll_interval = 5  # 每5秒轮询一次
-                    
-                    while time.time() - start_time < max_wait_time:
-                        time.sleep(poll_interval)
-                        status_rsp = VideoSynthesis.call(
-                            model=self.model_video,
-                            task=task_id
-                        )
-                        
-                        if status_rsp.status_code == 200:
-                            if hasattr(status_rsp.output, 'video_url') and status_rsp.output.video_url:
-                                video_info = {
-                                    'url': status_rsp.output.video_url,
-                                    'metadata': {
-                                        'prompt': prompt,
-                                        'duration': duration,
-                                        'resolution': resolution,
-                                        'task_id': task_id
-                                    }
-                                }
-                                logger.info(f'阿里万相文生视频成功，视频URL: {status_rsp.output.video_url}')
-                                return video_info
-                            elif hasattr(status_rsp.output, 'status'):
-                                status = status_rsp.output.status
-                                if status == 'FAILED':
-                                    error_msg = getattr(status_rsp.output, 'message', '视频生成失败')
-                                    raise Exception(f'视频生成失败: {error_msg}')
-                                elif status == 'SUCCEEDED':
-                                    # 理论上这里应该有video_url，如果没有则报错
-                                    raise Exception('视频生成任务成功但未返回视频URL')
-                                else:
-                                    logger.info(f'文生视频任务 {task_id} 状态: {status}')
-                        else:
-                            error_msg = status_rsp.message if hasattr(status_rsp, 'message') else '未知错误'
-                            logger.error(f'轮询文生视频任务 {task_id} 失败: {error_msg}')
-                            raise Exception(f'视频生成失败: {error_msg}')
-                    
-                    raise Exception(f'文生视频任务超时（{max_wait_time}秒）')
-                
-                elif hasattr(rsp.output, 'video_url') and rsp.output.video_url:
-                    # 同步任务（如果API支持）
-                    video_info = {
-                        'url': rsp.output.video_url,
-                        'metadata': {
-                            'prompt': prompt,
-                            'duration': duration,
-                            'resolution': resolution,
-                            'task_id': rsp.output.task_id if hasattr(rsp.output, 'task_id') else None
-                        }
-                    }
-                    logger.info(f'阿里万相文生视频成功（同步），视频URL: {rsp.output.video_url}')
-                    return video_info
-                else:
-                    raise Exception('API返回成功但未生成视频URL或任务ID')
-            else:
-                error_msg = rsp.message if hasattr(rsp, 'message') else '未知错误'
-                logger.error(f'阿里万相文生视频失败: {error_msg}, Request ID: {rsp.request_id if hasattr(rsp, "request_id") else "N/A"}')
-                raise Exception(f'文生视频失败: {error_msg}')
+            return self._submission_result(rsp, {
+                'prompt': prompt,
+                'duration': duration,
+                'resolution': resolution
+            }, '文生视频')
         
+        except WanxiangError:
+            raise
         except Exception as e:
-            logger.error(f'阿里万相文生视频异常: {str(e)}', exc_info=True)
-            raise Exception(f'文生视频失败: {str(e)}')
+            logger.error(f'阿里万相文生视频提交异常: {str(e)}', exc_info=True)
+            raise WanxiangTransientError(f'文生视频失败: {str(e)}') from e
     
-    def generate_video(self, image_url: str, prompt: str, duration: int = 5, resolution: str = '720p') -> Dict:
+    def submit_video(self, image_url: str, prompt: str, duration: int = 5, resolution: str = '720p',
+                     prepare_image: bool = True) -> Dict:
         """
-        生成视频（图生视频，基于首帧图片）
+        提交图生视频任务（基于首帧图片，不等待结果）
         
         Args:
             image_url: 首帧图片URL（歌词配图）
             prompt: 视频描述提示词
             duration: 视频时长（秒，通常5-10秒）
             resolution: 视频分辨率（480p, 720p, 1080p）
+            prepare_image: 是否先处理首帧图片（上传DashScope Files），已处理过的URL传False
         
         Returns:
-            Dict: 生成的视频信息，包含url和metadata
+            Dict: 包含task_id（DashScope任务ID）、url（同步返回时的视频URL）和metadata
         """
-        if not self.api_key:
-            raise ValueError('阿里万相API密钥未配置')
-        
-        if not DASHSCOPE_AVAILABLE:
-            raise ValueError('DashScope SDK未安装，请运行: pip install dashscope')
-        
-        if not self.model_video:
-            raise ValueError('视频生成模型未配置，请在.env中设置ALIBABA_WANXIANG_MODEL_VIDEO')
+        self._check_video_config()
+        final_image_url = self.prepare_first_frame_url(image_url) if prepare_image else image_url
+        rate_limiter.acquire('video', self.model_video)
         
         try:
-            # 先尝试上传图片到DashScope Files服务（wan2.2-i2v-flash可能需要）
-            logger.info(f'上传图片到DashScope Files: {image_url[:50]}...')
-            dashscope_image_url = self.upload_image_to_dashscope(image_url)
-            
-            # 如果上传成功返回了fileid://格式，使用DashScope URL
-            # 否则使用原始URL（但确保endpoint正确）
-            if dashscope_image_url.startswith('fileid://'):
-                final_image_url = dashscope_image_url
-                logger.info(f'使用DashScope Files URL: {final_image_url}')
-            else:
-                # 确保URL使用正确的endpoint
-                # 从Django配置中获取OSS endpoint，而不是硬编码
-                from django.conf import settings
-                configured_endpoint = settings.OSS_ENDPOINT.replace('https://', '').replace('http://', '').strip('/')
-                if 'oss-rg-china-mainland' in dashscope_image_url:
-                    # 如果配置的endpoint包含区域信息，使用它；否则使用默认的北京区域
-                    if 'oss-cn-' in configured_endpoint:
-                        # 从配置的endpoint提取区域信息
-                        region_match = configured_endpoint.split('oss-cn-')[1].split('.')[0] if 'oss-cn-' in configured_endpoint else 'beijing'
-                        target_endpoint = f'oss-cn-{region_match}'
-                    else:
-                        # 如果配置的endpoint不是区域endpoint，默认使用北京区域
-                        target_endpoint = 'oss-cn-beijing'
-                    dashscope_image_url = dashscope_image_url.replace('oss-rg-china-mainland', target_endpoint)
-                    logger.info(f'已修正URL endpoint: {dashscope_image_url[:50]}...')
-                final_image_url = dashscope_image_url
             
             # 解析分辨率到尺寸
-            resolution_map = {
+            size_map = {
                 '480p': '480*480',
                 '720p': '720*720',
                 '1080p': '1080*1080'
             }
-            size = resolution_map.get(resolution, '720*720')
-            
-            # 使用DashScope SDK调用视频生成API（图生视频）
-            # 根据官方API文档，使用input参数结构
-            logger.info(f'调用视频生成API，模型: {self.model_video}, 图片URL: {final_image_url[:50]}...')
+            size = size_map.get(resolution, '720*720')
             
             # 解析分辨率格式（API需要480P格式，不是480p）
             resolution_map = {
@@ -399,8 +620,10 @@ class WanxiangService:
             }
             resolution_param = resolution_map.get(resolution, '720P')
             
-            # 使用extra_input传递parameters（根据DashScope SDK文档）
-            rsp = VideoSynthesis.call(
+            # 异步提交图生视频任务，使用extra_input传递parameters（根据DashScope SDK文档）
+            logger.info(f'提交视频生成任务，模型: {self.model_video}, 图片URL: {final_image_url[:50]}...')
+            rsp = self._call_dashscope(
+                VideoSynthesis.async_call,
                 model=self.model_video,
                 img_url=final_image_url,  # 使用DashScope Files URL或修正后的OSS URL
                 prompt=prompt,
@@ -411,95 +634,97 @@ class WanxiangService:
                     'prompt_extend': True  # 启用提示词扩展
                 }
             )
-            
-            # 视频生成可能是同步或异步的，需要检查返回结果
-            if rsp.status_code == 200:
-                # 先检查是否有video_url（同步返回）
-                video_url = None
-                task_id = None
-                
-                if hasattr(rsp.output, 'video_url') and rsp.output.video_url:
-                    video_url = rsp.output.video_url
-                    logger.info(f'视频生成成功（同步），视频URL: {video_url[:50]}...')
-                elif isinstance(rsp.output, dict) and rsp.output.get('video_url'):
-                    video_url = rsp.output.get('video_url')
-                    logger.info(f'视频生成成功（同步），视频URL: {video_url[:50]}...')
-                
-                # 检查是否有task_id（异步任务）
-                if not video_url:
-                    if hasattr(rsp.output, 'task_id') and rsp.output.task_id:
-                        task_id = rsp.output.task_id
-                    elif isinstance(rsp.output, dict) and rsp.output.get('task_id'):
-                        task_id = rsp.output.get('task_id')
-                    
-                    if task_id:
-                        logger.info(f'视频生成任务已创建（异步），Task ID: {task_id}，开始轮询结果...')
-                        
-                        # 轮询获取结果（最多等待5分钟）
-                        max_wait_time = 300  # 5分钟
-                        start_time = time.time()
-                        poll_interval = 5  # 每5秒轮询一次
-                        
-                        while time.time() - start_time < max_wait_time:
-                            time.sleep(poll_interval)
-                            status_rsp = VideoSynthesis.call(
-                                model=self.model_video,
-                                task=task_id
-                            )
-                            
-                            if status_rsp.status_code == 200:
-                                # 检查返回的video_url
-                                if hasattr(status_rsp.output, 'video_url') and status_rsp.output.video_url:
-                                    video_url = status_rsp.output.video_url
-                                    break
-                                elif isinstance(status_rsp.output, dict) and status_rsp.output.get('video_url'):
-                                    video_url = status_rsp.output.get('video_url')
-                                    break
-                                elif hasattr(status_rsp.output, 'task_status'):
-                                    task_status = status_rsp.output.task_status
-                                    if task_status == 'FAILED':
-                                        error_msg = getattr(status_rsp.output, 'message', '视频生成失败')
-                                        raise Exception(f'视频生成失败: {error_msg}')
-                                    elif task_status == 'SUCCEEDED':
-                                        # 成功但可能video_url在output中
-                                        if hasattr(status_rsp.output, 'video_url') and status_rsp.output.video_url:
-                                            video_url = status_rsp.output.video_url
-                                            break
-                                        elif isinstance(status_rsp.output, dict) and status_rsp.output.get('video_url'):
-                                            video_url = status_rsp.output.get('video_url')
-                                            break
-                                    logger.debug(f'视频生成中，状态: {task_status}')
-                            else:
-                                error_msg = status_rsp.message if hasattr(status_rsp, 'message') else '未知错误'
-                                logger.error(f'查询视频生成状态失败: {error_msg}')
-                                raise Exception(f'查询视频生成状态失败: {error_msg}')
-                        
-                        if not video_url:
-                            raise Exception('视频生成超时，请稍后查询任务状态')
-                
-                # 返回视频信息
-                if video_url:
-                    video_info = {
-                        'url': video_url,
-                        'metadata': {
-                            'prompt': prompt,
-                            'duration': duration,
-                            'resolution': resolution,
-                            'task_id': task_id if task_id else None
-                        }
-                    }
-                    logger.info(f'阿里万相视频生成成功，视频URL: {video_url[:50]}...')
-                    return video_info
-                else:
-                    raise Exception('API返回成功但未生成视频URL或任务ID')
-            else:
-                error_msg = rsp.message if hasattr(rsp, 'message') else '未知错误'
-                logger.error(f'阿里万相视频生成失败: {error_msg}, Request ID: {rsp.request_id if hasattr(rsp, "request_id") else "N/A"}')
-                raise Exception(f'视频生成失败: {error_msg}')
+            return self._submission_result(rsp, {
+                'prompt': prompt,
+                'duration': duration,
+                'resolution': resolution
+            }, '视频生成')
         
+        except WanxiangError:
+            raise
         except Exception as e:
-            logger.error(f'阿里万相视频生成异常: {str(e)}', exc_info=True)
-            raise Exception(f'视频生成失败: {str(e)}')
+            logger.error(f'阿里万相视频生成提交异常: {str(e)}', exc_info=True)
+            raise WanxiangTransientError(f'视频生成失败: {str(e)}') from e
+    
+    def query_video_task(self, task_id: str) -> Dict:
+        """
+        查询视频生成任务状态（单次查询，不等待）
+        
+        Args:
+            task_id: DashScope任务ID
+        
+        Returns:
+            Dict: 包含status（PENDING/RUNNING/SUCCEEDED/FAILED/CANCELED/UNKNOWN）、url、message
+        """
+        if not DASHSCOPE_AVAILABLE:
+            raise WanxiangInvalidInput('DashScope SDK未安装，请运行: pip install dashscope')
+        
+        # 轮询不等待令牌，令牌不足时由轮询任务稍后再查
+        rate_limiter.acquire('video_query', self.model_video, max_wait=0)
+        rsp = self._call_dashscope(VideoSynthesis.fetch, task_id)
+        if rsp.status_code != 200:
+            raise classify_response_error(rsp, '查询视频生成状态')
+        
+        video_url = self._output_value(rsp.output, 'video_url')
+        status = self._output_value(rsp.output, 'task_status') or self._output_value(rsp.output, 'status')
+        if video_url:
+            status = 'SUCCEEDED'
+        elif status == 'SUCCEEDED':
+            # 成功但未返回视频URL，按失败处理
+            status = 'FAILED'
+        
+        return {
+            'status': status or 'UNKNOWN',
+            'url': video_url,
+            'message': self._output_value(rsp.output, 'message') or ''
+        }
+    
+    def wait_video_task(self, submission: Dict, max_wait_time: int = 300, poll_interval: int = 5) -> Dict:
+        """
+        阻塞等待视频任务完成（仅供脚本/调试使用，Celery任务中请使用轮询任务）
+        
+        Args:
+            submission: submit_video/submit_text_to_video 的返回值
+            max_wait_time: 最长等待时间（秒）
+            poll_interval: 轮询间隔（秒）
+        
+        Returns:
+            Dict: 生成的视频信息，包含url和metadata
+        """
+        if submission.get('url'):
+            return {'url': submission['url'], 'metadata': submission['metadata']}
+        
+        task_id = submission['task_id']
+        start_time = time.time()
+        while time.time() - start_time < max_wait_time:
+            time.sleep(poll_interval)
+            result = self.query_video_task(task_id)
+            if result['status'] == 'SUCCEEDED':
+                logger.info(f'阿里万相视频生成成功，视频URL: {result["url"][:50]}...')
+                return {'url': result['url'], 'metadata': submission['metadata']}
+            if result['status'] in ('FAILED', 'CANCELED'):
+                raise WanxiangError(f'视频生成失败: {result["message"] or result["status"]}')
+            logger.debug(f'视频任务 {task_id} 状态: {result["status"]}')
+        
+        raise WanxiangTransientError(f'视频生成任务超时（{max_wait_time}秒）')
+    
+    def generate_text_to_video(self, prompt: str, duration: int = 5, resolution: str = '720p') -> Dict:
+        """
+        文生视频（阻塞等待结果，兼容旧调用方式）
+        
+        Returns:
+            Dict: 生成的视频信息，包含url和metadata
+        """
+        return self.wait_video_task(self.submit_text_to_video(prompt, duration, resolution))
+    
+    def generate_video(self, image_url: str, prompt: str, duration: int = 5, resolution: str = '720p') -> Dict:
+        """
+        图生视频（阻塞等待结果，兼容旧调用方式）
+        
+        Returns:
+            Dict: 生成的视频信息，包含url和metadata
+        """
+        return self.wait_video_task(self.submit_video(image_url, prompt, duration, resolution))
 
 
 # 创建全局服务实例
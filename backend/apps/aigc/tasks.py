@@ -2,31 +2,83 @@
 AIGC Celery异步任务
 """
 import logging
+import math
 import requests
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
-from django.core.files.base import ContentFile
-from .models import AIGCGenerationTask, AIGCContent
+from .models import AIGCGenerationTask, AIGCContent, AIGCBatchJob, AIGCCampaign, PRIORITY_BULK
 from .services.wanxiang_service import wanxiang_service
 from .services.prompt_builder import PromptBuilder
+from .services.generation_cache import generation_cache
+from .services.single_flight import single_flight, FlightInProgress
+from .services.rate_limiter import RateLimited
+from .services.summary_tracker import summary_tracker, comment_fingerprint
+from .services.batch_inference import batch_client, build_request_line, parse_result_line, REMOTE_FINAL_STATUS
+from .services.key_frame import build_lyric_image_request, find_key_frame, KEY_FRAME_GENERATED
 from apps.comments.models import Comment
 from utils.storage.oss_storage import image_storage, video_storage
+from utils.storage.transfer import transfer_url_to_storage
+from utils.task_queues import QUEUE_TEXT, queue_for_task_type, queue_options
+from utils.retry_policy import is_retryable, backoff_countdown
 
 logger = logging.getLogger(__name__)
 
 
+def _lane_options(task: AIGCGenerationTask) -> dict:
+    """任务所在通道的投递参数（按任务类型选择队列，批量优先级进入批量队列，并带任务优先级）"""
+    queue = queue_for_task_type(task.task_type, bulk=task.priority >= PRIORITY_BULK)
+    return queue_options(queue, priority=task.priority)
+
+
+def enqueue_generation(task: AIGCGenerationTask, countdown: int = None):
+    """
+    按任务类型将生成任务投递到对应队列（text/image/video），并使用该队列的超时
+    
+    任务优先级作为Celery消息优先级，批量优先级的任务进入对应的批量队列（见 utils/task_queues.py）
+    """
+    options = _lane_options(task)
+    if countdown:
+        options['countdown'] = countdown
+    return generate_aigc_content.apply_async(args=[task.task_id], **options)
+
+
 @shared_task(bind=True, max_retries=3)
 def generate_aigc_content(self, task_id: int):
     """
     生成AIGC内容的异步任务
     
+    每个阶段完成后在任务上记录检查点（AIGCGenerationTask.checkpoints），
+    重试时跳过已完成的阶段，不会重复调用模型或重复创建内容记录
+    
     Args:
         task_id: 生成任务ID
     """
     try:
         task = AIGCGenerationTask.objects.get(task_id=task_id)
+        if task.coalesced_with_id:
+            logger.info(f'AIGC任务 {task_id} 已合并到任务 {task.coalesced_with_id}，跳过')
+            return
+        
+        # 只执行待执行或执行中（重试）的任务，已结束的任务（如活动取消时标记失败）不再生成
+        started = AIGCGenerationTask.objects.filter(
+            task_id=task_id, status__in=('pending', 'processing')
+        ).update(status='processing')
+        if not started:
+            logger.info(f'AIGC任务 {task_id} 状态为 {task.status}，跳过')
+            return
         task.status = 'processing'
-        task.save(update_fields=['status'])
+        
+        # 相同任务正在执行时合并到该任务，等待其结果
+        leader_id = single_flight.join(task)
+        if leader_id:
+            _attach_to_leader(task, leader_id)
+            return
         
         song = task.song
         task_type = task.task_type
@@ -41,35 +93,53 @@ def generate_aigc_content(self, task_id: int):
             _generate_comment_summary(task, song, parameters)
         
         elif task_type == 'lyric_video':
-            # 生成歌词视频（图生视频）
-            _generate_lyric_video(task, song, parameters)
+            # 提交歌词视频（图生视频），结果由轮询任务处理，不占用worker等待
+            _submit_lyric_video(task, song, parameters)
+            return
         
         elif task_type == 'text_to_video':
-            # 生成文生视频（直接基于文本生成）
-            _generate_text_to_video(task, song, parameters)
+            # 提交文生视频，结果由轮询任务处理
+            _submit_text_to_video(task, song, parameters)
+            return
         
         else:
             raise ValueError(f'不支持的任务类型: {task_type}')
         
         # 标记任务完成
-        task.status = 'completed'
-        task.completed_at = timezone.now()
-        task.save(update_fields=['status', 'completed_at'])
-        
-        logger.info(f'AIGC任务 {task_id} 完成')
+        _mark_task_completed(task)
+    
+    except FlightInProgress as e:
+        # 依赖的配图任务与其他任务合并，稍后继续（已完成的阶段有检查点，不计入重试次数）
+        logger.info(f'AIGC任务 {task_id} 等待合并的任务 {e.leader_id} 完成，{settings.AIGC_SINGLE_FLIGHT_WAIT}秒后继续')
+        enqueue_generation(task, countdown=settings.AIGC_SINGLE_FLIGHT_WAIT)
+    
+    except RateLimited as e:
+        # DashScope调用限流，稍后重新投递（已完成的阶段有检查点，不计入重试次数）
+        logger.info(f'AIGC任务 {task_id} 被限流（{e.bucket}），{math.ceil(e.retry_after)}秒后继续')
+        enqueue_generation(task, countdown=math.ceil(e.retry_after))
+    
+    except AIGCGenerationTask.DoesNotExist:
+        logger.error(f'AIGC任务 {task_id} 不存在')
     
     except Exception as e:
         logger.error(f'AIGC任务 {task_id} 失败: {str(e)}', exc_info=True)
         
-        # 更新任务状态
         task = AIGCGenerationTask.objects.get(task_id=task_id)
-        task.status = 'failed'
-        task.error_message = str(e)
-        task.completed_at = timezone.now()
-        task.save(update_fields=['status', 'error_message', 'completed_at'])
+        retryable = is_retryable(e)
+        if retryable and self.request.retries < self.max_retries:
+            # 还有重试机会：只记录错误，保留检查点，重试时从最后完成的阶段继续
+            countdown = backoff_countdown(self.request.retries)
+            task.error_message = f'第{self.request.retries + 1}次执行失败，{countdown}秒后重试: {str(e)}'
+            task.save(update_fields=['error_message'])
+            raise self.retry(exc=e, countdown=countdown)
         
-        # 重试
-        raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
+        # 永久错误或重试次数用尽，标记失败（视频已生成但转存失败时保留原始URL）
+        if not retryable:
+            logger.warning(f'AIGC任务 {task_id} 遇到不可重试的错误（{type(e).__name__}），直接失败')
+        if _save_raw_video_content(task, e):
+            return
+        _mark_task_failed(task, str(e))
+        raise
 
 
 def _generate_lyric_images(task: AIGCGenerationTask, song, parameters: dict):
@@ -78,73 +148,218 @@ def _generate_lyric_images(task: AIGCGenerationTask, song, parameters: dict):
     count = parameters.get('count', 2)
     lyrics_section = parameters.get('lyrics_section', 'chorus')
     
-    # 提取歌词关键段落
-    lyrics = song.lyrics or ''
-    lyrics_key = PromptBuilder.extract_lyrics_key_section(lyrics, lyrics_section)
+    if task.get_checkpoint('contents_saved'):
+        logger.info(f'AIGC任务 {task.task_id} 配图内容已保存，跳过')
+        return
     
-    # 构建提示词
-    prompt = PromptBuilder.build_lyric_image_prompt(
-        song_title=song.title,
-        artist=song.artist,
-        lyrics=lyrics_key,
-        style=style
-    )
+    images = task.get_checkpoint('images_generated')
+    cache_key = (task.get_checkpoint('generation_cache') or {}).get('key')
+    if images is None:
+        # 构建提示词
+        prompt, image_request = build_lyric_image_request(song, style, count, lyrics_section)
+        
+        # 相同请求已生成过时直接复用OSS中的图片
+        cache_key, cached = _lookup_generation_cache(task, parameters, 'image', image_request)
+        if cached:
+            _save_cached_images(task, cached)
+            return
+        
+        # 调用阿里万相生成图片
+        images = wanxiang_service.generate_image(prompt, style, count)
+        task.save_checkpoint('images_generated', images)
+    else:
+        logger.info(f'AIGC任务 {task.task_id} 从检查点恢复已生成的 {len(images)} 张图片')
+    cache_status = 'miss' if cache_key else 'bypass'
     
-    # 调用阿里万相生成图片
-    images = wanxiang_service.generate_image(prompt, style, count)
+    # 并发下载图片并上传到OSS，失败的图片单独记录
+    jobs = [
+        (idx, image_info, f'aigc/images/{song.song_id}/{task.task_id}_{idx + 1}.jpg')
+        for idx, image_info in enumerate(images) if image_info.get('url')
+    ]
+    results = _store_images_concurrently([(image_info['url'], filename) for _, image_info, filename in jobs])
     
     # 保存生成的内容
-    for idx, image_info in enumerate(images):
-        image_url = image_info.get('url', '')
+    contents = []
+    for (idx, image_info, filename), (transfer, error) in zip(jobs, results):
+        image_url = image_info['url']
         metadata = image_info.get('metadata', {})
         
-        if image_url:
-            # 下载图片并上传到OSS
+        if error is None:
+            contents.append(AIGCContent(
+                task=task,
+                content_type='image',
+                content_url=image_url,
+                content_file=filename,
+                metadata={
+                    **metadata,
+                    **transfer.as_metadata(),
+                    'style': style,
+                    'lyrics_section': lyrics_section,
+                    'width': 1024,
+                    'height': 1024,
+                    'generation_cache': cache_status
+                },
+                status='pending_review'
+            ))
+            logger.info(f'歌词配图生成成功: {filename}')
+        else:
+            logger.error(f'下载或保存图片失败: {image_url[:80]}, 错误: {error}')
+            # 即使下载失败，也保存URL记录
+            contents.append(AIGCContent(
+                task=task,
+                content_type='image',
+                content_url=image_url,
+                metadata={
+                    **metadata,
+                    'oss_upload_failed': True,
+                    'error': error,
+                    'generation_cache': cache_status
+                },
+                status='pending_review'
+            ))
+    
+    # 内容记录与检查点一起提交，重试时不会重复创建
+    with transaction.atomic():
+        AIGCContent.objects.bulk_create(contents)
+        task.save_checkpoint('contents_saved')
+    
+    # 全部图片都已转存到OSS时写入缓存
+    if cache_key and contents and all(content.content_file for content in contents):
+        generation_cache.set(cache_key, {
+            'task_id': task.task_id,
+            'images': [
+                {
+                    'filename': content.content_file.name,
+                    'content_url': content.content_url,
+                    'metadata': content.metadata
+                }
+                for content in contents
+            ]
+        })
+
+
+def _lookup_generation_cache(task: AIGCGenerationTask, parameters: dict, kind: str, request: dict):
+    """
+    查询生成结果缓存，并在任务检查点中记录结果（hit/miss/bypass）
+    
+    任务参数 use_cache=false 时跳过缓存
+    
+    Returns:
+        tuple: (缓存键, 缓存内容)，跳过缓存时缓存键为None，未命中时缓存内容为None
+    """
+    if not parameters.get('use_cache', True) or not generation_cache.enabled:
+        task.save_checkpoint('generation_cache', {'status': 'bypass'})
+        return None, None
+    
+    cache_key = generation_cache.make_key(kind, request)
+    cached = generation_cache.get(kind, cache_key)
+    task.save_checkpoint('generation_cache', {'status': 'hit' if cached else 'miss', 'key': cache_key})
+    if cached:
+        logger.info(f'AIGC任务 {task.task_id} 命中生成结果缓存，复用任务 {cached.get("task_id")} 的结果')
+    return cache_key, cached
+
+
+def _save_cached_images(task: AIGCGenerationTask, cached: dict):
+    """使用缓存中的OSS图片创建内容记录"""
+    contents = [
+        AIGCContent(
+            task=task,
+            content_type='image',
+            content_url=item['content_url'],
+            content_file=item['filename'],
+            metadata={
+                **item.get('metadata', {}),
+                'generation_cache': 'hit',
+                'cached_from_task_id': cached.get('task_id')
+            },
+            status='pending_review'
+        )
+        for item in cached['images']
+    ]
+    with transaction.atomic():
+        AIGCContent.objects.bulk_create(contents)
+        task.save_checkpoint('contents_saved')
+
+
+def _store_images_concurrently(jobs) -> list:
+    """
+    在有界线程池中并发下载并上传图片（共享HTTP连接池）
+    
+    Args:
+        jobs: [(图片URL, OSS文件名), ...]
+    
+    Returns:
+        list: 与jobs一一对应的 (TransferResult, 错误信息)，成功时错误信息为None
+    """
+    if not jobs:
+        return []
+    
+    # bucket延迟初始化不是线程安全的，先在当前线程初始化
+    _ = image_storage.bucket
+    
+    workers = max(1, min(settings.AIGC_IMAGE_FETCH_WORKERS, len(jobs)))
+    results = [(None, None)] * len(jobs)
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        
+        futures = {
+            executor.submit(
+                transfer_url_to_storage, image_url, image_storage, filename,
+                session=session, content_type='image/jpeg',
+                max_size=settings.AIGC_TRANSFER_IMAGE_MAX_SIZE, timeout=(10, 30)
+            ): idx
+            for idx, (image_url, filename) in enumerate(jobs)
+        }
+        for future in as_completed(futures):
             try:
-                response = requests.get(image_url, timeout=30)
-                response.raise_for_status()
-                
-                # 生成文件名
-                filename = f'aigc/images/{song.song_id}/{task.task_id}_{idx + 1}.jpg'
-                
-                # 保存到OSS
-                content_file = ContentFile(response.content)
-                image_storage.save(filename, content_file)
-                
-                # 创建内容记录
-                AIGCContent.objects.create(
-                    task=task,
-                    content_type='image',
-                    content_url=image_url,
-                    content_file=filename,
-                    metadata={
-                        **metadata,
-                        'style': style,
-                        'lyrics_section': lyrics_section,
-                        'width': 1024,
-                        'height': 1024
-                    },
-                    status='pending_review'
-                )
-                
-                logger.info(f'歌词配图生成成功: {filename}')
-            
+                results[futures[future]] = (future.result(), None)
             except Exception as e:
-                logger.error(f'下载或保存图片失败: {str(e)}')
-                # 即使下载失败，也保存URL记录
-                AIGCContent.objects.create(
-                    task=task,
-                    content_type='image',
-                    content_url=image_url,
-                    metadata=metadata,
-                    status='pending_review'
-                )
+                results[futures[future]] = (None, str(e))
+    return results
 
 
 def _generate_comment_summary(task: AIGCGenerationTask, song, parameters: dict):
     """生成评论摘要"""
     comment_range = parameters.get('comment_range', 'hot')  # all, hot, latest
     
+    if task.get_checkpoint('contents_saved'):
+        logger.info(f'AIGC任务 {task.task_id} 摘要内容已保存，跳过')
+        return
+    
+    summary = task.get_checkpoint('summary_generated')
+    if summary is None:
+        summary = _build_comment_summary(task, song, parameters)
+        task.save_checkpoint('summary_generated', summary)
+    
+    # 保存生成的内容（与检查点一起提交）
+    with transaction.atomic():
+        AIGCContent.objects.create(
+            task=task,
+            content_type='text',
+            content_text=summary['text'],
+            metadata={
+                'comment_range': comment_range,
+                'comment_count': summary['comment_count'],
+                'word_count': len(summary['text']),
+                'comment_fingerprint': summary.get('comment_fingerprint'),
+                'generation_cache': summary.get('generation_cache')
+            },
+            status='pending_review'
+        )
+        task.save_checkpoint('contents_saved')
+    
+    logger.info(f'评论摘要生成成功: {task.task_id}')
+
+
+def _select_summary_comments(song, comment_range: str) -> list:
+    """
+    选取生成摘要用的评论（最多10条）
+    
+    Raises:
+        ValueError: 歌曲没有可用的评论
+    """
     # 获取评论
     comments_query = Comment.objects.filter(
         song=song,
@@ -176,42 +391,53 @@ def _generate_comment_summary(task: AIGCGenerationTask, song, parameters: dict):
     if not comments.exists():
         raise ValueError('该歌曲暂无有效评论，无法生成评论摘要')
     
+    return list(comments)
+
+
+def _build_comment_summary(task: AIGCGenerationTask, song, parameters: dict) -> dict:
+    """选取评论并调用模型生成摘要（相同评论和提示词命中缓存时直接复用）"""
+    comments = _select_summary_comments(song, parameters.get('comment_range', 'hot'))
+    
     # 构建提示词
     prompt = PromptBuilder.build_comment_summary_prompt(
         song_title=song.title,
         artist=song.artist,
-        comments=list(comments)
+        comments=comments
     )
     
+    cache_key, cached = _lookup_generation_cache(
+        task, parameters, 'text', wanxiang_service.build_text_request(prompt, max_tokens=300)
+    )
+    fingerprint = comment_fingerprint(comments)
+    if cached:
+        return {**cached, 'comment_fingerprint': fingerprint, 'generation_cache': 'hit'}
+    
     # 调用阿里万相生成文字
     summary_text = wanxiang_service.generate_text(prompt, max_tokens=300)
     
-    # 保存生成的内容
-    AIGCContent.objects.create(
-        task=task,
-        content_type='text',
-        content_text=summary_text,
-        metadata={
-            'comment_range': comment_range,
-            'comment_count': comments.count(),
-            'word_count': len(summary_text)
-        },
-        status='pending_review'
-    )
-    
-    logger.info(f'评论摘要生成成功: {task.task_id}')
+    summary = {
+        'text': summary_text,
+        'comment_count': len(comments),
+        'comment_fingerprint': fingerprint
+    }
+    if cache_key:
+        generation_cache.set(cache_key, {**summary, 'task_id': task.task_id})
+    return {**summary, 'generation_cache': 'miss' if cache_key else 'bypass'}
 
 
-def _generate_lyric_video(task: AIGCGenerationTask, song, parameters: dict):
-    """生成歌词视频（基于已有配图）"""
+def _submit_lyric_video(task: AIGCGenerationTask, song, parameters: dict):
+    """提交歌词视频任务（基于已有配图）"""
+    if _resume_video_polling(task):
+        return
+    
     style = parameters.get('style', 'beautiful')
     duration = parameters.get('duration', 5)  # 视频时长（秒）
     resolution = parameters.get('resolution', '720p')  # 分辨率
-    use_existing_image = parameters.get('use_existing_image', True)  # 是否使用已有配图
     
-    # 提取歌词关键段落
-    lyrics = song.lyrics or ''
-    lyrics_key = PromptBuilder.extract_lyrics_key_section(lyrics, parameters.get('lyrics_section', 'chorus'))
+    # 提取歌词关键段落（使用歌曲保存的歌词结构索引）
+    lyrics_key = PromptBuilder.extract_lyrics_key_section(
+        section_type=parameters.get('lyrics_section', 'chorus'), song=song
+    )
     
     # 构建提示词
     prompt = PromptBuilder.build_lyric_video_prompt(
@@ -223,197 +449,846 @@ def _generate_lyric_video(task: AIGCGenerationTask, song, parameters: dict):
     logger.info(f'生成歌词视频Prompt: {prompt}')
     
     # 获取首帧图片
-    image_url = None
-    if use_existing_image:
-        # 查找该歌曲已发布的配图
-        existing_images = AIGCContent.objects.filter(
-            task__song=song,
-            task__task_type='lyric_image',
-            content_type='image',
-            status='published'
-        ).order_by('-published_at')
-        
-        if existing_images.exists():
-            image_content = existing_images.first()
-            image_url = image_content.display_url or image_content.content_url
-            logger.info(f'使用已有配图生成视频: {image_url}')
-        else:
-            # 如果没有已发布的配图，先生成一张
-            logger.warning(f'歌曲 {song.title} 没有已发布的配图，先生成配图')
-            # 创建临时配图任务（简化处理，直接生成）
-            temp_task = AIGCGenerationTask.objects.create(
-                task_type='lyric_image',
-                song=song,
-                operator=task.operator,
-                parameters={'style': style, 'count': 1},
-                status='processing'
+    first_frame = _resolve_key_frame(task, song, parameters, parameters.get('lyrics_section', 'chorus'))
+    
+    _submit_video_stage(task, first_frame, prompt, duration, resolution, {
+        'style': style,
+        'duration': duration,
+        'resolution': resolution,
+        'key_frame_source': first_frame.get('source')
+    })
+
+
+def _submit_text_to_video(task: AIGCGenerationTask, song, parameters: dict):
+    """提交文生视频任务（先获取首帧图片，再用图片生成视频）"""
+    if _resume_video_polling(task):
+        return
+    
+    style = parameters.get('style', 'beautiful')
+    duration = parameters.get('duration', 5)
+    resolution = parameters.get('resolution', '720p')
+    mood = parameters.get('mood', '治愈')
+    
+    # 第一步：获取首帧图片（已发布或缓存的配图，没有时生成）
+    first_frame = _resolve_key_frame(task, song, parameters, 'chorus')
+    
+    # 第二步：使用生成的图片生成视频
+    # 构建视频提示词
+    prompt = PromptBuilder.build_text_to_video_prompt(
+        song_title=song.title,
+        artist=song.artist,
+        song=song,
+        style=style,
+        mood=mood
+    )
+    
+    logger.info(f'文生视频：第二步，使用配图提交视频任务，Prompt: {prompt[:100]}...')
+    
+    _submit_video_stage(task, first_frame, prompt, duration, resolution, {
+        'style': style,
+        'mood': mood,
+        'duration': duration,
+        'resolution': resolution,
+        'key_frame_source': first_frame.get('source')
+    })
+
+
+def _resolve_key_frame(task: AIGCGenerationTask, song, parameters: dict, lyrics_section: str) -> dict:
+    """
+    获取视频首帧（歌词视频和文生视频共用）
+    
+    依次使用：已发布的配图、生成结果缓存中的配图、新生成的配图（use_existing_image=false时直接生成），
+    结果及来源记录在检查点中
+    
+    Returns:
+        dict: {'image_url', 'source', ...}
+    """
+    first_frame = task.get_checkpoint('first_frame')
+    if first_frame:
+        logger.info(f'AIGC任务 {task.task_id} 从检查点恢复首帧（来源: {first_frame.get("source")}）')
+        return first_frame
+    
+    style = parameters.get('style', 'beautiful')
+    if parameters.get('use_existing_image', True):
+        first_frame = find_key_frame(song, style, lyrics_section, use_cache=parameters.get('use_cache', True))
+    
+    if first_frame is None:
+        logger.info(f'歌曲 {song.title} 没有可用的配图，先生成配图')
+        try:
+            temp_task, temp_image = _generate_first_frame_image(
+                task, song, {'style': style, 'count': 1, 'lyrics_section': lyrics_section}
             )
+        except (FlightInProgress, RateLimited):
+            raise
+        except Exception as e:
+            logger.error(f'生成首帧配图失败: {str(e)}')
+            if is_retryable(e):
+                # 保留原异常类型，由任务按重试策略处理
+                raise
+            raise ValueError(f'无法获取首帧图片: {str(e)}') from e
+        first_frame = {
+            'image_url': temp_image.display_url or temp_image.content_url,
+            'oss_name': temp_image.content_file.name or None,
+            'source': KEY_FRAME_GENERATED,
+            'image_task_id': temp_task.task_id,
+        }
+    
+    task.save_checkpoint('first_frame', first_frame)
+    return first_frame
+
+
+def _generate_first_frame_image(task: AIGCGenerationTask, song, image_parameters: dict):
+    """
+    通过临时配图任务生成视频首帧图片
+    
+    临时任务ID记录在检查点中；相同配图正在生成时，临时任务合并到该任务，
+    并抛出FlightInProgress，由调用方稍后重新执行
+    
+    Returns:
+        tuple: (临时配图任务, 生成的图片内容)
+    """
+    checkpoint = task.get_checkpoint('first_frame_task')
+    temp_task = None
+    if checkpoint:
+        temp_task = AIGCGenerationTask.objects.filter(task_id=checkpoint['task_id']).first()
+    
+    if temp_task is None or temp_task.status == 'failed':
+        # 创建临时配图任务（上次失败时重新创建）
+        temp_task = AIGCGenerationTask.objects.create(
+            task_type='lyric_image',
+            song=song,
+            operator=task.operator,
+            parameters=image_parameters,
+            priority=task.priority,
+            status='processing'
+        )
+        task.save_checkpoint('first_frame_task', {'task_id': temp_task.task_id})
+    
+    if temp_task.status == 'processing':
+        if temp_task.coalesced_with_id is None:
+            leader_id = single_flight.join(temp_task)
+            if leader_id:
+                _attach_to_leader(temp_task, leader_id)
+                temp_task.refresh_from_db()
+        
+        if temp_task.coalesced_with_id is None:
             try:
-                _generate_lyric_images(temp_task, song, {'style': style, 'count': 1})
-                temp_image = AIGCContent.objects.filter(task=temp_task, content_type='image').first()
-                if temp_image:
-                    image_url = temp_image.display_url or temp_image.content_url
-                    logger.info(f'临时生成配图用于视频: {image_url}')
+                _generate_lyric_images(temp_task, song, image_parameters)
+            except RateLimited:
+                # 限流不算失败，临时任务保持处理中，稍后由主任务继续
+                raise
             except Exception as e:
-                logger.error(f'生成临时配图失败: {str(e)}')
+                _mark_task_failed(temp_task, str(e))
+                raise
+            _mark_task_completed(temp_task)
+        elif temp_task.status == 'processing':
+            raise FlightInProgress(temp_task.coalesced_with_id)
     
-    if not image_url:
-        raise ValueError('无法获取首帧图片，请先生成歌词配图或设置use_existing_image=false')
+    if temp_task.status != 'completed':
+        raise ValueError(f'配图任务 {temp_task.task_id} 失败: {temp_task.error_message}')
     
-    # 调用阿里万相生成视频
-    video_info = wanxiang_service.generate_video(
-        image_url=image_url,
+    temp_image = AIGCContent.objects.filter(task=temp_task, content_type='image').first()
+    if not temp_image:
+        raise ValueError('图片生成失败，无法继续生成视频')
+    return temp_task, temp_image
+
+
+def _submit_video_stage(task: AIGCGenerationTask, first_frame: dict, prompt: str,
+                        duration: int, resolution: str, extra_metadata: dict):
+    """上传首帧到DashScope并提交图生视频任务（首帧在OSS中时按对象缓存上传结果）"""
+    dashscope_file = task.get_checkpoint('dashscope_file')
+    if dashscope_file is None:
+        dashscope_file = {'image_url': wanxiang_service.prepare_first_frame_url(
+            first_frame['image_url'], first_frame.get('oss_name')
+        )}
+        task.save_checkpoint('dashscope_file', dashscope_file)
+    
+    # 提交阿里万相图生视频任务
+    submission = wanxiang_service.submit_video(
+        image_url=dashscope_file['image_url'],
         prompt=prompt,
         duration=duration,
-        resolution=resolution
+        resolution=resolution,
+        prepare_image=False
     )
+    _start_video_polling(task, submission, extra_metadata)
+
+
+def _resume_video_polling(task: AIGCGenerationTask) -> bool:
+    """已提交过远程视频任务时直接恢复轮询（视频已生成时继续转存），不重复提交"""
+    video_result = task.get_checkpoint('video_result')
+    if video_result:
+        logger.info(f'AIGC任务 {task.task_id} 视频已生成，从检查点继续转存')
+        _save_video_content(task, video_result['url'], video_result['metadata'])
+        _mark_task_completed(task)
+        return True
     
-    # 下载视频并上传到OSS
-    video_url = video_info.get('url', '')
-    if not video_url:
-        raise ValueError('视频生成失败，未返回视频URL')
+    remote_video = task.get_checkpoint('remote_video')
+    if not remote_video:
+        return False
     
-    try:
-        # 下载视频
-        response = requests.get(video_url, timeout=120, stream=True)
-        response.raise_for_status()
+    logger.info(f'AIGC任务 {task.task_id} 从检查点恢复轮询，DashScope Task ID: {remote_video["task_id"]}')
+    poll_video_generation.apply_async(
+        args=[task.task_id],
+        kwargs={'attempt': 0, 'metadata': remote_video['metadata']},
+        countdown=_video_poll_countdown(0),
+        **_lane_options(task)
+    )
+    return True
+
+
+def _start_video_polling(task: AIGCGenerationTask, submission: dict, extra_metadata: dict):
+    """
+    记录DashScope任务ID并安排轮询
+    
+    如果接口同步返回了视频URL，则直接保存内容并完成任务
+    """
+    metadata = {**submission.get('metadata', {}), **extra_metadata}
+    
+    if submission.get('url'):
+        _save_video_content(task, submission['url'], metadata)
+        _mark_task_completed(task)
+        return
+    
+    task.remote_task_id = submission['task_id']
+    task.remote_submitted_at = timezone.now()
+    task.checkpoints = {
+        **(task.checkpoints or {}),
+        'remote_video': {'task_id': task.remote_task_id, 'metadata': metadata}
+    }
+    task.save(update_fields=['remote_task_id', 'remote_submitted_at', 'checkpoints'])
+    
+    poll_video_generation.apply_async(
+        args=[task.task_id],
+        kwargs={'attempt': 0, 'metadata': metadata},
+        countdown=_video_poll_countdown(0),
+        **_lane_options(task)
+    )
+    logger.info(f'AIGC任务 {task.task_id} 已提交视频生成，DashScope Task ID: {task.remote_task_id}')
+
+
+def _video_poll_countdown(attempt: int) -> int:
+    """轮询间隔（指数退避，有上限）"""
+    interval = settings.AIGC_VIDEO_POLL_INTERVAL * (settings.AIGC_VIDEO_POLL_BACKOFF ** attempt)
+    return int(min(interval, settings.AIGC_VIDEO_POLL_MAX_INTERVAL))
+
+
+def _mark_task_completed(task: AIGCGenerationTask):
+    """标记任务完成（清除重试过程中记录的错误信息），并处理合并到该任务的任务"""
+    task.status = 'completed'
+    task.error_message = None
+    task.completed_at = timezone.now()
+    task.save(update_fields=['status', 'error_message', 'completed_at'])
+    logger.info(f'AIGC任务 {task.task_id} 完成')
+    
+    single_flight.leave(task)
+    _resolve_followers(task)
+
+
+def _mark_task_failed(task: AIGCGenerationTask, error_message: str):
+    """标记任务失败，并处理合并到该任务的任务"""
+    task.status = 'failed'
+    task.error_message = error_message
+    task.completed_at = timezone.now()
+    task.save(update_fields=['status', 'error_message', 'completed_at'])
+    logger.error(f'AIGC任务 {task.task_id} 失败: {error_message}')
+    
+    single_flight.leave(task)
+    _resolve_followers(task)
+
+
+def _attach_to_leader(task: AIGCGenerationTask, leader_id: int):
+    """将任务合并到正在执行的相同任务"""
+    task.coalesced_with_id = leader_id
+    task.save(update_fields=['coalesced_with'])
+    logger.info(f'AIGC任务 {task.task_id} 与正在执行的任务 {leader_id} 合并')
+    
+    # leader可能在合并之前刚好结束，此时直接处理
+    leader = AIGCGenerationTask.objects.get(task_id=leader_id)
+    if leader.status in ('completed', 'failed'):
+        _resolve_follower(task.task_id, leader)
+
+
+def _resolve_followers(leader: AIGCGenerationTask):
+    """leader结束后处理所有合并到它的任务"""
+    follower_ids = list(leader.followers.filter(status='processing').values_list('task_id', flat=True))
+    for follower_id in follower_ids:
+        _resolve_follower(follower_id, leader)
+
+
+def _resolve_follower(follower_id: int, leader: AIGCGenerationTask):
+    """复用leader的内容完成合并的任务（leader失败时同样标记失败）"""
+    with transaction.atomic():
+        follower = AIGCGenerationTask.objects.select_for_update().get(task_id=follower_id)
+        if follower.status != 'processing':
+            return
         
+        if leader.status == 'completed':
+            AIGCContent.objects.bulk_create([
+                AIGCContent(
+                    task=follower,
+                    content_type=content.content_type,
+                    content_url=content.content_url,
+                    content_file=content.content_file.name or None,
+                    content_video_file=content.content_video_file.name or None,
+                    content_text=content.content_text,
+                    metadata={**content.metadata, 'coalesced_from_task_id': leader.task_id},
+                    status='pending_review'
+                )
+                for content in leader.aigccontent_set.all()
+            ])
+            follower.status = 'completed'
+            follower.error_message = None
+        else:
+            follower.status = 'failed'
+            follower.error_message = f'合并的任务 {leader.task_id} 失败: {leader.error_message}'
+        follower.completed_at = timezone.now()
+        follower.save(update_fields=['status', 'error_message', 'completed_at'])
+    
+    logger.info(f'AIGC任务 {follower_id} 已根据合并的任务 {leader.task_id} 结束，状态: {follower.status}')
+
+
+def _save_video_content(task: AIGCGenerationTask, video_url: str, metadata: dict):
+    """
+    下载生成的视频并上传到OSS，创建内容记录（重复调用不会重复转存或创建记录）
+    
+    转存失败时抛出异常，由调用的任务按重试策略重试（视频URL记录在检查点中，重试时不重新生成）；
+    重试用尽后由 _save_raw_video_content 保存原始URL
+    """
+    if task.aigccontent_set.filter(content_type='video').exists():
+        logger.info(f'AIGC任务 {task.task_id} 视频内容已保存，跳过')
+        return
+    
+    if task.get_checkpoint('video_result') is None:
+        task.save_checkpoint('video_result', {'url': video_url, 'metadata': metadata})
+    
+    artifact = task.get_checkpoint('artifact_stored')
+    if artifact is None:
         # 生成文件名
-        import uuid
-        filename = f'aigc/videos/{song.song_id}/{task.task_id}.mp4'
-        
-        # 保存到OSS
-        content_file = ContentFile(response.content)
-        video_storage.save(filename, content_file)
-        oss_url = video_storage.url(filename)
+        filename = f'aigc/videos/{task.song_id}/{task.task_id}.mp4'
         
-        # 创建内容记录
-        AIGCContent.objects.create(
-            task=task,
-            content_type='video',
-            content_url=oss_url,
-            content_video_file=filename,
-            metadata={
-                **video_info.get('metadata', {}),
-                'style': style,
-                'original_video_url': video_url,
-                'duration': duration,
-                'resolution': resolution
-            },
-            status='pending_review'
+        # 流式转存到OSS（大文件分片上传，不在内存中缓存完整视频）
+        transfer = transfer_url_to_storage(video_url, video_storage, filename, content_type='video/mp4')
+        artifact = {'filename': filename, **transfer.as_metadata()}
+        task.save_checkpoint('artifact_stored', artifact)
+    
+    filename = artifact['filename']
+    
+    # 创建内容记录
+    AIGCContent.objects.create(
+        task=task,
+        content_type='video',
+        content_url=video_storage.url(filename),
+        content_video_file=filename,
+        metadata={
+            **metadata,
+            'file_size': artifact.get('file_size'),
+            'sha256': artifact.get('sha256'),
+            'original_video_url': video_url
+        },
+        status='pending_review'
+    )
+    
+    logger.info(f'视频生成成功: {filename}')
+
+
+def _save_raw_video_content(task: AIGCGenerationTask, error: Exception) -> bool:
+    """
+    转存重试用尽：保存原始视频URL（会过期，需尽快审核处理）并完成任务
+    
+    Returns:
+        bool: 是否保存（视频尚未生成或内容已保存时返回False）
+    """
+    video_result = task.get_checkpoint('video_result')
+    if not video_result or task.aigccontent_set.filter(content_type='video').exists():
+        return False
+    
+    AIGCContent.objects.create(
+        task=task,
+        content_type='video',
+        content_url=video_result['url'],
+        metadata={
+            **video_result['metadata'],
+            'oss_upload_failed': True,
+            'error': str(error)
+        },
+        status='pending_review'
+    )
+    logger.warning(f'视频已生成但OSS上传失败，使用原始URL: {video_result["url"]}')
+    _mark_task_completed(task)
+    return True
+
+
+@shared_task(bind=True, max_retries=3)
+def poll_video_generation(self, task_id: int, attempt: int = 0, metadata: dict = None):
+    """
+    轮询DashScope视频生成任务（单次查询后重新入队，不阻塞worker）
+    
+    Args:
+        task_id: 生成任务ID
+        attempt: 已轮询次数（用于计算退避间隔）
+        metadata: 提交时的视频元数据（提示词、风格、时长等）
+    """
+    try:
+        task = AIGCGenerationTask.objects.get(task_id=task_id)
+    except AIGCGenerationTask.DoesNotExist:
+        logger.warning(f'AIGC任务 {task_id} 不存在，停止轮询')
+        return
+    
+    if metadata is None:
+        metadata = (task.get_checkpoint('remote_video') or {}).get('metadata', {})
+    
+    if task.status != 'processing' or not task.remote_task_id:
+        logger.info(f'AIGC任务 {task_id} 状态为 {task.status}，停止轮询')
+        return
+    
+    elapsed = (timezone.now() - task.remote_submitted_at).total_seconds() if task.remote_submitted_at else 0
+    
+    try:
+        result = wanxiang_service.query_video_task(task.remote_task_id)
+    except RateLimited as e:
+        # 查询被限流，本次不计入轮询次数
+        poll_video_generation.apply_async(
+            args=[task_id],
+            kwargs={'attempt': attempt, 'metadata': metadata},
+            countdown=max(math.ceil(e.retry_after), 1),
+            **_lane_options(task)
         )
-        
-        logger.info(f'歌词视频生成成功: {filename}')
+        return
+    except Exception as e:
+        # 查询失败（网络抖动等）不影响远端任务，继续轮询直到超时
+        logger.warning(f'查询视频任务 {task.remote_task_id} 失败: {str(e)}')
+        result = {'status': 'UNKNOWN', 'url': None, 'message': str(e)}
+    
+    status = result['status']
+    if status == 'SUCCEEDED':
+        try:
+            _save_video_content(task, result['url'], metadata)
+        except Exception as e:
+            # 已转存的产物记录在检查点中，重试时不会重复下载
+            logger.error(f'保存视频内容失败: {str(e)}', exc_info=True)
+            if is_retryable(e) and self.request.retries < self.max_retries:
+                raise self.retry(exc=e, countdown=backoff_countdown(self.request.retries))
+            if not _save_raw_video_content(task, e):
+                _mark_task_failed(task, f'保存视频内容失败: {str(e)}')
+            return
+        _mark_task_completed(task)
+        return
+    
+    if status in ('FAILED', 'CANCELED'):
+        _mark_task_failed(task, f'视频生成失败: {result["message"] or status}')
+        return
+    
+    if elapsed >= settings.AIGC_VIDEO_POLL_TIMEOUT:
+        _mark_task_failed(task, f'视频生成任务超时（{settings.AIGC_VIDEO_POLL_TIMEOUT}秒），DashScope Task ID: {task.remote_task_id}')
+        return
+    
+    logger.debug(f'视频任务 {task.remote_task_id} 状态: {status}，第{attempt + 1}次轮询')
+    poll_video_generation.apply_async(
+        args=[task_id],
+        kwargs={'attempt': attempt + 1, 'metadata': metadata},
+        countdown=_video_poll_countdown(attempt + 1),
+        **_lane_options(task)
+    )
+
+
+@shared_task(bind=True, max_retries=3)
+def publish_song_snapshots(self, song_id: int, names=None):
+    """
+    发布歌曲静态快照的异步任务
+    
+    Args:
+        song_id: 歌曲ID
+        names: 需要发布的快照名称列表，默认全部
+    """
+    from apps.songs.models import Song
+    from .services.snapshot_publisher import snapshot_publisher
+    
+    try:
+        song = Song.objects.get(song_id=song_id)
+    except Song.DoesNotExist:
+        logger.warning(f'歌曲 {song_id} 不存在，跳过快照发布')
+        return
     
+    try:
+        snapshot_publisher.publish_song(song, names)
     except Exception as e:
-        logger.error(f'下载或上传视频到OSS失败: {str(e)}', exc_info=True)
-        # 即使OSS上传失败，也保存原始URL
-        AIGCContent.objects.create(
-            task=task,
-            content_type='video',
-            content_url=video_url,
-            metadata={
-                **video_info.get('metadata', {}),
-                'style': style,
-                'duration': duration,
-                'resolution': resolution,
-                'oss_upload_failed': True,
-                'error': str(e)
-            },
-            status='pending_review'
-        )
-        logger.warning(f'视频已生成但OSS上传失败，使用原始URL: {video_url}')
+        logger.error(f'歌曲 {song_id} 快照发布失败: {str(e)}', exc_info=True)
+        if not is_retryable(e):
+            raise
+        raise self.retry(exc=e, countdown=backoff_countdown(self.request.retries))
 
 
-def _generate_text_to_video(task: AIGCGenerationTask, song, parameters: dict):
-    """生成文生视频（先生成图片，再用图片生成视频）"""
-    style = parameters.get('style', 'beautiful')
-    duration = parameters.get('duration', 5)
-    resolution = parameters.get('resolution', '720p')
-    mood = parameters.get('mood', '治愈')
+@shared_task(bind=True, max_retries=3)
+def submit_batch_job(self, job_id: int):
+    """
+    提交批量推理作业：为作业内每个评论摘要任务构建请求，写成JSONL文件上传并创建远程作业
     
-    # 第一步：先生成图片（使用歌词配图功能）
-    logger.info(f'文生视频：第一步，生成配图...')
-    temp_image_task = AIGCGenerationTask.objects.create(
-        task_type='lyric_image',
-        song=song,
-        operator=task.operator,
-        parameters={'style': style, 'count': 1, 'lyrics_section': 'chorus'},
-        status='processing'
-    )
+    命中生成结果缓存的任务直接完成，不进入请求文件
+    
+    Args:
+        job_id: 批量推理作业ID
+    """
     try:
-        _generate_lyric_images(temp_image_task, song, {'style': style, 'count': 1, 'lyrics_section': 'chorus'})
-        temp_image = AIGCContent.objects.filter(task=temp_image_task, content_type='image').first()
-        if not temp_image:
-            raise ValueError('图片生成失败，无法继续生成视频')
+        job = AIGCBatchJob.objects.get(job_id=job_id)
+    except AIGCBatchJob.DoesNotExist:
+        logger.warning(f'批量推理作业 {job_id} 不存在，跳过提交')
+        return
+    
+    if job.status != 'pending':
+        logger.info(f'批量推理作业 {job_id} 状态为 {job.status}，跳过提交')
+        return
+    
+    if not job.input_file_id:
+        lines = []
+        for task in job.tasks.select_related('song').filter(status__in=('pending', 'processing')):
+            line = _build_batch_summary_request(task)
+            if line:
+                lines.append(line)
+        
+        job.request_count = len(lines)
+        if not lines:
+            job.save(update_fields=['request_count'])
+            _finish_batch_job(job, 'completed')
+            return
         
-        image_url = temp_image.display_url or temp_image.content_url
-        logger.info(f'文生视频：配图生成成功，使用图片: {image_url[:50]}...')
+        try:
+            job.input_file_id = batch_client.upload_file(
+                ('\n'.join(lines) + '\n').encode('utf-8'), f'comment-summary-{job_id}.jsonl'
+            )
+        except Exception as e:
+            _handle_batch_submit_error(self, job, e)
+            return
+        job.save(update_fields=['request_count', 'input_file_id'])
+        job.tasks.filter(status='pending').update(status='processing')
+    
+    try:
+        batch = batch_client.create_batch(job.input_file_id, metadata={'job_id': str(job_id)})
     except Exception as e:
-        logger.error(f'文生视频：配图生成失败: {str(e)}')
-        raise ValueError(f'无法生成配图，文生视频失败: {str(e)}')
+        _handle_batch_submit_error(self, job, e)
+        return
     
-    # 第二步：使用生成的图片生成视频
-    # 构建视频提示词
-    prompt = PromptBuilder.build_text_to_video_prompt(
-        song_title=song.title,
-        artist=song.artist,
-        lyrics=song.lyrics or '',
-        style=style,
-        mood=mood
+    job.remote_batch_id = batch['id']
+    job.status = 'in_progress'
+    job.submitted_at = timezone.now()
+    job.save(update_fields=['remote_batch_id', 'status', 'submitted_at'])
+    logger.info(f'批量推理作业 {job_id} 已提交: {job.request_count} 个请求，远程作业ID: {job.remote_batch_id}')
+    
+    poll_batch_job.apply_async(
+        args=[job_id], countdown=settings.AIGC_BATCH_POLL_INTERVAL, **queue_options(QUEUE_TEXT)
     )
+
+
+def _build_batch_summary_request(task: AIGCGenerationTask):
+    """
+    构建评论摘要任务的批量请求行
     
-    logger.info(f'文生视频：第二步，使用配图生成视频，Prompt: {prompt[:100]}...')
+    Returns:
+        str: 请求行；没有评论（任务失败）或命中缓存（任务已完成）时返回None
+    """
+    parameters = task.parameters or {}
+    try:
+        comments = _select_summary_comments(task.song, parameters.get('comment_range', 'hot'))
+    except ValueError as e:
+        _mark_task_failed(task, str(e))
+        return None
     
-    # 调用阿里万相生成视频（图生视频）
-    video_info = wanxiang_service.generate_video(
-        image_url=image_url,
-        prompt=prompt,
-        duration=duration,
-        resolution=resolution
+    prompt = PromptBuilder.build_comment_summary_prompt(
+        song_title=task.song.title,
+        artist=task.song.artist,
+        comments=comments
     )
+    request = wanxiang_service.build_text_request(prompt, max_tokens=300)
+    
+    cache_key, cached = _lookup_generation_cache(task, parameters, 'text', request)
+    fingerprint = comment_fingerprint(comments)
+    if cached:
+        task.save_checkpoint('summary_generated', {
+            **cached, 'comment_fingerprint': fingerprint, 'generation_cache': 'hit'
+        })
+        _generate_comment_summary(task, task.song, parameters)
+        _mark_task_completed(task)
+        return None
+    
+    task.save_checkpoint('batch_request', {
+        'comment_count': len(comments), 'comment_fingerprint': fingerprint, 'cache_key': cache_key
+    })
+    return build_request_line(f'task-{task.task_id}', request)
+
+
+def _handle_batch_submit_error(task_self, job: AIGCBatchJob, error: Exception):
+    """提交失败：可重试的错误按退避重试，否则作业失败"""
+    logger.error(f'批量推理作业 {job.job_id} 提交失败: {str(error)}', exc_info=True)
+    if is_retryable(error) and task_self.request.retries < task_self.max_retries:
+        raise task_self.retry(exc=error, countdown=backoff_countdown(task_self.request.retries))
+    _finish_batch_job(job, 'failed', f'提交失败: {str(error)}')
+
+
+@shared_task(bind=True, max_retries=3)
+def poll_batch_job(self, job_id: int, attempt: int = 0):
+    """
+    轮询批量推理作业（单次查询后重新入队），结束后下载结果批量入库
     
-    # 下载视频并上传到OSS
-    video_url = video_info.get('url', '')
-    if not video_url:
-        raise ValueError('阿里万相文生视频成功但未返回视频URL')
+    Args:
+        job_id: 批量推理作业ID
+        attempt: 已轮询次数
+    """
+    try:
+        job = AIGCBatchJob.objects.get(job_id=job_id)
+    except AIGCBatchJob.DoesNotExist:
+        logger.warning(f'批量推理作业 {job_id} 不存在，停止轮询')
+        return
+    
+    if job.status != 'in_progress' or not job.remote_batch_id:
+        logger.info(f'批量推理作业 {job_id} 状态为 {job.status}，停止轮询')
+        return
     
     try:
-        response = requests.get(video_url, timeout=60)  # 视频下载可能需要更长时间
-        response.raise_for_status()
-        
-        # 生成文件名
-        filename = f'aigc/videos/{song.song_id}/{task.task_id}.mp4'
-        
-        # 保存到OSS
-        content_file = ContentFile(response.content)
-        video_storage.save(filename, content_file)
+        batch = batch_client.retrieve_batch(job.remote_batch_id)
+    except Exception as e:
+        # 查询失败不影响远程作业，继续轮询直到超时
+        logger.warning(f'查询批量推理作业 {job.remote_batch_id} 失败: {str(e)}')
+        batch = {}
+    
+    final_status = REMOTE_FINAL_STATUS.get(batch.get('status'))
+    if final_status is None:
+        elapsed = (timezone.now() - job.submitted_at).total_seconds() if job.submitted_at else 0
+        if elapsed >= settings.AIGC_BATCH_POLL_TIMEOUT:
+            _finish_batch_job(job, 'failed', f'批量推理作业超时（{settings.AIGC_BATCH_POLL_TIMEOUT}秒），远程作业ID: {job.remote_batch_id}')
+            return
+        counts = batch.get('request_counts') or {}
+        logger.debug(
+            f'批量推理作业 {job_id} 状态: {batch.get("status")}，'
+            f'进度 {counts.get("completed", 0)}/{counts.get("total", job.request_count)}'
+        )
+        poll_batch_job.apply_async(
+            args=[job_id], kwargs={'attempt': attempt + 1},
+            countdown=settings.AIGC_BATCH_POLL_INTERVAL, **queue_options(QUEUE_TEXT)
+        )
+        return
+    
+    job.output_file_id = batch.get('output_file_id')
+    job.error_file_id = batch.get('error_file_id')
+    job.save(update_fields=['output_file_id', 'error_file_id'])
+    
+    remote_errors = ((batch.get('errors') or {}).get('data') or [])
+    error_message = '; '.join(str(item.get('message')) for item in remote_errors) or None
+    if final_status != 'completed' and not error_message:
+        error_message = f'远程作业状态: {batch.get("status")}'
+    
+    try:
+        _ingest_batch_results(job, missing_error=error_message or '结果文件中缺少该请求')
+    except Exception as e:
+        logger.error(f'批量推理作业 {job_id} 结果入库失败: {str(e)}', exc_info=True)
+        if is_retryable(e) and self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=backoff_countdown(self.request.retries))
+        _finish_batch_job(job, 'failed', f'结果入库失败: {str(e)}')
+        return
+    
+    _finish_batch_job(job, final_status, error_message)
+
+
+def _ingest_batch_results(job: AIGCBatchJob, missing_error: str):
+    """下载结果文件和错误文件，批量创建评论摘要内容并更新任务状态（在一个事务中完成，重试时不会重复入库）"""
+    results = {}
+    for file_id in (job.output_file_id, job.error_file_id):
+        if not file_id:
+            continue
+        for line in batch_client.download_file(file_id).splitlines():
+            if line.strip():
+                result = parse_result_line(line)
+                results[result['custom_id']] = result
+    
+    contents = []
+    succeeded = []
+    failed = {}
+    for task in job.tasks.filter(status='processing'):
+        result = results.get(f'task-{task.task_id}')
+        if result is None:
+            failed.setdefault(f'批量推理失败: {missing_error}', []).append(task.task_id)
+            continue
+        if result['error']:
+            failed.setdefault(f'批量推理失败: {result["error"]}', []).append(task.task_id)
+            continue
         
-        # 创建内容记录
-        AIGCContent.objects.create(
+        request_info = task.get_checkpoint('batch_request') or {}
+        contents.append(AIGCContent(
             task=task,
-            content_type='video',
-            content_url=video_url,
-            content_video_file=filename,
+            content_type='text',
+            content_text=result['text'],
             metadata={
-                **video_info.get('metadata', {}),
-                'style': style,
-                'mood': mood,
-                'duration': duration,
-                'resolution': resolution,
+                'comment_range': (task.parameters or {}).get('comment_range', 'hot'),
+                'comment_count': request_info.get('comment_count'),
+                'word_count': len(result['text']),
+                'comment_fingerprint': request_info.get('comment_fingerprint'),
+                'batch_job_id': job.job_id
             },
             status='pending_review'
+        ))
+        succeeded.append(task.task_id)
+        if request_info.get('cache_key'):
+            generation_cache.set(request_info['cache_key'], {
+                'text': result['text'],
+                'comment_count': request_info.get('comment_count'),
+                'task_id': task.task_id
+            })
+    
+    now = timezone.now()
+    with transaction.atomic():
+        AIGCContent.objects.bulk_create(contents, batch_size=500)
+        AIGCGenerationTask.objects.filter(task_id__in=succeeded).update(
+            status='completed', error_message=None, completed_at=now
         )
-        logger.info(f'文生视频生成成功: {filename}')
+        for error_message, task_ids in failed.items():
+            AIGCGenerationTask.objects.filter(task_id__in=task_ids).update(
+                status='failed', error_message=error_message, completed_at=now
+            )
+    logger.info(
+        f'批量推理作业 {job.job_id} 结果已入库: 成功 {len(succeeded)}，'
+        f'失败 {sum(len(ids) for ids in failed.values())}'
+    )
+
+
+def _finish_batch_job(job: AIGCBatchJob, status: str, error_message: str = None):
+    """结束批量推理作业：未完成的任务标记失败，并统计成功/失败数"""
+    now = timezone.now()
+    if status != 'completed':
+        job.tasks.filter(status__in=('pending', 'processing')).update(
+            status='failed', error_message=f'批量推理失败: {error_message}', completed_at=now
+        )
+    counts = job.tasks.aggregate(
+        succeeded=Count('task_id', filter=Q(status='completed')),
+        failed=Count('task_id', filter=Q(status='failed'))
+    )
+    job.status = status
+    job.error_message = error_message
+    job.succeeded_count = counts['succeeded']
+    job.failed_count = counts['failed']
+    job.completed_at = now
+    job.save(update_fields=['status', 'error_message', 'succeeded_count', 'failed_count', 'completed_at'])
+    logger.info(f'批量推理作业 {job.job_id} 结束（{status}）: 成功 {job.succeeded_count}，失败 {job.failed_count}')
+
+
+@shared_task
+def refresh_dirty_comment_summaries():
+    """
+    增量刷新评论摘要（定时任务）
     
+    只检查评论有变化的歌曲（SummaryTracker），选中评论的指纹与最近一次摘要相同时跳过；
+    距上次摘要不足 AIGC_SUMMARY_MIN_INTERVAL 或已有进行中的摘要任务时，留到下一轮再检查
+    """
+    from apps.songs.models import Song
+    
+    if not summary_tracker.enabled:
+        return
+    
+    try:
+        song_ids = summary_tracker.pop_dirty(settings.AIGC_SUMMARY_REFRESH_BATCH)
     except Exception as e:
-        logger.error(f'下载或保存视频失败: {str(e)}')
-        # 即使下载失败，也保存URL记录
-        AIGCContent.objects.create(
-            task=task,
-            content_type='video',
-            content_url=video_url,
-            metadata=video_info.get('metadata', {}),
-            status='pending_review'
+        logger.warning(f'读取待刷新摘要的歌曲失败: {str(e)}')
+        return
+    if not song_ids:
+        return
+    
+    comment_range = settings.AIGC_SUMMARY_COMMENT_RANGE
+    min_created_at = timezone.now() - timedelta(seconds=settings.AIGC_SUMMARY_MIN_INTERVAL)
+    queued = unchanged = deferred = 0
+    
+    for song in Song.objects.filter(song_id__in=song_ids, is_active=True):
+        summary_tasks = AIGCGenerationTask.objects.filter(song=song, task_type='comment_summary')
+        if summary_tasks.filter(status__in=('pending', 'processing')).exists():
+            summary_tracker.mark_dirty(song.song_id)
+            deferred += 1
+            continue
+        
+        try:
+            comments = _select_summary_comments(song, comment_range)
+        except ValueError:
+            continue
+        
+        fingerprint = comment_fingerprint(comments)
+        latest = AIGCContent.objects.filter(
+            task__song=song, task__task_type='comment_summary'
+        ).order_by('-created_at').values('metadata', 'created_at').first()
+        if latest and (latest['metadata'] or {}).get('comment_fingerprint') == fingerprint:
+            unchanged += 1
+            continue
+        if latest and latest['created_at'] > min_created_at:
+            summary_tracker.mark_dirty(song.song_id)
+            deferred += 1
+            continue
+        
+        task = AIGCGenerationTask.objects.create(
+            task_type='comment_summary',
+            song=song,
+            parameters={'comment_range': comment_range, 'trigger': 'comment_activity'},
+            priority=PRIORITY_BULK
         )
+        enqueue_generation(task)
+        queued += 1
+    
+    logger.info(
+        f'评论摘要增量刷新: 检查 {len(song_ids)} 首，重新生成 {queued} 首，'
+        f'评论未变化 {unchanged} 首，延后 {deferred} 首'
+    )
+
 
+@shared_task
+def dispatch_campaign(campaign_id: int):
+    """
+    按限速投递批量生成活动的下一批子任务（每次投递后重新入队，直到全部投递）
+    
+    活动行加锁并记录下次投递时间，重复触发（如多次恢复）时多余的调度链会自动结束
+    
+    Args:
+        campaign_id: 活动ID
+    """
+    tick = settings.AIGC_CAMPAIGN_TICK
+    with transaction.atomic():
+        try:
+            campaign = AIGCCampaign.objects.select_for_update().get(campaign_id=campaign_id)
+        except AIGCCampaign.DoesNotExist:
+            logger.warning(f'批量生成活动 {campaign_id} 不存在，停止投递')
+            return
+        
+        if campaign.status != 'running':
+            logger.info(f'批量生成活动 {campaign_id} 状态为 {campaign.status}，停止投递')
+            return
+        now = timezone.now()
+        if campaign.next_dispatch_at and now < campaign.next_dispatch_at - timedelta(seconds=1):
+            return
+        
+        in_flight = campaign.tasks.filter(
+            task_id__lte=campaign.last_dispatched_task_id, status__in=('pending', 'processing')
+        ).count()
+        # 按限速累计可投递数（不足1个的部分留到下次，如每分钟1个、间隔30秒时每两次投递1个）
+        credit = campaign.dispatch_credit + campaign.rate_per_minute * tick / 60
+        quota = min(int(credit), max(0, settings.AIGC_CAMPAIGN_MAX_IN_FLIGHT - in_flight))
+        tasks = list(campaign.tasks.filter(
+            task_id__gt=campaign.last_dispatched_task_id, status='pending'
+        ).order_by('task_id')[:quota]) if quota else []
+        # 受并发上限限制未用完的额度最多保留1个，避免恢复后集中投递
+        campaign.dispatch_credit = min(credit - len(tasks), 1.0)
+        
+        if tasks:
+            campaign.last_dispatched_task_id = tasks[-1].task_id
+        finished = not campaign.tasks.filter(task_id__gt=campaign.last_dispatched_task_id).exists()
+        if finished:
+            campaign.status = 'dispatched'
+            campaign.dispatched_at = now
+        campaign.next_dispatch_at = now + timedelta(seconds=tick)
+        campaign.save(update_fields=[
+            'last_dispatched_task_id', 'dispatch_credit', 'status', 'dispatched_at', 'next_dispatch_at'
+        ])
+    
+    # 本批任务在一个投递间隔内均匀投递
+    spacing = tick / len(tasks) if tasks else 0
+    for index, task in enumerate(tasks):
+        enqueue_generation(task, countdown=int(index * spacing))
+    
+    if tasks:
+        logger.info(f'批量生成活动 {campaign_id} 投递 {len(tasks)} 个任务（进行中 {in_flight} 个）')
+    if finished:
+        logger.info(f'批量生成活动 {campaign_id} 全部任务已投递')
+        return
+    dispatch_campaign.apply_async(args=[campaign_id], countdown=tick, **queue_options(QUEUE_TEXT))
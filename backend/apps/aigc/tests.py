@@ -0,0 +1,280 @@
+"""
+AIGC测试：快速序列化器输出与DRF序列化器一致；批量推理请求/结果解析与提交、轮询、入库流程
+"""
+import json
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from apps.comments.models import Comment
+from apps.songs.models import Song
+from .models import AIGCBatchJob, AIGCGenerationTask, AIGCContent
+from .serializers import AIGCContentSerializer
+from .fast_serializers import AIGCContentFastSerializer
+from .services.batch_inference import CHAT_COMPLETIONS_URL, build_request_line, parse_result_line
+from .services.wanxiang_service import dashscope_breaker
+from . import tasks
+
+User = get_user_model()
+
+
+class AIGCContentFastSerializerTests(TestCase):
+    """AIGCContentFastSerializer 与 AIGCContentSerializer 输出一致（不含OSS文件，display_url为原始URL）"""
+
+    @classmethod
+    def setUpTestData(cls):
+        song = Song.objects.create(title='晴天', artist='周杰伦', duration=269)
+        image_task = AIGCGenerationTask.objects.create(task_type='lyric_image', song=song, status='completed')
+        summary_task = AIGCGenerationTask.objects.create(task_type='comment_summary', song=song, status='completed')
+        AIGCContent.objects.create(
+            task=image_task, content_type='image', content_url='https://example.com/1.png',
+            metadata={'style': 'beautiful'}, status='published', published_at=timezone.now()
+        )
+        AIGCContent.objects.create(
+            task=summary_task, content_type='text', content_text='评论都在怀念青春', status='pending_review'
+        )
+        cls.queryset = AIGCContent.objects.select_related('task__song').order_by('content_id')
+
+    def _assert_matches(self, params=None):
+        context = {'request': RequestFactory().get('/', params or {})}
+        expected = [dict(item) for item in AIGCContentSerializer(self.queryset, many=True, context=context).data]
+        self.assertEqual(AIGCContentFastSerializer(context=context).serialize(self.queryset), expected)
+
+    def test_matches_drf_serializer(self):
+        self._assert_matches()
+
+    def test_sparse_fields(self):
+        for params in ({'fields': 'display_url,song_title'}, {'exclude': 'content_id,metadata'}):
+            with self.subTest(params=params):
+                self._assert_matches(params)
+
+
+class BatchLineTests(SimpleTestCase):
+    """批量推理请求行构建与结果行解析"""
+
+    def test_build_request_line(self):
+        request = {'model': 'qwen-plus', 'messages': [{'role': 'user', 'content': '总结评论'}]}
+        line = build_request_line('task-1', request)
+        self.assertNotIn('\n', line)
+        self.assertEqual(json.loads(line), {
+            'custom_id': 'task-1', 'method': 'POST', 'url': CHAT_COMPLETIONS_URL, 'body': request
+        })
+
+    def test_parse_success_line(self):
+        line = json.dumps({
+            'custom_id': 'task-1',
+            'response': {'status_code': 200, 'body': {'choices': [{'message': {'content': '大家都在怀念青春'}}]}},
+            'error': None,
+        })
+        self.assertEqual(parse_result_line(line), {'custom_id': 'task-1', 'text': '大家都在怀念青春', 'error': None})
+
+    def test_parse_error_file_line(self):
+        line = json.dumps({
+            'custom_id': 'task-2', 'response': None,
+            'error': {'code': 'DataInspectionFailed', 'message': '内容不合规'},
+        })
+        self.assertEqual(parse_result_line(line), {
+            'custom_id': 'task-2', 'text': None, 'error': '[DataInspectionFailed] 内容不合规'
+        })
+
+    def test_parse_non_200_body(self):
+        for body, expected in (
+            ({'error': {'code': 'InvalidParameter', 'message': 'max_tokens过大'}}, '[InvalidParameter] max_tokens过大'),
+            ({}, 'HTTP 500'),
+        ):
+            with self.subTest(body=body):
+                line = json.dumps({'custom_id': 'task-3', 'response': {'status_code': 500 if not body else 400, 'body': body}})
+                self.assertEqual(parse_result_line(line), {'custom_id': 'task-3', 'text': None, 'error': expected})
+
+    def test_parse_malformed_body(self):
+        line = json.dumps({'custom_id': 'task-4', 'response': {'status_code': 200, 'body': {'choices': []}}})
+        self.assertEqual(parse_result_line(line), {'custom_id': 'task-4', 'text': None, 'error': '结果格式异常'})
+
+
+class FakeBatchServer:
+    """OpenAI兼容 /files、/batches 接口的内存实现（替换 requests.request）"""
+
+    def __init__(self):
+        self.files = {}
+        self.batches = {}
+        self.fail_create = None
+
+    class Response:
+        def __init__(self, status_code, payload=None, text=None):
+            self.status_code = status_code
+            self.ok = 200 <= status_code < 300
+            self.encoding = None
+            self._payload = payload
+            self.text = text if text is not None else json.dumps(payload or {})
+
+        def json(self):
+            if self._payload is None:
+                raise ValueError('not json')
+            return self._payload
+
+    def request(self, method, url, **kwargs):
+        path = url.split('/v1', 1)[1]
+        if method == 'POST' and path == '/files':
+            _, content, _ = kwargs['files']['file']
+            file_id = f'file-{len(self.files) + 1}'
+            self.files[file_id] = content.decode('utf-8')
+            return self.Response(200, {'id': file_id})
+        if method == 'POST' and path == '/batches':
+            if self.fail_create:
+                return self.Response(self.fail_create, {'error': {'code': 'InvalidParameter', 'message': '参数错误'}})
+            batch_id = f'batch-{len(self.batches) + 1}'
+            self.batches[batch_id] = {
+                'id': batch_id, 'status': 'in_progress', 'input_file_id': kwargs['json']['input_file_id']
+            }
+            return self.Response(200, self.batches[batch_id])
+        if method == 'GET' and path.startswith('/batches/'):
+            return self.Response(200, self.batches[path.rsplit('/', 1)[1]])
+        if method == 'GET' and path.startswith('/files/'):
+            return self.Response(200, text=self.files[path.split('/')[2]])
+        return self.Response(404, {'error': {'code': 'NotFound', 'message': path}})
+
+    def requests_in(self, batch_id):
+        """作业输入文件中的请求（custom_id -> 请求体）"""
+        lines = self.files[self.batches[batch_id]['input_file_id']].splitlines()
+        return {item['custom_id']: item['body'] for item in map(json.loads, lines)}
+
+    def complete(self, batch_id, outputs, errors=()):
+        """结束作业：outputs 为 {custom_id: 文本}，errors 为错误文件中的 custom_id"""
+        output_lines = [json.dumps({
+            'custom_id': custom_id,
+            'response': {'status_code': 200, 'body': {'choices': [{'message': {'content': text}}]}},
+            'error': None,
+        }, ensure_ascii=False) for custom_id, text in outputs.items()]
+        error_lines = [json.dumps({
+            'custom_id': custom_id, 'response': None,
+            'error': {'code': 'DataInspectionFailed', 'message': '内容不合规'},
+        }, ensure_ascii=False) for custom_id in errors]
+        batch = self.batches[batch_id]
+        batch['status'] = 'completed'
+        for key, lines in (('output_file_id', output_lines), ('error_file_id', error_lines)):
+            if lines:
+                file_id = f'file-{len(self.files) + 1}'
+                self.files[file_id] = '\n'.join(lines) + '\n'
+                batch[key] = file_id
+
+
+@override_settings(
+    AIGC_BATCH_API_BASE='http://batch.test/v1',
+    AIGC_GENERATION_CACHE_ENABLED=False,
+    AIGC_SINGLE_FLIGHT_ENABLED=False,
+)
+class BatchJobFlowTests(TestCase):
+    """批量推理作业：提交 -> 轮询 -> 结果入库（部分成功、结果缺失、重复入库）"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(phone='13800000001', password='test', nickname='听众')
+        cls.songs = []
+        for index in range(3):
+            song = Song.objects.create(title=f'歌曲{index}', artist='歌手', duration=200)
+            Comment.objects.create(content=f'评论{index}', user=user, song=song, like_count=6)
+            cls.songs.append(song)
+        # 没有评论的歌曲：构建请求时任务直接失败
+        cls.songs.append(Song.objects.create(title='无评论', artist='歌手', duration=200))
+
+    def setUp(self):
+        self.server = FakeBatchServer()
+        self.job = AIGCBatchJob.objects.create(parameters={'comment_range': 'hot'})
+        self.tasks = [
+            AIGCGenerationTask.objects.create(
+                task_type='comment_summary', song=song, status='pending',
+                parameters={'comment_range': 'hot'}, batch_job=self.job
+            )
+            for song in self.songs
+        ]
+        for patcher in (
+            mock.patch('apps.aigc.services.batch_inference.requests.request', side_effect=self.server.request),
+            mock.patch.object(dashscope_breaker, 'call', side_effect=lambda func, *args, **kwargs: func(*args, **kwargs)),
+            mock.patch.object(tasks.poll_batch_job, 'apply_async'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _submit(self):
+        tasks.submit_batch_job(self.job.job_id)
+        self.job.refresh_from_db()
+
+    def _task(self, index):
+        return AIGCGenerationTask.objects.get(task_id=self.tasks[index].task_id)
+
+    def test_submit_builds_request_file(self):
+        self._submit()
+
+        self.assertEqual(self.job.status, 'in_progress')
+        self.assertEqual(self.job.request_count, 3)
+        requests = self.server.requests_in(self.job.remote_batch_id)
+        self.assertEqual(set(requests), {f'task-{task.task_id}' for task in self.tasks[:3]})
+        self.assertIn('评论0', requests[f'task-{self.tasks[0].task_id}']['messages'][0]['content'])
+        self.assertEqual([self._task(index).status for index in range(4)], ['processing'] * 3 + ['failed'])
+        tasks.poll_batch_job.apply_async.assert_called_once()
+
+    def test_poll_while_in_progress_requeues(self):
+        self._submit()
+        tasks.poll_batch_job.apply_async.reset_mock()
+
+        tasks.poll_batch_job(self.job.job_id)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'in_progress')
+        self.assertEqual(tasks.poll_batch_job.apply_async.call_args.kwargs['kwargs'], {'attempt': 1})
+
+    def test_partial_success_and_missing_results(self):
+        self._submit()
+        ok, rejected, missing, no_comments = self.tasks
+        self.server.complete(
+            self.job.remote_batch_id,
+            outputs={f'task-{ok.task_id}': '大家都很喜欢这首歌'},
+            errors=[f'task-{rejected.task_id}'],
+        )
+
+        tasks.poll_batch_job(self.job.job_id)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'completed')
+        self.assertEqual((self.job.succeeded_count, self.job.failed_count), (1, 3))
+
+        content = AIGCContent.objects.get()
+        self.assertEqual(content.task_id, ok.task_id)
+        self.assertEqual(content.content_text, '大家都很喜欢这首歌')
+        self.assertEqual(content.metadata['batch_job_id'], self.job.job_id)
+        self.assertEqual(self._task(0).status, 'completed')
+
+        self.assertEqual(self._task(1).status, 'failed')
+        self.assertIn('DataInspectionFailed', self._task(1).error_message)
+        self.assertEqual(self._task(2).status, 'failed')
+        self.assertIn('结果文件中缺少该请求', self._task(2).error_message)
+        self.assertIn('暂无评论', self._task(3).error_message)
+
+    def test_retry_after_ingest_does_not_duplicate_contents(self):
+        self._submit()
+        self.server.complete(self.job.remote_batch_id, outputs={
+            f'task-{task.task_id}': f'摘要{index}' for index, task in enumerate(self.tasks[:3])
+        })
+
+        # 结果已入库但作业结束前失败（如worker重启），重试时再次入库
+        with mock.patch.object(tasks, '_finish_batch_job', side_effect=RuntimeError('worker lost')):
+            with self.assertRaises(RuntimeError):
+                tasks.poll_batch_job(self.job.job_id)
+        self.assertEqual(AIGCContent.objects.count(), 3)
+
+        tasks.poll_batch_job(self.job.job_id)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'completed')
+        self.assertEqual((self.job.succeeded_count, self.job.failed_count), (3, 1))
+        self.assertEqual(AIGCContent.objects.count(), 3)
+
+    def test_submit_rejected_fails_job(self):
+        self.server.fail_create = 400
+
+        self._submit()
+
+        self.assertEqual(self.job.status, 'failed')
+        self.assertIn('提交失败', self.job.error_message)
+        self.assertEqual([self._task(index).status for index in range(4)], ['failed'] * 4)
+        tasks.poll_batch_job.apply_async.assert_not_called()
@@ -9,6 +9,7 @@ app_name = 'aigc'
 urlpatterns = [
     # API路由（供Web和iOS使用）
     path('songs/<int:song_id>/aigc/', views.song_aigc_content, name='song_aigc_content'),
+    path('contents/<int:content_id>/media/', views.content_media, name='content_media'),
     
     # 运营后台API路由
     path('admin/tasks/', views.task_list, name='task_list'),
@@ -17,5 +18,9 @@ urlpatterns = [
     path('admin/contents/', views.content_list, name='content_list'),
     path('admin/contents/<int:content_id>/review/', views.content_review, name='content_review'),
     path('admin/contents/<int:content_id>/publish/', views.content_publish, name='content_publish'),
+    path('admin/campaigns/', views.campaign_list, name='campaign_list'),
+    path('admin/campaigns/create/', views.campaign_create, name='campaign_create'),
+    path('admin/campaigns/<int:campaign_id>/', views.campaign_detail, name='campaign_detail'),
+    path('admin/campaigns/<int:campaign_id>/action/', views.campaign_action, name='campaign_action'),
 ]
 
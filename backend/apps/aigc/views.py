@@ -6,13 +6,20 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from .models import AIGCGenerationTask, AIGCContent
+from django.http import HttpResponseRedirect, Http404
+from .models import AIGCGenerationTask, AIGCContent, AIGCCampaign, PRIORITY_INTERACTIVE
 from .serializers import (
     AIGCContentSerializer, 
     AIGCGenerationTaskSerializer,
     AIGCContentCreateSerializer,
-    AIGCContentReviewSerializer
+    AIGCContentReviewSerializer,
+    AIGCCampaignSerializer,
+    AIGCCampaignCreateSerializer
 )
+from .fast_serializers import AIGCContentFastSerializer
+from .services.snapshot_publisher import build_song_aigc_payload
+from .services.generation_cache import generation_cache
+from .services.rate_limiter import rate_limiter
 from apps.songs.models import Song
 
 
@@ -27,38 +34,33 @@ def song_aigc_content(request, song_id):
     返回已发布的AIGC内容，包括：
     - 歌词配图（lyric_image）
     - 评论摘要（comment_summary）
+    
+    支持 ?fields=/?exclude= 裁剪每条内容返回的字段
     """
     song = get_object_or_404(Song, song_id=song_id, is_active=True)
     
-    # 获取已发布的AIGC内容
-    contents = AIGCContent.objects.filter(
-        task__song=song,
-        status='published'
-    ).select_related('task').order_by('-published_at')
-    
-    # 按类型分组
-    lyric_images = contents.filter(content_type='image', task__task_type='lyric_image')
-    comment_summaries = contents.filter(content_type='text', task__task_type='comment_summary')
-    lyric_videos = contents.filter(content_type='video', task__task_type='lyric_video')
-    text_to_videos = contents.filter(content_type='video', task__task_type='text_to_video')
-    
-    serializer = AIGCContentSerializer
-    
     return Response({
         'success': True,
         'message': '获取成功',
-        'data': {
-            'song_id': song.song_id,
-            'song_title': song.title,
-            'song_artist': song.artist,
-            'lyric_images': serializer(lyric_images, many=True).data,
-            'comment_summary': serializer(comment_summaries.first()).data if comment_summaries.exists() else None,
-            'lyric_videos': serializer(lyric_videos, many=True).data,
-            'text_to_videos': serializer(text_to_videos, many=True).data
-        }
+        'data': build_song_aigc_payload(song, request)
     })
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def content_media(request, content_id):
+    """
+    重定向到已发布AIGC图片/视频的签名URL
+
+    静态快照中使用这个固定地址，签名URL过期后重新访问即可获得新的签名
+    """
+    content = get_object_or_404(AIGCContent, content_id=content_id, status='published')
+    url = content.display_url
+    if not url:
+        raise Http404('内容文件不存在')
+    return HttpResponseRedirect(url)
+
+
 # ==================== 运营后台API ====================
 
 @api_view(['GET'])
@@ -71,6 +73,7 @@ def task_list(request):
     - task_type: 任务类型
     - status: 任务状态
     - song_id: 歌曲ID
+    - coalesced: true只看合并到其他任务的重复任务，false排除重复任务
     """
     if not request.user.is_staff:
         return Response({
@@ -91,6 +94,9 @@ def task_list(request):
         tasks = tasks.filter(status=task_status)
     if song_id:
         tasks = tasks.filter(song_id=song_id)
+    coalesced = request.query_params.get('coalesced')
+    if coalesced in ('true', 'false'):
+        tasks = tasks.filter(coalesced_with__isnull=(coalesced == 'false'))
     
     # 分页
     page = int(request.query_params.get('page', 1))
@@ -106,6 +112,8 @@ def task_list(request):
         'message': '获取成功',
         'data': {
             'tasks': serializer.data,
+            'generation_cache': generation_cache.stats(),
+            'rate_limits': rate_limiter.stats(),
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -153,12 +161,13 @@ def task_create(request):
             song=song,
             operator=request.user,
             parameters=serializer.validated_data['parameters'],
+            priority=PRIORITY_INTERACTIVE,
             status='pending'
         )
         
-        # 触发Celery异步任务生成内容
-        from .tasks import generate_aigc_content
-        generate_aigc_content.delay(task.task_id)
+        # 触发Celery异步任务生成内容（交互优先级，排在批量任务之前）
+        from .tasks import enqueue_generation
+        enqueue_generation(task)
         
         return Response({
             'success': True,
@@ -211,7 +220,7 @@ def content_list(request):
             'message': '无权访问'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    contents = AIGCContent.objects.select_related('task__song', 'reviewed_by')
+    contents = AIGCContent.objects.all()
     
     # 筛选
     content_type = request.query_params.get('content_type')
@@ -235,13 +244,13 @@ def content_list(request):
     paginator = Paginator(contents, limit)
     page_obj = paginator.get_page(page)
     
-    serializer = AIGCContentSerializer(page_obj.object_list, many=True)
+    contents_data = AIGCContentFastSerializer(context={'request': request}).serialize(page_obj.object_list)
     
     return Response({
         'success': True,
         'message': '获取成功',
         'data': {
-            'contents': serializer.data,
+            'contents': contents_data,
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -325,3 +334,151 @@ def content_publish(request, content_id):
         'data': AIGCContentSerializer(content).data
     })
 
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def campaign_list(request):
+    """获取批量生成活动列表（运营后台，含每个活动的进度）"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': '无权访问'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    campaigns = AIGCCampaign.objects.all()
+    campaign_status = request.query_params.get('status')
+    if campaign_status:
+        campaigns = campaigns.filter(status=campaign_status)
+    # 进度计数在列表查询中一次性标注
+    campaigns = AIGCCampaign.with_progress(campaigns)
+    
+    page = int(request.query_params.get('page', 1))
+    limit = int(request.query_params.get('limit', 20))
+    from django.core.paginator import Paginator
+    paginator = Paginator(campaigns, limit)
+    page_obj = paginator.get_page(page)
+    
+    return Response({
+        'success': True,
+        'message': '获取成功',
+        'data': {
+            'campaigns': AIGCCampaignSerializer(page_obj.object_list, many=True).data,
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'total': paginator.count,
+                'pages': paginator.num_pages,
+                'has_next': page_obj.has_next(),
+                'has_prev': page_obj.has_previous(),
+            }
+        }
+    })
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def campaign_create(request):
+    """
+    创建批量生成活动（运营后台）
+    
+    请求体：
+    {
+        "name": "流行歌曲补齐配图",
+        "task_type": "lyric_image",
+        "parameters": {"style": "beautiful", "count": 1},
+        "song_filter": {"genre": ["pop"], "without_published_image": true, "min_play_count": 100},
+        "rate_per_minute": 20
+    }
+    """
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': '无权访问'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    serializer = AIGCCampaignCreateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'success': False,
+            'message': '活动创建失败',
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    from .services.campaigns import create_campaign
+    data = serializer.validated_data
+    campaign = create_campaign(
+        name=data['name'],
+        task_type=data['task_type'],
+        parameters=data['parameters'],
+        song_filter=data['song_filter'],
+        operator=request.user,
+        rate_per_minute=data.get('rate_per_minute')
+    )
+    
+    return Response({
+        'success': True,
+        'message': f'活动创建成功，共 {campaign.total_tasks} 首歌曲',
+        'data': AIGCCampaignSerializer(campaign).data
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def campaign_detail(request, campaign_id):
+    """获取批量生成活动详情和进度（运营后台）"""
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': '无权访问'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    campaign = get_object_or_404(AIGCCampaign, campaign_id=campaign_id)
+    
+    return Response({
+        'success': True,
+        'message': '获取成功',
+        'data': AIGCCampaignSerializer(campaign).data
+    })
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def campaign_action(request, campaign_id):
+    """
+    暂停/恢复/取消批量生成活动（运营后台）
+    
+    请求体：{"action": "pause" | "resume" | "cancel"}
+    """
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': '无权访问'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    from .services.campaigns import start_dispatch, cancel_campaign
+    campaign = get_object_or_404(AIGCCampaign, campaign_id=campaign_id)
+    action = request.data.get('action')
+    
+    if action == 'pause' and campaign.status == 'running':
+        campaign.status = 'paused'
+        campaign.save(update_fields=['status'])
+        message = '活动已暂停'
+    elif action == 'resume' and campaign.status == 'paused':
+        campaign.status = 'running'
+        campaign.save(update_fields=['status'])
+        start_dispatch(campaign)
+        message = '活动已恢复'
+    elif action == 'cancel' and campaign.status in ('running', 'paused'):
+        cancelled = cancel_campaign(campaign)
+        message = f'活动已取消，{cancelled} 个未投递的任务不再执行'
+    else:
+        return Response({
+            'success': False,
+            'message': f'活动当前状态（{campaign.get_status_display()}）不支持该操作'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'success': True,
+        'message': message,
+        'data': AIGCCampaignSerializer(campaign).data
+    })
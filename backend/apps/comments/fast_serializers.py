@@ -0,0 +1,194 @@
+"""
+评论快速序列化器（用于评论列表接口）
+"""
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from utils.fast_serializer import FastField, FastSerializer, format_datetime
+from apps.users.models import VIP_TYPE_CHOICES
+from .models import Comment, UserCommentLike
+
+AI_ASSISTANT_PHONE = 'ai_assistant'
+
+VIP_TYPE_DISPLAY = dict(VIP_TYPE_CHOICES)
+
+USER_COLUMNS = (
+    'user_id', 'phone', 'nickname', 'avatar_url', 'is_vip',
+    'vip_type', 'vip_expire_at', 'coin_balance', 'date_joined',
+)
+
+
+def user_columns(prefix='user__'):
+    """评论行中用户信息所需的列"""
+    return tuple(f'{prefix}{column}' for column in USER_COLUMNS)
+
+
+def user_representation(row, prefix='user__', now=None):
+    """从评论行构建用户信息（输出与 UserSerializer 一致）"""
+    is_vip = row[f'{prefix}is_vip']
+    vip_type = row[f'{prefix}vip_type']
+    vip_expire_at = row[f'{prefix}vip_expire_at']
+    now = now or timezone.now()
+
+    return {
+        'user_id': row[f'{prefix}user_id'],
+        'phone': row[f'{prefix}phone'],
+        'nickname': row[f'{prefix}nickname'],
+        'avatar_url': row[f'{prefix}avatar_url'],
+        'is_vip': is_vip,
+        'vip_type': vip_type,
+        'vip_type_display': VIP_TYPE_DISPLAY.get(vip_type, vip_type) if is_vip and vip_type else None,
+        'vip_expire_at': format_datetime(vip_expire_at),
+        'coin_balance': row[f'{prefix}coin_balance'],
+        'date_joined': format_datetime(row[f'{prefix}date_joined']),
+        'is_vip_valid': bool(is_vip) and not (vip_expire_at and vip_expire_at < now),
+    }
+
+
+REPLY_COLUMNS = (
+    'comment_id', 'parent_id', 'content', 'like_count', 'created_at',
+) + user_columns()
+
+
+def top_children(parent_ids, limit):
+    """
+    一次查询获取每个父评论下点赞数最高的若干条有效回复
+
+    Returns:
+        dict: parent_id -> 回复行列表（按点赞数、时间倒序）
+    """
+    if not parent_ids:
+        return {}
+
+    rows = Comment.objects.filter(
+        parent_id__in=parent_ids,
+        is_active=True
+    ).annotate(
+        rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('parent_id')],
+            order_by=[F('like_count').desc(), F('created_at').desc()]
+        )
+    ).filter(rank__lte=limit).order_by('parent_id', 'rank').values(*REPLY_COLUMNS)
+
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row['parent_id'], []).append(row)
+    return grouped
+
+
+class CommentFastSerializer(FastSerializer):
+    """
+    主评论快速序列化器（输出与 CommentSerializer 一致）
+
+    回复、回复数量、点赞状态在 prepare 中批量查询，
+    避免 CommentSerializer 每条评论多次查询。仅用于主评论（parent为空）。
+    """
+    fields = {
+        'comment_id': FastField('comment_id'),
+        'content': FastField('content'),
+        'user': FastField(method='get_user', columns=user_columns()),
+        'song': FastField('song_id'),
+        'parent': FastField('parent_id'),
+        'like_count': FastField('like_count'),
+        'is_liked': FastField(method='get_is_liked', columns=('comment_id',)),
+        'is_active': FastField('is_active'),
+        'replies': FastField(method='get_replies', columns=('comment_id',)),
+        'replies_count': FastField(method='get_replies_count', columns=('comment_id',)),
+        'created_at': FastField(method='get_created_at', columns=('created_at',)),
+        'updated_at': FastField(method='get_updated_at', columns=('updated_at',)),
+        'is_ai_generated': FastField(method='get_is_ai_generated', columns=('user__phone',)),
+    }
+
+    # prepare按评论ID批量查询，?fields=/?exclude= 未包含comment_id时也要查询
+    required_columns = ('comment_id',)
+
+    # 每条评论显示的直接回复数、每条回复显示的子回复数（与CommentSerializer一致）
+    max_replies = 10
+    max_nested_replies = 5
+
+    def prepare(self, rows):
+        self._now = timezone.now()
+        self._replies = {}
+        self._nested_replies = {}
+        self._replies_count = {}
+        self._liked_ids = set()
+
+        comment_ids = [row['comment_id'] for row in rows]
+        if not comment_ids:
+            return
+
+        if 'replies' in self.field_names:
+            self._replies = top_children(comment_ids, self.max_replies)
+            reply_ids = [reply['comment_id'] for replies in self._replies.values() for reply in replies]
+            self._nested_replies = top_children(reply_ids, self.max_nested_replies)
+
+        if 'replies_count' in self.field_names:
+            self._replies_count = dict(
+                Comment.objects.filter(parent_id__in=comment_ids, is_active=True)
+                .order_by().values('parent_id').annotate(count=Count('comment_id'))
+                .values_list('parent_id', 'count')
+            )
+
+        user = self._get_user()
+        if user is not None and ('is_liked' in self.field_names or 'replies' in self.field_names):
+            all_ids = list(comment_ids)
+            for replies in (self._replies, self._nested_replies):
+                for children in replies.values():
+                    all_ids.extend(child['comment_id'] for child in children)
+            self._liked_ids = set(
+                UserCommentLike.objects.filter(user=user, comment_id__in=all_ids)
+                .values_list('comment_id', flat=True)
+            )
+
+    def _get_user(self):
+        """获取当前已登录用户"""
+        request = self.context.get('request')
+        if request and request.user and request.user.is_authenticated:
+            return request.user
+        return None
+
+    def get_user(self, row):
+        return user_representation(row, now=self._now)
+
+    def get_is_liked(self, row):
+        return row['comment_id'] in self._liked_ids
+
+    def get_is_ai_generated(self, row):
+        return row['user__phone'] == AI_ASSISTANT_PHONE
+
+    def get_created_at(self, row):
+        return format_datetime(row['created_at'])
+
+    def get_updated_at(self, row):
+        return format_datetime(row['updated_at'])
+
+    def get_replies_count(self, row):
+        return self._replies_count.get(row['comment_id'], 0)
+
+    def get_replies(self, row):
+        """获取回复列表（包括回复的回复）"""
+        result = []
+        for reply in self._replies.get(row['comment_id'], ()):
+            result.append({
+                'comment_id': reply['comment_id'],
+                'content': reply['content'],
+                'user': user_representation(reply, now=self._now),
+                'like_count': reply['like_count'],
+                'is_liked': reply['comment_id'] in self._liked_ids,
+                'created_at': reply['created_at'].isoformat(),
+                'nesting_level': 1,
+                'can_reply': True,
+                'replies': [{
+                    'comment_id': nested['comment_id'],
+                    'content': nested['content'],
+                    'user': user_representation(nested, now=self._now),
+                    'like_count': nested['like_count'],
+                    'is_liked': nested['comment_id'] in self._liked_ids,
+                    'is_ai_generated': nested['user__phone'] == AI_ASSISTANT_PHONE,
+                    'created_at': nested['created_at'].isoformat(),
+                    'nesting_level': 2,
+                    'can_reply': False,
+                } for nested in self._nested_replies.get(reply['comment_id'], ())]
+            })
+        return result
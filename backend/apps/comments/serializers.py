@@ -4,10 +4,11 @@
 from rest_framework import serializers
 from .models import Comment
 from apps.users.serializers import UserSerializer
+from utils.sparse_fields import SparseFieldsetMixin
 
 
-class CommentSerializer(serializers.ModelSerializer):
-    """评论序列化器"""
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """评论序列化器（支持 ?fields=/?exclude= 稀疏字段）"""
     user = UserSerializer(read_only=True)
     replies = serializers.SerializerMethodField()
     replies_count = serializers.SerializerMethodField()
@@ -0,0 +1,3 @@
+"""
+评论服务模块
+"""
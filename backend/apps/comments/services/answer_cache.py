@@ -0,0 +1,193 @@
+"""
+@AI问题答案缓存（按歌曲）
+同一首歌下的相似问题（"这首歌讲的是什么？" / "@AI 这首歌讲的是什么呢"）直接复用已生成的回答。
+问题先归一化（全半角、大小写、去掉@AI、标点、语气词），再对字符shingle计算64位SimHash，
+汉明距离不超过 AI_ANSWER_CACHE_MAX_DISTANCE 视为同一问题。
+
+每首歌一个Redis HASH：字段为指纹（16进制），值为 {问题, 回答, 写入时间}；
+另有 version 字段记录写入时的歌曲内容版本（标题/艺术家/专辑/歌词的摘要），
+歌词等内容变化后版本不同，读取时整首歌的缓存失效。
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from django.conf import settings
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 不影响问题含义的语气词
+FILLER_CHARS = '吗呢啊呀吧哦嘛'
+# 去掉@AI标记、空白和标点
+NOISE_PATTERN = re.compile(r'@ai|[\s\W_]+', re.IGNORECASE)
+
+VERSION_FIELD = '__version__'
+
+
+def normalize_question(question: str) -> str:
+    """归一化问题文本"""
+    text = unicodedata.normalize('NFKC', question or '').lower()
+    text = NOISE_PATTERN.sub('', text)
+    return ''.join(ch for ch in text if ch not in FILLER_CHARS)
+
+
+def shingles(text: str, size: int = 2) -> list:
+    """字符shingle（文本短于size时整体作为一个shingle）"""
+    if len(text) <= size:
+        return [text] if text else []
+    return [text[i:i + size] for i in range(len(text) - size + 1)]
+
+
+def simhash(text: str) -> int:
+    """64位SimHash"""
+    weights = [0] * 64
+    for shingle in shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    fingerprint = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def song_version(song) -> str:
+    """歌曲内容版本（回答依赖的字段变化时改变）"""
+    payload = '\x1f'.join([song.title or '', song.artist or '', song.album or '', song.lyrics or ''])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class AnswerCache:
+    """按歌曲缓存@AI问题的回答（Redis）"""
+
+    KEY_PREFIX = 'comments:answers:'
+    STATS_KEY = 'comments:answers:stats'  # HASH：hits / misses
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AI_ANSWER_CACHE_ENABLED
+
+    def _key(self, song_id: int) -> str:
+        return f'{self.KEY_PREFIX}{song_id}'
+
+    def lookup(self, song, question: str):
+        """
+        查找相似问题的回答
+
+        Returns:
+            dict: {'answer', 'question', 'distance'}，未命中返回None
+        """
+        if not self.enabled:
+            return None
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+
+        fingerprint = simhash(normalized)
+        key = self._key(song.song_id)
+        try:
+            client = get_redis()
+            entries = client.hgetall(key)
+            if entries and entries.get(VERSION_FIELD) != song_version(song):
+                # 歌曲内容已变化，整首歌的缓存失效
+                client.delete(key)
+                logger.info(f'歌曲 {song.song_id} 内容已变化，清除问题答案缓存')
+                entries = {}
+
+            best = self._best_match(entries, fingerprint)
+            client.hincrby(self.STATS_KEY, 'hits' if best else 'misses', 1)
+        except Exception as e:
+            logger.warning(f'读取问题答案缓存失败: {str(e)}')
+            return None
+
+        if best:
+            logger.info(f'歌曲 {song.song_id} 问题命中答案缓存（汉明距离 {best["distance"]}）: {question[:30]}')
+        return best
+
+    @staticmethod
+    def _best_match(entries: dict, fingerprint: int):
+        """汉明距离最小且在阈值内、未过期的条目"""
+        now = time.time()
+        ttl = settings.AI_ANSWER_CACHE_TTL
+        best = None
+        for field, raw in entries.items():
+            if field == VERSION_FIELD:
+                continue
+            distance = hamming_distance(fingerprint, int(field, 16))
+            if distance > settings.AI_ANSWER_CACHE_MAX_DISTANCE:
+                continue
+            entry = json.loads(raw)
+            if now - entry.get('created_at', 0) > ttl:
+                continue
+            if best is None or distance < best['distance']:
+                best = {'answer': entry['answer'], 'question': entry['question'], 'distance': distance}
+        return best
+
+    def store(self, song, question: str, answer: str):
+        """写入回答（超过每首歌的条目上限时淘汰最早的条目）"""
+        if not self.enabled or not answer:
+            return
+        normalized = normalize_question(question)
+        if not normalized:
+            return
+
+        key = self._key(song.song_id)
+        field = f'{simhash(normalized):016x}'
+        value = json.dumps({'question': question, 'answer': answer, 'created_at': time.time()}, ensure_ascii=False)
+        try:
+            client = get_redis()
+            pipe = client.pipeline()
+            pipe.hset(key, mapping={VERSION_FIELD: song_version(song), field: value})
+            pipe.expire(key, settings.AI_ANSWER_CACHE_TTL)
+            pipe.hlen(key)
+            _, _, size = pipe.execute()
+            if size - 1 > settings.AI_ANSWER_CACHE_MAX_ENTRIES:
+                self._evict(client, key)
+        except Exception as e:
+            logger.warning(f'写入问题答案缓存失败: {str(e)}')
+
+    @staticmethod
+    def _evict(client, key: str):
+        entries = client.hgetall(key)
+        answers = sorted(
+            ((json.loads(raw).get('created_at', 0), field) for field, raw in entries.items() if field != VERSION_FIELD)
+        )
+        overflow = len(answers) - settings.AI_ANSWER_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            client.hdel(key, *[field for _, field in answers[:overflow]])
+
+    def invalidate(self, song_id: int):
+        """清除歌曲的全部缓存"""
+        try:
+            get_redis().delete(self._key(song_id))
+        except Exception as e:
+            logger.warning(f'清除问题答案缓存失败: {str(e)}')
+
+    def stats(self) -> dict:
+        """命中率统计"""
+        try:
+            counters = get_redis().hgetall(self.STATS_KEY)
+        except Exception as e:
+            logger.warning(f'读取问题答案缓存统计失败: {str(e)}')
+            return {}
+        hits = int(counters.get('hits', 0))
+        misses = int(counters.get('misses', 0))
+        total = hits + misses
+        return {
+            'enabled': self.enabled,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+        }
+
+
+# 创建全局缓存实例
+answer_cache = AnswerCache()
@@ -0,0 +1,93 @@
+"""
+@AI回复微批处理（按歌曲）
+评论高峰时同一首歌的@AI问题先进入Redis列表，在 AI_REPLY_BATCH_WINDOW_MS 的聚合窗口后
+由一个批处理任务取出（每批最多 AI_REPLY_BATCH_MAX_SIZE 个），合并为一次模型调用。
+
+调度标记（scheduled键）存在时表示已有待执行的批处理任务：
+入队时 SET NX 成功才安排新任务；出队在Lua脚本中原子完成，列表取空时同时删除标记，
+列表仍有剩余时保留标记并由批处理任务立即安排下一批，不会遗漏问题。
+"""
+import logging
+from django.conf import settings
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 出队：KEYS[1]=列表，KEYS[2]=调度标记，ARGV[1]=最大数量；返回 {评论ID列表, 剩余数量}
+POP_SCRIPT = """
+local items = redis.call('LPOP', KEYS[1], ARGV[1]) or {}
+local remaining = redis.call('LLEN', KEYS[1])
+if remaining == 0 then
+    redis.call('DEL', KEYS[2])
+end
+return {items, remaining}
+"""
+
+
+class ReplyBatcher:
+    """按歌曲聚合@AI问题"""
+
+    KEY_PREFIX = 'comments:ai_batch:'
+
+    def __init__(self):
+        self._pop_script = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AI_REPLY_BATCH_ENABLED
+
+    def _queue_key(self, song_id: int) -> str:
+        return f'{self.KEY_PREFIX}{song_id}'
+
+    def _scheduled_key(self, song_id: int) -> str:
+        return f'{self.KEY_PREFIX}{song_id}:scheduled'
+
+    def enqueue(self, comment) -> bool:
+        """
+        加入歌曲的聚合队列，需要时安排批处理任务
+
+        Returns:
+            bool: 是否已加入队列（未启用或Redis不可用时返回False，由调用方单独处理）
+        """
+        if not self.enabled:
+            return False
+
+        from ..tasks import generate_ai_reply_batch
+
+        song_id = comment.song_id
+        try:
+            client = get_redis()
+            pipe = client.pipeline()
+            pipe.rpush(self._queue_key(song_id), comment.comment_id)
+            # 标记过期时间兜底：批处理任务丢失时，之后的问题可以重新安排任务
+            pipe.set(self._scheduled_key(song_id), 1, nx=True, ex=settings.AI_REPLY_BATCH_SCHEDULE_TTL)
+            _, scheduled = pipe.execute()
+        except Exception as e:
+            logger.warning(f'@AI问题加入聚合队列失败，单独生成回复: {str(e)}')
+            return False
+
+        if scheduled:
+            generate_ai_reply_batch.apply_async(
+                args=[song_id], countdown=settings.AI_REPLY_BATCH_WINDOW_MS / 1000
+            )
+        return True
+
+    def pop(self, song_id: int):
+        """
+        取出一批评论ID
+
+        Returns:
+            tuple: (评论ID列表, 队列剩余数量)
+        """
+        client = get_redis()
+        if self._pop_script is None:
+            self._pop_script = client.register_script(POP_SCRIPT)
+        items, remaining = self._pop_script(
+            keys=[self._queue_key(song_id), self._scheduled_key(song_id)],
+            args=[settings.AI_REPLY_BATCH_MAX_SIZE]
+        )
+        return [int(item) for item in items], int(remaining)
+
+
+# 创建全局实例
+reply_batcher = ReplyBatcher()
@@ -0,0 +1,81 @@
+"""
+@AI回复流式输出
+生成回复时，每个文字片段追加到Redis列表（缓冲区）并发布到以用户评论ID为键的频道；
+SSE接口先订阅频道、再读取缓冲区，按序号去重后转发给客户端，
+晚于生成开始连接的客户端也能拿到完整内容。
+
+事件格式（JSON）：
+- {'type': 'reset'}：重新开始生成（任务重试），客户端清空已显示的内容
+- {'type': 'delta', 'seq': n, 'text': '...'}：新生成的文字片段
+- {'type': 'done', 'comment_id': AI回复评论ID, 'content': 完整回复}
+- {'type': 'error', 'message': '...'}
+"""
+import json
+import logging
+from django.conf import settings
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'comments:ai_reply:'
+
+
+def channel_name(comment_id: int) -> str:
+    """回复流频道（以用户评论ID为键）"""
+    return f'{CHANNEL_PREFIX}{comment_id}'
+
+
+def buffer_key(comment_id: int) -> str:
+    """已生成片段的缓冲区"""
+    return f'{CHANNEL_PREFIX}{comment_id}:buffer'
+
+
+class ReplyStreamPublisher:
+    """
+    发布回复流事件（Redis不可用时只记录警告，不影响回复生成）
+
+    Args:
+        comment_id: 用户评论ID
+    """
+
+    def __init__(self, comment_id: int):
+        self.comment_id = comment_id
+        self.channel = channel_name(comment_id)
+        self.buffer = buffer_key(comment_id)
+        self.seq = 0
+
+    def _publish(self, event: dict, buffered: bool = False):
+        payload = json.dumps(event, ensure_ascii=False)
+        try:
+            pipe = get_redis().pipeline()
+            if buffered:
+                pipe.rpush(self.buffer, payload)
+                pipe.expire(self.buffer, settings.AI_REPLY_STREAM_TTL)
+            pipe.publish(self.channel, payload)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f'发布AI回复流事件失败（评论 {self.comment_id}）: {str(e)}')
+
+    def start(self):
+        """开始生成：清空上次（重试前）的缓冲区"""
+        try:
+            get_redis().delete(self.buffer)
+        except Exception as e:
+            logger.warning(f'清空AI回复流缓冲区失败（评论 {self.comment_id}）: {str(e)}')
+        self.seq = 0
+        self._publish({'type': 'reset'})
+
+    def delta(self, text: str):
+        self.seq += 1
+        self._publish({'type': 'delta', 'seq': self.seq, 'text': text}, buffered=True)
+
+    def done(self, reply_comment_id: int, content: str):
+        self._publish({'type': 'done', 'comment_id': reply_comment_id, 'content': content}, buffered=True)
+
+    def error(self, message: str):
+        self._publish({'type': 'error', 'message': message}, buffered=True)
+
+
+def read_buffer(comment_id: int) -> list:
+    """读取已发布的事件（按发布顺序）"""
+    return [json.loads(item) for item in get_redis().lrange(buffer_key(comment_id), 0, -1)]
@@ -2,11 +2,20 @@
 评论相关Celery任务
 """
 import logging
+import math
+import re
 from celery import shared_task
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from .models import Comment
+from .services.reply_stream import ReplyStreamPublisher
+from .services.answer_cache import answer_cache
+from .services.reply_batcher import reply_batcher
 from apps.songs.models import Song
 from apps.aigc.services.wanxiang_service import wanxiang_service
+from apps.aigc.services.rate_limiter import RateLimited
+from apps.aigc.services.snapshot_publisher import schedule_song_snapshot
+from utils.retry_policy import is_retryable, backoff_countdown
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -20,6 +29,7 @@ def generate_ai_reply(self, comment_id: int):
     Args:
         comment_id: 用户评论ID
     """
+    publisher = ReplyStreamPublisher(comment_id)
     try:
         # 获取用户评论
         user_comment = Comment.objects.get(comment_id=comment_id, is_active=True)
@@ -29,10 +39,7 @@ def generate_ai_reply(self, comment_id: int):
         ai_user = User.objects.get(phone='ai_assistant')
         
         # 提取用户问题（去除@AI标记）
-        user_content = user_comment.content
-        # 移除@AI标记（不区分大小写）
-        import re
-        question = re.sub(r'@AI\s*', '', user_content, flags=re.IGNORECASE).strip()
+        question = _extract_question(user_comment.content)
         
         if not question:
             logger.warning(f'用户评论 {comment_id} 中没有有效问题')
@@ -41,42 +48,204 @@ def generate_ai_reply(self, comment_id: int):
         # 构建提示词
         prompt = f"""你是一位音乐评论助手。基于以下歌曲信息，回答用户的问题。
 
-歌曲信息：
-- 歌曲名称：《{song.title}》
-- 艺术家：{song.artist}
-- 专辑：{song.album or "未知"}
-{f"- 歌词：{song.lyrics[:200]}..." if song.lyrics else ""}
+{_song_context(song)}
 
 用户问题：{question}
 
 请用简洁、友好的语言回答问题，控制在200字以内。如果问题与歌曲无关，可以礼貌地说明。"""
 
-        # 调用千问大模型生成回复
-        logger.info(f'开始为评论 {comment_id} 生成AI回复，问题：{question[:50]}...')
-        ai_response = wanxiang_service.generate_text(prompt, max_tokens=300)
+        # 同一首歌下的相似问题直接复用已生成的回答
+        cached = answer_cache.lookup(song, question)
+        if cached:
+            ai_response = cached['answer']
+        else:
+            # 调用千问大模型生成回复（流式模式下边生成边发布到回复流，客户端通过SSE接口实时显示）
+            logger.info(f'开始为评论 {comment_id} 生成AI回复，问题：{question[:50]}...')
+            if settings.AI_REPLY_STREAMING_ENABLED:
+                ai_response = _stream_reply(publisher, prompt)
+            else:
+                ai_response = wanxiang_service.generate_text(prompt, max_tokens=300)
         
         if not ai_response or len(ai_response.strip()) == 0:
             logger.warning(f'AI回复生成失败，返回空内容')
+            publisher.error('AI回复生成失败')
             return
         
-        # 创建AI回复评论
-        ai_comment = Comment.objects.create(
-            content=ai_response.strip(),
-            user=ai_user,
-            song=song,
-            parent=user_comment,
-            like_count=0,
-            is_active=True
-        )
-        
-        logger.info(f'AI回复生成成功，评论ID: {ai_comment.comment_id}')
+        ai_comment = _save_ai_reply(user_comment, ai_user, ai_response, publisher)
+        if not cached:
+            answer_cache.store(song, question, ai_comment.content)
         
     except Comment.DoesNotExist:
         logger.error(f'评论 {comment_id} 不存在')
     except User.DoesNotExist:
         logger.error('AI助手用户不存在，请先创建')
+    except RateLimited as e:
+        # DashScope调用限流，稍后重新投递（不计入重试次数）
+        logger.info(f'评论 {comment_id} 的AI回复被限流，{math.ceil(e.retry_after)}秒后重试')
+        generate_ai_reply.apply_async(args=[comment_id], countdown=math.ceil(e.retry_after))
     except Exception as e:
         logger.error(f'生成AI回复失败: {str(e)}', exc_info=True)
-        # 重试
-        raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
+        # 只重试临时错误（网络、限流、服务端异常），参数/内容审核等错误直接放弃
+        if not is_retryable(e) or self.request.retries >= self.max_retries:
+            publisher.error('AI回复生成失败')
+        if not is_retryable(e):
+            return
+        raise self.retry(exc=e, countdown=backoff_countdown(self.request.retries))
+
+
+def _stream_reply(publisher: ReplyStreamPublisher, prompt: str) -> str:
+    """流式生成回复，每个片段发布到回复流，返回完整回复"""
+    publisher.start()
+    parts = []
+    for delta in wanxiang_service.stream_text(prompt, max_tokens=300):
+        parts.append(delta)
+        publisher.delta(delta)
+    return ''.join(parts)
+
+
+def _extract_question(content: str) -> str:
+    """提取用户问题（移除@AI标记，不区分大小写）"""
+    return re.sub(r'@AI\s*', '', content or '', flags=re.IGNORECASE).strip()
+
+
+def _song_context(song) -> str:
+    """提示词中的歌曲信息（歌词取自歌词结构索引，不含LRC时间标签）"""
+    lyrics = song.lyrics_section('all')
+    return f"""歌曲信息：
+- 歌曲名称：《{song.title}》
+- 艺术家：{song.artist}
+- 专辑：{song.album or "未知"}
+{f"- 歌词：{lyrics}..." if lyrics else ""}"""
+
+
+def _save_ai_reply(user_comment: Comment, ai_user, content: str, publisher: ReplyStreamPublisher) -> Comment:
+    """创建AI回复评论，并通知回复流"""
+    ai_comment = Comment.objects.create(
+        content=content.strip(),
+        user=ai_user,
+        song=user_comment.song,
+        parent=user_comment,
+        like_count=0,
+        is_active=True
+    )
+    publisher.done(ai_comment.comment_id, ai_comment.content)
+    # AI回复显示在精彩评论的回复中
+    schedule_song_snapshot(
+        ai_comment.song_id, names=['featured_comments'], debounce=settings.SNAPSHOT_COMMENT_DEBOUNCE
+    )
+    logger.info(f'AI回复生成成功，评论ID: {ai_comment.comment_id}')
+    return ai_comment
+
+
+@shared_task(bind=True, max_retries=3)
+def generate_ai_reply_batch(self, song_id: int, comment_ids: list = None, attempt: int = 0):
+    """
+    批量生成同一首歌的AI回复（微批处理，见 services/reply_batcher.py）
+    
+    命中答案缓存的问题直接回复，其余问题合并为一次模型调用，按【回答N】拆分后分别回复；
+    被限流或遇到可重试的错误时，这一批问题延迟后整批重试（不拆成多次调用再次触发限流），
+    重试用尽、遇到不可重试的错误或拆分结果与问题数不一致时，改为逐条投递 generate_ai_reply
+    
+    Args:
+        song_id: 歌曲ID
+        comment_ids: 重试时的这一批评论ID（为空时从聚合队列取出）
+        attempt: 已重试次数
+    """
+    if comment_ids is None:
+        comment_ids, remaining = reply_batcher.pop(song_id)
+        if remaining:
+            # 队列中还有问题（超过单批上限），立即安排下一批
+            generate_ai_reply_batch.delay(song_id)
+    if not comment_ids:
+        return
+    
+    try:
+        ai_user = User.objects.get(phone='ai_assistant')
+    except User.DoesNotExist:
+        logger.error('AI助手用户不存在，请先创建')
+        return
+    
+    song = Song.objects.filter(song_id=song_id).first()
+    if song is None:
+        return
+    comments = Comment.objects.filter(comment_id__in=comment_ids, song_id=song_id, is_active=True)
+    
+    pending = []
+    for user_comment in comments:
+        question = _extract_question(user_comment.content)
+        if not question:
+            logger.warning(f'用户评论 {user_comment.comment_id} 中没有有效问题')
+            continue
+        cached = answer_cache.lookup(song, question)
+        if cached:
+            _save_ai_reply(user_comment, ai_user, cached['answer'], ReplyStreamPublisher(user_comment.comment_id))
+        else:
+            pending.append((user_comment, question))
+    
+    if len(pending) == 1:
+        # 只有一个问题时按单条处理（支持流式输出）
+        generate_ai_reply.delay(pending[0][0].comment_id)
+        return
+    if not pending:
+        return
+    
+    logger.info(f'歌曲 {song_id} 批量生成 {len(pending)} 条AI回复')
+    try:
+        answers = _generate_batch_answers(song, [question for _, question in pending])
+    except Exception as e:
+        if (isinstance(e, RateLimited) or is_retryable(e)) and attempt < self.max_retries:
+            countdown = math.ceil(e.retry_after) if isinstance(e, RateLimited) else backoff_countdown(attempt)
+            logger.warning(f'歌曲 {song_id} 批量生成AI回复失败，{countdown}秒后整批重试: {str(e)}')
+            generate_ai_reply_batch.apply_async(
+                args=[song_id],
+                kwargs={'comment_ids': [user_comment.comment_id for user_comment, _ in pending], 'attempt': attempt + 1},
+                countdown=max(countdown, 1)
+            )
+            return
+        logger.warning(f'歌曲 {song_id} 批量生成AI回复失败，改为逐条生成: {str(e)}')
+        answers = None
+    
+    if answers is None:
+        for user_comment, _ in pending:
+            generate_ai_reply.delay(user_comment.comment_id)
+        return
+    
+    for (user_comment, question), answer in zip(pending, answers):
+        ai_comment = _save_ai_reply(user_comment, ai_user, answer, ReplyStreamPublisher(user_comment.comment_id))
+        answer_cache.store(song, question, ai_comment.content)
+
+
+def _generate_batch_answers(song, questions: list):
+    """
+    一次模型调用回答多个问题
+    
+    Returns:
+        list: 与questions顺序一致的回答；返回结果无法按编号完整拆分时返回None
+    """
+    numbered = '\n'.join(f'【问题{idx}】{question}' for idx, question in enumerate(questions, 1))
+    prompt = f"""你是一位音乐评论助手。基于以下歌曲信息，分别回答用户的{len(questions)}个问题。
 
+{_song_context(song)}
+
+用户问题：
+{numbered}
+
+请按编号逐一回答，每个回答以“【回答N】”开头（N为对应的问题编号），不要输出其他内容。
+每个回答用简洁、友好的语言，控制在200字以内。如果问题与歌曲无关，可以礼貌地说明。"""
+    
+    max_tokens = min(300 * len(questions), settings.AI_REPLY_BATCH_MAX_TOKENS)
+    return _split_batch_answers(wanxiang_service.generate_text(prompt, max_tokens=max_tokens), len(questions))
+
+
+def _split_batch_answers(text: str, count: int):
+    """按【回答N】拆分批量回答，编号不完整或有空回答时返回None"""
+    parts = re.split(r'【回答\s*(\d+)\s*】', text or '')
+    answers = {}
+    for number, answer in zip(parts[1::2], parts[2::2]):
+        answers.setdefault(int(number), answer.strip())
+    
+    result = [answers.get(idx) for idx in range(1, count + 1)]
+    if not all(result):
+        logger.warning(f'批量回答拆分失败：需要 {count} 个回答，解析到编号 {sorted(answers)}')
+        return None
+    return result
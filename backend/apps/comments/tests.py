@@ -1,3 +1,61 @@
-from django.test import TestCase
+"""
+评论快速序列化器测试：输出与DRF序列化器一致，稀疏字段下评论列表正常返回
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase
+from apps.songs.models import Song
+from .models import Comment, UserCommentLike
+from .serializers import CommentSerializer
+from .fast_serializers import CommentFastSerializer, AI_ASSISTANT_PHONE
 
-# Create your tests here.
+User = get_user_model()
+
+
+class CommentFastSerializerTests(TestCase):
+    """CommentFastSerializer 与 CommentSerializer 输出一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone='13800000000', password='test', nickname='听众')
+        ai_user = User.objects.create_user(phone=AI_ASSISTANT_PHONE, nickname='AI助手')
+        cls.song = Song.objects.create(title='晴天', artist='周杰伦', duration=269)
+
+        first = Comment.objects.create(content='好听', user=cls.user, song=cls.song, like_count=5)
+        Comment.objects.create(content='前奏绝了', user=cls.user, song=cls.song, like_count=1)
+        reply = Comment.objects.create(content='@AI 这首歌讲了什么', user=cls.user, song=cls.song, parent=first)
+        Comment.objects.create(content='讲的是青春回忆', user=ai_user, song=cls.song, parent=reply)
+        UserCommentLike.objects.create(user=cls.user, comment=first)
+        UserCommentLike.objects.create(user=cls.user, comment=reply)
+
+        cls.queryset = Comment.objects.filter(
+            song=cls.song, is_active=True, parent=None
+        ).order_by('-like_count', '-created_at')
+
+    def _request(self, params=None, user=None):
+        request = RequestFactory().get('/', params or {})
+        request.user = user or AnonymousUser()
+        return request
+
+    def _assert_matches(self, request):
+        context = {'request': request}
+        expected = [dict(item) for item in CommentSerializer(self.queryset, many=True, context=context).data]
+        self.assertEqual(CommentFastSerializer(context=context).serialize(self.queryset), expected)
+
+    def test_matches_drf_serializer(self):
+        self._assert_matches(self._request())
+        self._assert_matches(self._request(user=self.user))
+
+    def test_sparse_fields(self):
+        for params in ({'fields': 'content'}, {'fields': 'content,replies'}, {'exclude': 'comment_id'}):
+            with self.subTest(params=params):
+                self._assert_matches(self._request(params, user=self.user))
+
+    def test_comment_list_with_sparse_fields(self):
+        for params in ({'fields': 'content'}, {'exclude': 'comment_id'}):
+            with self.subTest(params=params):
+                response = self.client.get(f'/api/songs/{self.song.song_id}/comments/', params)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()['data']
+                self.assertEqual(len(data['featured_comments']), 2)
+                self.assertNotIn('comment_id', data['featured_comments'][0])
@@ -12,5 +12,6 @@ urlpatterns = [
     path('songs/<int:song_id>/comments/create/', views.comment_create, name='comment_create_api'),
     path('comments/<int:comment_id>/like/', views.comment_like, name='comment_like_api'),
     path('comments/<int:comment_id>/delete/', views.comment_delete, name='comment_delete_api'),
+    path('comments/<int:comment_id>/ai-reply/stream/', views.ai_reply_stream, name='ai_reply_stream_api'),
 ]
 
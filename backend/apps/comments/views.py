@@ -1,19 +1,38 @@
 """
 评论视图
 """
+import json
 import logging
+import time
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
 from .models import Comment
 from .serializers import CommentSerializer, CommentCreateSerializer
+from .fast_serializers import CommentFastSerializer, AI_ASSISTANT_PHONE
+from .services.reply_stream import channel_name, read_buffer
 from apps.songs.models import Song
+from apps.aigc.services.summary_tracker import summary_tracker
+from apps.aigc.services.snapshot_publisher import schedule_song_snapshot
+from utils.redis_client import get_redis
 
 logger = logging.getLogger(__name__)
 
 
+def _on_comments_changed(comment):
+    """评论变化后：主评论变化时标记评论摘要待刷新，并刷新精彩评论快照（事务提交后，防抖）"""
+    if comment.parent_id is None:
+        summary_tracker.mark_dirty(comment.song_id)
+    schedule_song_snapshot(
+        comment.song_id, names=['featured_comments'], debounce=settings.SNAPSHOT_COMMENT_DEBOUNCE
+    )
+
+
 # ==================== API视图 ====================
 
 @api_view(['GET'])
@@ -29,9 +48,13 @@ def comment_list(request, song_id):
         parent=None
     ).order_by('-like_count', '-created_at')
     
+    # 传递request上下文，以便序列化器可以获取当前用户信息
+    serializer = CommentFastSerializer(context={'request': request})
+    
     # 精彩评论策略：点赞数最高的3条评论，自动获选
-    featured_comments = all_comments[:3]
-    featured_ids = list(featured_comments.values_list('comment_id', flat=True))
+    # （ID单独查询，?fields= 裁剪掉comment_id时输出中没有ID）
+    featured_ids = list(all_comments.values_list('comment_id', flat=True)[:3])
+    featured_data = serializer.serialize(all_comments.filter(comment_id__in=featured_ids))
     
     # 普通评论（排除精彩评论）
     comments = all_comments.exclude(comment_id__in=featured_ids)
@@ -43,16 +66,14 @@ def comment_list(request, song_id):
     paginator = Paginator(comments, limit)
     page_obj = paginator.get_page(page)
     
-    # 传递request上下文，以便序列化器可以获取当前用户信息
-    featured_serializer = CommentSerializer(featured_comments, many=True, context={'request': request})
-    comments_serializer = CommentSerializer(page_obj.object_list, many=True, context={'request': request})
+    comments_data = serializer.serialize(page_obj.object_list)
     
     return Response({
         'success': True,
         'message': '获取成功',
         'data': {
-            'featured_comments': featured_serializer.data,
-            'comments': comments_serializer.data,
+            'featured_comments': featured_data,
+            'comments': comments_data,
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -104,16 +125,22 @@ def comment_create(request, song_id):
     
     if serializer.is_valid():
         comment = serializer.save(user=request.user)
+        _on_comments_changed(comment)
         
         # 检测是否包含@AI，如果包含则触发AI回复生成任务
         import re
         content = comment.content
+        data = CommentSerializer(comment, context={'request': request}).data
         if re.search(r'@AI', content, re.IGNORECASE):
             try:
                 from .tasks import generate_ai_reply
-                # 异步生成AI回复
-                generate_ai_reply.delay(comment.comment_id)
+                from .services.reply_batcher import reply_batcher
+                # 异步生成AI回复（同一首歌短时间内的问题合并为一批处理）
+                if not reply_batcher.enqueue(comment):
+                    generate_ai_reply.delay(comment.comment_id)
                 logger.info(f'已触发AI回复生成任务，评论ID: {comment.comment_id}')
+                # 客户端可通过该地址（SSE）实时接收回复内容
+                data['ai_reply_stream_url'] = f'/api/comments/{comment.comment_id}/ai-reply/stream/'
             except Exception as e:
                 logger.error(f'触发AI回复生成任务失败: {str(e)}', exc_info=True)
                 # 不阻塞用户评论，静默失败
@@ -121,7 +148,7 @@ def comment_create(request, song_id):
         return Response({
             'success': True,
             'message': '评论成功' if not parent_id else '回复成功',
-            'data': CommentSerializer(comment, context={'request': request}).data
+            'data': data
         }, status=status.HTTP_201_CREATED)
     
     return Response({
@@ -160,6 +187,8 @@ def comment_like(request, comment_id):
         message = '取消点赞成功'
         is_liked = False
     
+    _on_comments_changed(comment)
+    
     return Response({
         'success': True,
         'message': message,
@@ -187,8 +216,88 @@ def comment_delete(request, comment_id):
     # 软删除
     comment.is_active = False
     comment.save(update_fields=['is_active'])
+    _on_comments_changed(comment)
     
     return Response({
         'success': True,
         'message': '删除成功'
     })
+
+
+@require_GET
+def ai_reply_stream(request, comment_id):
+    """
+    @AI回复流（Server-Sent Events）
+    
+    推送AI回复的生成过程：reset / delta / done / error 事件（格式见 services/reply_stream.py），
+    回复已生成时直接推送done；超过 AI_REPLY_STREAM_TIMEOUT 秒未完成时推送timeout并关闭连接。
+    不使用DRF视图，避免Accept: text/event-stream 被内容协商拒绝。
+    """
+    comment = get_object_or_404(Comment, comment_id=comment_id, is_active=True)
+    response = StreamingHttpResponse(_ai_reply_events(comment), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭Nginx缓冲，片段到达后立即发送
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _sse(event: dict) -> str:
+    """格式化为SSE消息"""
+    return f'data: {json.dumps(event, ensure_ascii=False)}\n\n'
+
+
+def _ai_reply_events(comment):
+    """生成SSE事件：先订阅回复流频道，再补发缓冲区中的事件，之后转发新事件（按序号去重）"""
+    ai_reply = Comment.objects.filter(
+        parent=comment, user__phone=AI_ASSISTANT_PHONE, is_active=True
+    ).order_by('created_at').first()
+    if ai_reply:
+        yield _sse({'type': 'done', 'comment_id': ai_reply.comment_id, 'content': ai_reply.content})
+        return
+    
+    try:
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel_name(comment.comment_id))
+    except Exception as e:
+        logger.error(f'订阅AI回复流失败: {str(e)}')
+        yield _sse({'type': 'error', 'message': 'AI回复流不可用'})
+        return
+    
+    try:
+        last_seq = 0
+        for event in read_buffer(comment.comment_id):
+            if event['type'] == 'delta':
+                last_seq = event['seq']
+            yield _sse(event)
+            if event['type'] in ('done', 'error'):
+                return
+        
+        deadline = time.monotonic() + settings.AI_REPLY_STREAM_TIMEOUT
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=1.0)
+            if message is None:
+                # 心跳，防止代理断开空闲连接
+                if time.monotonic() - last_sent >= settings.AI_REPLY_STREAM_HEARTBEAT:
+                    last_sent = time.monotonic()
+                    yield ': ping\n\n'
+                continue
+            
+            event = json.loads(message['data'])
+            if event['type'] == 'delta':
+                if event['seq'] <= last_seq:
+                    continue
+                last_seq = event['seq']
+            elif event['type'] == 'reset':
+                last_seq = 0
+            last_sent = time.monotonic()
+            yield _sse(event)
+            if event['type'] in ('done', 'error'):
+                return
+        
+        yield _sse({'type': 'timeout'})
+    except Exception as e:
+        logger.error(f'推送AI回复流失败: {str(e)}')
+        yield _sse({'type': 'error', 'message': 'AI回复流中断'})
+    finally:
+        pubsub.close()
@@ -17,6 +17,7 @@ class SongAdmin(admin.ModelAdmin):
     list_filter = ('is_active', 'genre', 'created_at')
     search_fields = ('title', 'artist', 'album')
     readonly_fields = ('song_id', 'play_count', 'like_count', 'file_size', 'created_at', 'updated_at', 'file_url', 'cover_url')
+    actions = ['create_lyric_image_campaign']
     fieldsets = (
         ('基本信息', {
             'fields': ('song_id', 'title', 'artist', 'album', 'duration', 'genre')
@@ -47,6 +48,25 @@ class SongAdmin(admin.ModelAdmin):
         return '-'
     file_size.short_description = '文件大小'
     
+    def create_lyric_image_campaign(self, request, queryset):
+        """为选中的歌曲创建歌词配图批量生成活动（限速投递，进度在“AIGC批量生成活动”中查看）"""
+        from apps.aigc.services.campaigns import create_campaign
+        
+        song_ids = list(queryset.values_list('song_id', flat=True))
+        campaign = create_campaign(
+            name=f'歌词配图（管理后台选中 {len(song_ids)} 首）',
+            task_type='lyric_image',
+            parameters={'style': 'beautiful', 'count': 1, 'lyrics_section': 'chorus'},
+            song_filter={'song_ids': song_ids},
+            operator=request.user
+        )
+        self.message_user(
+            request,
+            f'已创建批量生成活动 #{campaign.campaign_id}（{campaign.total_tasks} 首歌曲），'
+            f'按每分钟 {campaign.rate_per_minute} 个任务投递'
+        )
+    create_lyric_image_campaign.short_description = '为选中的歌曲生成歌词配图（批量活动）'
+    
     def save_model(self, request, obj, form, change):
         """保存模型时处理歌词文件解析"""
         try:
@@ -109,6 +129,16 @@ class SongAdmin(admin.ModelAdmin):
             
             logger.info(f'保存歌曲: {obj.title}, 音频文件: {obj.audio_file.name if obj.audio_file else None}, 封面: {obj.cover_image.name if obj.cover_image else None}')
             super().save_model(request, obj, form, change)
+            
+            # 歌曲信息变化后刷新静态快照
+            from apps.aigc.services.snapshot_publisher import schedule_song_snapshot
+            schedule_song_snapshot(obj.song_id)
+            
+            # 歌词变化后清除@AI问题答案缓存（读取时也会按歌曲内容版本校验）
+            if change and ('lyrics' in form.changed_data or lyrics_file_uploaded):
+                from apps.comments.services.answer_cache import answer_cache
+                answer_cache.invalidate(obj.song_id)
+            
             if obj.audio_file:
                 logger.info(f'音频文件URL: {obj.file_url}')
             if obj.cover_image:
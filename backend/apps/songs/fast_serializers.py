@@ -0,0 +1,51 @@
+"""
+歌曲快速序列化器（用于热点列表接口）
+"""
+import logging
+from utils.fast_serializer import FastField, FastSerializer
+from utils.storage.oss_storage import image_storage
+
+logger = logging.getLogger(__name__)
+
+
+class SongListFastSerializer(FastSerializer):
+    """
+    歌曲列表快速序列化器
+
+    输出与 SongListWithFileSerializer 一致，file_url 直接生成代理URL
+    （列表接口最终返回的就是代理URL，无需先生成签名URL再替换）
+    """
+    fields = {
+        'song_id': FastField('song_id'),
+        'title': FastField('title'),
+        'artist': FastField('artist'),
+        'album': FastField('album'),
+        'duration': FastField('duration'),
+        'formatted_duration': FastField(method='get_formatted_duration', columns=('duration',)),
+        'file_url': FastField(method='get_file_url', columns=('song_id', 'audio_file')),
+        'cover_url': FastField(method='get_cover_url', columns=('cover_image',)),
+        'play_count': FastField('play_count'),
+        'like_count': FastField('like_count'),
+    }
+
+    def get_formatted_duration(self, row):
+        """格式化时长"""
+        duration = row['duration']
+        return f'{duration // 60}:{duration % 60:02d}'
+
+    def get_file_url(self, row):
+        """获取代理播放URL"""
+        if row['audio_file']:
+            return f'/api/songs/{row["song_id"]}/stream/'
+        return ''
+
+    def get_cover_url(self, row):
+        """获取封面URL"""
+        name = row['cover_image']
+        if not name:
+            return None
+        try:
+            return image_storage.url(name)
+        except Exception as e:
+            logger.error(f'获取封面URL失败: {name}, 错误: {str(e)}')
+            return None
@@ -0,0 +1,90 @@
+"""
+响应渲染器基准测试
+
+对真实接口（歌曲列表、评论列表、AIGC内容、任务列表）的响应数据，
+对比标准JSONRenderer、ORJSONRenderer、MessagePackRenderer的编码耗时与数据大小
+
+用法：
+    python manage.py benchmark_renderers
+    python manage.py benchmark_renderers --song-id 1 --limit 100 --repeat 20
+"""
+import gzip
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from apps.songs.models import Song
+from apps.songs.views import SongListView
+from apps.comments.views import comment_list
+from apps.aigc.views import song_aigc_content, task_list
+from apps.users.models import User
+from utils.renderers import ORJSONRenderer, MessagePackRenderer, MSGPACK_AVAILABLE, ORJSON_AVAILABLE
+
+
+class Command(BaseCommand):
+    help = '对比JSON/orjson/MessagePack渲染器在真实接口数据上的编码耗时与大小'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--song-id', type=int, help='评论/AIGC接口使用的歌曲ID（默认取评论最多的歌曲）')
+        parser.add_argument('--limit', type=int, default=100, help='列表接口每页数量')
+        parser.add_argument('--repeat', type=int, default=20, help='每个渲染器重复次数（取平均）')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        limit = options['limit']
+        song_id = options['song_id'] or self._default_song_id()
+
+        endpoints = [('歌曲列表', SongListView.as_view(), factory.get('/api/songs/', {'limit': limit}), {})]
+        if song_id:
+            endpoints += [
+                ('评论列表', comment_list, factory.get(f'/api/songs/{song_id}/comments/', {'limit': limit}),
+                 {'song_id': song_id}),
+                ('AIGC内容', song_aigc_content, factory.get(f'/api/songs/{song_id}/aigc/'), {'song_id': song_id}),
+            ]
+
+        staff = User.objects.filter(is_staff=True).first()
+        if staff:
+            request = factory.get('/api/admin/tasks/', {'limit': limit})
+            force_authenticate(request, user=staff)
+            endpoints.append(('任务列表', task_list, request, {}))
+
+        renderers = [('json', JSONRenderer())]
+        if ORJSON_AVAILABLE:
+            renderers.append(('orjson', ORJSONRenderer()))
+        if MSGPACK_AVAILABLE:
+            renderers.append(('msgpack', MessagePackRenderer()))
+
+        for name, view, request, kwargs in endpoints:
+            response = view(request, **kwargs)
+            if response.status_code != 200:
+                self.stdout.write(self.style.WARNING(f'{name}: 接口返回 {response.status_code}，跳过'))
+                continue
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            baseline = None
+            for renderer_name, renderer in renderers:
+                elapsed, body = self._measure(renderer, response.data, options['repeat'])
+                baseline = baseline or elapsed
+                self.stdout.write(
+                    f'  {renderer_name:<8} 编码 {elapsed * 1000:>8.3f} ms '
+                    f'({baseline / elapsed:>4.1f}x)  '
+                    f'大小 {len(body):>9} B  gzip {len(gzip.compress(body)):>8} B'
+                )
+
+    @staticmethod
+    def _measure(renderer, data, repeat):
+        """平均编码耗时"""
+        body = renderer.render(data, renderer.media_type, {})
+        start = time.perf_counter()
+        for _ in range(max(repeat, 1)):
+            renderer.render(data, renderer.media_type, {})
+        return (time.perf_counter() - start) / max(repeat, 1), body
+
+    @staticmethod
+    def _default_song_id():
+        """默认选取评论最多的激活歌曲"""
+        from django.db.models import Count
+        song = Song.objects.filter(is_active=True).annotate(
+            comments_total=Count('comment')
+        ).order_by('-comments_total').first()
+        return song.song_id if song else None
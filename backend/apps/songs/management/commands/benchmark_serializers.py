@@ -0,0 +1,107 @@
+"""
+快速序列化器基准测试与一致性校验
+
+对比 DRF 序列化器与快速序列化器在 20/100/1000 条数据下的吞吐（rows/s），
+并校验两者输出一致（签名URL的查询参数含过期时间，比较时忽略）
+
+用法：
+    python manage.py benchmark_serializers
+    python manage.py benchmark_serializers --sizes 20 100 --repeat 5
+"""
+import time
+from django.core.management.base import BaseCommand
+from apps.songs.models import Song
+from apps.songs.serializers import SongListWithFileSerializer
+from apps.songs.fast_serializers import SongListFastSerializer
+from apps.comments.models import Comment
+from apps.comments.serializers import CommentSerializer
+from apps.comments.fast_serializers import CommentFastSerializer
+from apps.aigc.models import AIGCContent
+from apps.aigc.serializers import AIGCContentSerializer
+from apps.aigc.fast_serializers import AIGCContentFastSerializer
+
+
+def _normalize(value):
+    """去除签名URL中的查询参数（Expires/Signature随时间变化）"""
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, str) and value.startswith('http') and '?' in value:
+        return value.split('?', 1)[0]
+    return value
+
+
+def _drf_song_list(queryset):
+    songs = SongListWithFileSerializer(queryset, many=True).data
+    # 与 SongListView 原有逻辑一致：替换 file_url 为代理URL
+    for song in songs:
+        if song.get('file_url') and song.get('song_id'):
+            song['file_url'] = f'/api/songs/{song["song_id"]}/stream/'
+    return songs
+
+
+class Command(BaseCommand):
+    help = '对比DRF序列化器与快速序列化器的吞吐，并校验输出一致'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000], help='每页数据量')
+        parser.add_argument('--repeat', type=int, default=3, help='每组重复次数（取最快一次）')
+        parser.add_argument('--no-check', action='store_true', help='跳过输出一致性校验')
+
+    def handle(self, *args, **options):
+        cases = [
+            (
+                '歌曲列表',
+                lambda size: Song.objects.filter(is_active=True)[:size],
+                _drf_song_list,
+                lambda queryset: SongListFastSerializer().serialize(queryset),
+            ),
+            (
+                '评论列表',
+                lambda size: Comment.objects.filter(is_active=True, parent=None)
+                .select_related('user').order_by('-like_count', '-created_at')[:size],
+                lambda queryset: CommentSerializer(queryset, many=True).data,
+                lambda queryset: CommentFastSerializer().serialize(queryset),
+            ),
+            (
+                'AIGC内容',
+                lambda size: AIGCContent.objects.select_related('task__song').order_by('-created_at')[:size],
+                lambda queryset: AIGCContentSerializer(queryset, many=True).data,
+                lambda queryset: AIGCContentFastSerializer().serialize(queryset),
+            ),
+        ]
+
+        for name, make_queryset, drf_serialize, fast_serialize in cases:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for size in options['sizes']:
+                drf_time, drf_data = self._measure(make_queryset, drf_serialize, size, options['repeat'])
+                fast_time, fast_data = self._measure(make_queryset, fast_serialize, size, options['repeat'])
+                rows = len(fast_data)
+
+                if not rows:
+                    self.stdout.write(f'  {size:>5} 条: 无数据，跳过')
+                    continue
+
+                self.stdout.write(
+                    f'  {size:>5} 条（实际 {rows}）: '
+                    f'DRF {rows / drf_time:>10.0f} rows/s, '
+                    f'快速 {rows / fast_time:>10.0f} rows/s, '
+                    f'加速 {drf_time / fast_time:.1f}x'
+                )
+
+                if not options['no_check'] and _normalize(list(drf_data)) != _normalize(fast_data):
+                    self.stdout.write(self.style.ERROR(f'  {size:>5} 条: 输出不一致'))
+
+    @staticmethod
+    def _measure(make_queryset, serialize, size, repeat):
+        """测量包含查询在内的序列化耗时（取最快一次）"""
+        best = None
+        data = []
+        for _ in range(max(repeat, 1)):
+            queryset = make_queryset(size)
+            start = time.perf_counter()
+            data = serialize(queryset)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, data
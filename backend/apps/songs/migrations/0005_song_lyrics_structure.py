@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0004_song_mv_video_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='lyrics_structure',
+            field=models.JSONField(blank=True, default=dict, help_text='去掉时间标签后的歌词行、副歌位置和段落划分，歌词变化时自动重新计算', verbose_name='歌词结构索引'),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='lyrics_structure_version',
+            field=models.CharField(blank=True, default='', max_length=40, verbose_name='歌词结构索引版本'),
+        ),
+    ]
@@ -53,6 +53,18 @@ class Song(models.Model):
         verbose_name='MV视频文件',
         help_text='支持MP4格式，建议分辨率720p或1080p，文件大小不超过500MB'
     )
+    lyrics_structure = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='歌词结构索引',
+        help_text='去掉时间标签后的歌词行、副歌位置和段落划分，歌词变化时自动重新计算'
+    )
+    lyrics_structure_version = models.CharField(
+        max_length=40,
+        blank=True,
+        default='',
+        verbose_name='歌词结构索引版本'
+    )
     genre = models.CharField(max_length=50, choices=GENRE_CHOICES, blank=True, null=True, verbose_name='音乐类型', db_index=True)
     play_count = models.IntegerField(default=0, verbose_name='播放次数', db_index=True)
     like_count = models.IntegerField(default=0, verbose_name='点赞数', db_index=True)
@@ -71,6 +83,41 @@ class Song(models.Model):
     def __str__(self):
         return f'{self.title} - {self.artist}'
     
+    def save(self, *args, **kwargs):
+        """保存时歌词有变化则重新计算歌词结构索引"""
+        if self._refresh_lyrics_structure():
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'lyrics_structure', 'lyrics_structure_version'}
+        super().save(*args, **kwargs)
+    
+    def _refresh_lyrics_structure(self) -> bool:
+        """索引与当前歌词不一致时重新计算，返回是否重新计算"""
+        from .utils.lyrics_structure import build_lyrics_structure, structure_version
+        
+        version = structure_version(self.lyrics)
+        if self.lyrics_structure_version == version:
+            return False
+        self.lyrics_structure = build_lyrics_structure(self.lyrics)
+        self.lyrics_structure_version = version
+        return True
+    
+    def get_lyrics_structure(self) -> dict:
+        """
+        获取歌词结构索引（索引过期时重新计算并单独保存，不更新其他字段）
+        """
+        if self._refresh_lyrics_structure() and self.pk:
+            Song.objects.filter(pk=self.pk).update(
+                lyrics_structure=self.lyrics_structure,
+                lyrics_structure_version=self.lyrics_structure_version
+            )
+        return self.lyrics_structure
+    
+    def lyrics_section(self, section_type: str = 'chorus', num_lines: int = None) -> str:
+        """按段落类型取歌词（chorus/verse/all），见 utils.lyrics_structure.extract_section"""
+        from .utils.lyrics_structure import extract_section
+        return extract_section(self.get_lyrics_structure(), section_type, num_lines)
+    
     def format_duration(self):
         """格式化时长显示"""
         minutes = self.duration // 60
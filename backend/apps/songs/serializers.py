@@ -4,10 +4,11 @@
 from rest_framework import serializers
 from .models import Song, PlayHistory, SearchHistory
 from apps.users.serializers import UserSerializer
+from utils.sparse_fields import SparseFieldsetMixin
 
 
-class SongSerializer(serializers.ModelSerializer):
-    """歌曲序列化器"""
+class SongSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """歌曲序列化器（支持 ?fields=/?exclude= 稀疏字段）"""
     formatted_duration = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
     cover_url = serializers.SerializerMethodField()
@@ -25,13 +26,26 @@ class SongSerializer(serializers.ModelSerializer):
             'bitrate', 'sample_rate', 'is_active', 'created_at', 'updated_at'
         )
         read_only_fields = ('song_id', 'play_count', 'like_count', 'created_at', 'updated_at')
+        # 计算字段依赖的模型列（用于稀疏字段的 .only() 查询）
+        field_columns = {
+            'formatted_duration': ('duration',),
+            'file_url': ('audio_file',),
+            'cover_url': ('cover_image',),
+            'file_size': ('audio_file',),
+            'mv_video_url': ('mv_video_file',),
+            'genre_display': ('genre',),
+        }
     
     def get_formatted_duration(self, obj):
         """格式化时长"""
         return obj.format_duration()
     
     def get_file_url(self, obj):
-        """获取文件URL"""
+        """获取文件URL（context中proxy_file_url为True时直接返回代理播放URL，不生成签名URL）"""
+        if self.context.get('proxy_file_url'):
+            if obj.audio_file and obj.audio_file.name:
+                return f'/api/songs/{obj.song_id}/stream/'
+            return ''
         return obj.file_url
     
     def get_cover_url(self, obj):
@@ -39,7 +53,10 @@ class SongSerializer(serializers.ModelSerializer):
         return obj.cover_url
     
     def get_file_size(self, obj):
-        """获取文件大小"""
+        """获取文件大小（批量接口会在context中预先并发查询好）"""
+        file_sizes = self.context.get('file_sizes')
+        if file_sizes is not None:
+            return file_sizes.get(obj.song_id)
         return obj.file_size
     
     def get_mv_video_url(self, obj):
@@ -1,3 +1,33 @@
-from django.test import TestCase
+"""
+歌曲快速序列化器测试：输出与DRF序列化器一致
+"""
+from django.test import RequestFactory, TestCase
+from .models import Song
+from .serializers import SongListWithFileSerializer
+from .fast_serializers import SongListFastSerializer
 
-# Create your tests here.
+
+class SongListFastSerializerTests(TestCase):
+    """SongListFastSerializer 与 SongListWithFileSerializer 输出一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Song.objects.create(title='晴天', artist='周杰伦', album='叶惠美', duration=269, play_count=10)
+        Song.objects.create(title='稻香', artist='周杰伦', duration=223, like_count=3)
+        cls.queryset = Song.objects.order_by('song_id')
+
+    def _drf_data(self):
+        return [dict(item) for item in SongListWithFileSerializer(self.queryset, many=True).data]
+
+    def test_matches_drf_serializer(self):
+        self.assertEqual(SongListFastSerializer().serialize(self.queryset), self._drf_data())
+
+    def test_sparse_fields(self):
+        for params in ({'fields': 'title,play_count'}, {'exclude': 'song_id,formatted_duration'}):
+            with self.subTest(params=params):
+                serializer = SongListFastSerializer(context={'request': RequestFactory().get('/', params)})
+                expected = [
+                    {name: item[name] for name in serializer.field_names}
+                    for item in self._drf_data()
+                ]
+                self.assertEqual(serializer.serialize(self.queryset), expected)
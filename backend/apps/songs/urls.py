@@ -10,7 +10,10 @@ app_name = 'songs'
 # 注意：更具体的路由要放在前面，避免被通用路由匹配
 api_urlpatterns = [
     path('songs/', views.SongListView.as_view(), name='song_list_api'),
+    path('songs/batch/', views.song_batch, name='song_batch_api'),
     path('songs/<int:song_id>/stream/', views.stream_audio, name='stream_audio_api'),
+    path('songs/<int:song_id>/cover/', views.song_media, {'media': 'cover'}, name='song_cover_api'),
+    path('songs/<int:song_id>/mv/', views.song_media, {'media': 'mv'}, name='song_mv_api'),
     path('songs/<int:song_id>/play/', views.play_song, name='play_song_api'),
     path('songs/<int:song_id>/like/', views.like_song, name='like_song_api'),
     path('songs/<int:song_id>/', views.SongDetailView.as_view(), name='song_detail_api'),
@@ -0,0 +1,185 @@
+"""
+歌词结构索引
+歌词保存时计算一次（Song.lyrics_structure），AIGC提示词直接按段落取歌词，不再重复解析原始歌词：
+- 去掉LRC时间标签和元数据行（[ti:]、[ar:]等），保留每行的时间
+- 副歌检测：每行归一化（全半角、大小写、去标点空白）后编号，
+  对不同长度的连续多行计算滚动哈希，重复覆盖行数最多的多行段落视为副歌
+- 段落划分：副歌出现的位置标为 chorus，之间的部分为 verse，最后一次副歌之后为 outro
+
+索引格式：
+    {
+        'lines': [{'text': '...', 'time': 12.5}, ...],     # 无时间标签时 time 为None
+        'chorus': {'start': 8, 'end': 12, 'occurrences': [8, 20]} 或 None,
+        'sections': [{'type': 'verse', 'start': 0, 'end': 8, 'start_time': 0.0, 'end_time': 30.5}, ...]
+    }
+start/end 为 lines 的下标（end不包含）。
+"""
+import hashlib
+import re
+import unicodedata
+from .lyrics_parser import is_lrc_format, parse_lrc
+
+# 算法版本（检测逻辑变化时加1，已保存的索引会重新计算）
+STRUCTURE_VERSION = 1
+
+# 副歌的行数范围
+CHORUS_MIN_LINES = 2
+CHORUS_MAX_LINES = 12
+
+# 滚动哈希参数
+HASH_BASE = 1000003
+HASH_MOD = (1 << 61) - 1
+
+METADATA_LINE = re.compile(r'^\[[a-zA-Z]+:[^\]]*\]$')
+# 歌词中手写的段落标记，如 [副歌]、[Chorus]、【主歌】
+SECTION_MARKER = re.compile(r'^[\[【(（][^\]】)）]{1,12}[\]】)）]$')
+NOISE = re.compile(r'[\s\W_]+')
+
+
+def structure_version(lyrics: str) -> str:
+    """歌词版本（算法版本 + 歌词摘要），与 Song.lyrics_structure_version 比较判断索引是否过期"""
+    digest = hashlib.sha1((lyrics or '').encode('utf-8')).hexdigest()[:16]
+    return f'{STRUCTURE_VERSION}:{digest}'
+
+
+def normalize_line(text: str) -> str:
+    """归一化歌词行（用于比较重复）"""
+    return NOISE.sub('', unicodedata.normalize('NFKC', text).lower())
+
+
+def split_lines(lyrics: str) -> list:
+    """拆分歌词行，去掉时间标签、元数据和段落标记"""
+    if not lyrics:
+        return []
+    if is_lrc_format(lyrics):
+        items = [{'text': item['text'], 'time': item['time']} for item in parse_lrc(lyrics)]
+    else:
+        items = [{'text': line.strip(), 'time': None} for line in lyrics.split('\n')]
+    return [
+        item for item in items
+        if item['text'] and not METADATA_LINE.match(item['text']) and not SECTION_MARKER.match(item['text'])
+    ]
+
+
+def _window_hashes(ids: list, length: int) -> list:
+    """所有长度为length的连续窗口的滚动哈希"""
+    if len(ids) < length:
+        return []
+    power = pow(HASH_BASE, length - 1, HASH_MOD)
+    value = 0
+    for item in ids[:length]:
+        value = (value * HASH_BASE + item) % HASH_MOD
+    hashes = [value]
+    for i in range(length, len(ids)):
+        value = ((value - ids[i - length] * power) * HASH_BASE + ids[i]) % HASH_MOD
+        hashes.append(value)
+    return hashes
+
+
+def find_chorus(lines: list):
+    """
+    找出重复覆盖行数最多的多行段落
+
+    Returns:
+        dict: {'start', 'end', 'occurrences'}，没有重复段落时返回None
+    """
+    # 每行归一化后编号（相同内容编号相同），编号从1开始
+    line_ids = {}
+    ids = [line_ids.setdefault(normalize_line(line['text']), len(line_ids) + 1) for line in lines]
+
+    best = None  # (覆盖行数, 行数, 出现位置)
+    max_length = min(CHORUS_MAX_LINES, len(ids) // 2)
+    for length in range(max_length, CHORUS_MIN_LINES - 1, -1):
+        positions = {}
+        for start, value in enumerate(_window_hashes(ids, length)):
+            positions.setdefault(value, []).append(start)
+
+        for starts in positions.values():
+            if len(starts) < 2:
+                continue
+            # 哈希相同时再比较内容，并去掉与上一次出现重叠的位置
+            block = ids[starts[0]:starts[0] + length]
+            occurrences = []
+            for start in starts:
+                if ids[start:start + length] != block:
+                    continue
+                if occurrences and start < occurrences[-1] + length:
+                    continue
+                occurrences.append(start)
+            # 整段都是同一行重复的不算副歌
+            if len(occurrences) < 2 or len(set(block)) == 1:
+                continue
+            candidate = (len(occurrences) * length, length, occurrences)
+            if best is None or candidate[:2] > best[:2]:
+                best = candidate
+
+    if best is None:
+        return None
+    _, length, occurrences = best
+    return {'start': occurrences[0], 'end': occurrences[0] + length, 'occurrences': occurrences}
+
+
+def build_sections(lines: list, chorus) -> list:
+    """按副歌出现的位置划分段落，并记录起止时间"""
+    bounds = []
+    cursor = 0
+    if chorus:
+        length = chorus['end'] - chorus['start']
+        for start in chorus['occurrences']:
+            if start > cursor:
+                bounds.append(('verse', cursor, start))
+            bounds.append(('chorus', start, start + length))
+            cursor = start + length
+    if cursor < len(lines):
+        bounds.append(('outro' if chorus else 'verse', cursor, len(lines)))
+
+    sections = []
+    for section_type, start, end in bounds:
+        sections.append({
+            'type': section_type,
+            'start': start,
+            'end': end,
+            'start_time': lines[start]['time'],
+            'end_time': lines[end]['time'] if end < len(lines) else None,
+        })
+    return sections
+
+
+def build_lyrics_structure(lyrics: str) -> dict:
+    """计算歌词结构索引"""
+    lines = split_lines(lyrics)
+    chorus = find_chorus(lines)
+    return {
+        'lines': lines,
+        'chorus': chorus,
+        'sections': build_sections(lines, chorus),
+    }
+
+
+def extract_section(structure: dict, section_type: str = 'chorus', num_lines: int = None) -> str:
+    """
+    按段落类型取歌词
+
+    Args:
+        structure: 歌词结构索引
+        section_type: chorus（副歌，默认8行）、verse（第一段主歌，默认4行）、all（全部，前200字）
+        num_lines: 最多返回的行数
+    """
+    lines = structure.get('lines') or []
+    if not lines:
+        return ''
+    if section_type == 'all':
+        return '\n'.join(line['text'] for line in lines)[:200]
+
+    start, end = 0, len(lines)
+    if section_type == 'chorus':
+        num_lines = num_lines or 8
+        chorus = structure.get('chorus')
+        if chorus:
+            start, end = chorus['start'], chorus['end']
+    else:
+        num_lines = num_lines or 4
+        verse = next((section for section in structure.get('sections') or [] if section['type'] == 'verse'), None)
+        if verse:
+            start, end = verse['start'], verse['end']
+    return '\n'.join(line['text'] for line in lines[start:min(end, start + num_lines)])
@@ -4,11 +4,17 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.http import StreamingHttpResponse, Http404
+from django.http import StreamingHttpResponse, Http404, HttpResponseRedirect
 from django.db import models
+from django.shortcuts import get_object_or_404
+from django.conf import settings
+from concurrent.futures import ThreadPoolExecutor
 from .models import Song, PlayHistory, SearchHistory
 from .serializers import SongSerializer, SongListSerializer, SongListWithFileSerializer
+from .fast_serializers import SongListFastSerializer
 from apps.comments.models import Comment
+from utils.sparse_fields import is_field_requested
+from utils.circuit_breaker import CircuitOpenError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,7 +31,12 @@ def stream_audio(request, song_id):
         
         # 从OSS读取文件
         audio_file = song.audio_file
-        file_obj = audio_file.storage._open(audio_file.name, 'rb')
+        try:
+            file_obj = audio_file.storage._open(audio_file.name, 'rb')
+        except CircuitOpenError:
+            # OSS熔断中：不再经过代理读取，重定向到签名URL（本地签名，不访问OSS）
+            logger.warning(f'OSS熔断中，歌曲 {song_id} 音频重定向到签名URL')
+            return HttpResponseRedirect(audio_file.url)
         
         # 设置响应头，允许浏览器播放
         response = StreamingHttpResponse(file_obj, content_type='audio/mpeg')
@@ -50,9 +61,24 @@ def stream_audio(request, song_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def song_media(request, song_id, media):
+    """
+    重定向到歌曲封面（media=cover）或MV（media=mv）的签名URL
+
+    静态快照中使用这个固定地址，签名URL过期后重新访问即可获得新的签名
+    """
+    song = get_object_or_404(Song, song_id=song_id, is_active=True)
+    url = song.cover_url if media == 'cover' else song.mv_video_url
+    if not url:
+        raise Http404('文件不存在')
+    return HttpResponseRedirect(url)
+
+
 class SongListView(generics.ListCreateAPIView):
     """歌曲列表API"""
-    queryset = Song.objects.filter(is_active=True)
+    queryset = Song.objects.filter(is_active=True).defer('lyrics_structure')
     serializer_class = SongListWithFileSerializer  # 使用包含 file_url 的列表序列化器
     permission_classes = [permissions.AllowAny]
     
@@ -82,13 +108,8 @@ class SongListView(generics.ListCreateAPIView):
         end = start + limit
         page_queryset = queryset[start:end]
         
-        serializer = self.get_serializer(page_queryset, many=True)
-        songs = serializer.data
-        
-        # 替换所有歌曲的 file_url 为代理URL（和详情页保持一致）
-        for song in songs:
-            if song.get('file_url') and song.get('song_id'):
-                song['file_url'] = f'/api/songs/{song["song_id"]}/stream/'
+        # 使用快速序列化器（输出与 SongListWithFileSerializer 一致，file_url 直接为代理URL）
+        songs = SongListFastSerializer(context={'request': request}).serialize(page_queryset)
         
         return Response({
             'success': True,
@@ -112,16 +133,23 @@ class SongDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.AllowAny]
     lookup_field = 'song_id'
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # 读取时按 ?fields= 只查询需要的列（如不请求歌词则不读取lyrics大字段）
+        if self.request.method == 'GET':
+            queryset = SongSerializer.sparse_queryset(queryset, self.request)
+        return queryset
+    
     def retrieve(self, request, *args, **kwargs):
         """获取详情"""
         instance = self.get_object()
         serializer = self.get_serializer(instance)
         
-        # 获取评论数量
-        comments_count = Comment.objects.filter(song=instance, is_active=True).count()
-        
         data = serializer.data
-        data['comments_count'] = comments_count
+        
+        # 获取评论数量
+        if is_field_requested(request, 'comments_count'):
+            data['comments_count'] = Comment.objects.filter(song=instance, is_active=True).count()
         
         # 替换file_url为代理URL
         if data.get('file_url'):
@@ -134,6 +162,107 @@ class SongDetailView(generics.RetrieveUpdateDestroyAPIView):
         })
 
 
+def _parse_song_ids(value, max_ids):
+    """
+    解析逗号分隔的歌曲ID（去重并保持顺序）
+
+    Raises:
+        ValueError: ID格式错误
+        OverflowError: ID数量超过max_ids（按原始数量判断，超长参数不做解析）
+    """
+    parts = [part for part in (value or '').split(',', max_ids) if part.strip()]
+    if len(parts) > max_ids:
+        raise OverflowError(max_ids)
+    return list(dict.fromkeys(int(part) for part in parts))
+
+
+def _fetch_file_sizes(songs):
+    """并发查询音频文件大小（每个文件一次OSS HEAD请求）"""
+    songs = [song for song in songs if song.audio_file and song.audio_file.name]
+    if not songs:
+        return {}
+
+    def head(song):
+        try:
+            return song.song_id, song.audio_file.size
+        except Exception as e:
+            logger.warning(f'获取文件大小失败: {song.audio_file.name}, 错误: {str(e)}')
+            return song.song_id, None
+
+    workers = max(1, min(settings.SONG_BATCH_HEAD_WORKERS, len(songs)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(executor.map(head, songs))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def song_batch(request):
+    """
+    批量获取歌曲详情（播放队列、播放历史等）
+    
+    GET /api/songs/batch/?ids=1,2,3
+    - 一次查询加载所有歌曲，评论数量一次聚合查询
+    - 按请求的ID顺序返回，不存在或已下架的ID在 missing_ids 中返回
+    - 支持 ?fields=/?exclude= 稀疏字段
+    """
+    max_ids = settings.SONG_BATCH_MAX_IDS
+    try:
+        song_ids = _parse_song_ids(request.query_params.get('ids'), max_ids)
+    except OverflowError:
+        return Response({
+            'success': False,
+            'message': f'一次最多查询{max_ids}首歌曲'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'ids参数格式错误，应为逗号分隔的歌曲ID'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not song_ids:
+        return Response({
+            'success': False,
+            'message': '请提供ids参数'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    queryset = Song.objects.filter(is_active=True, song_id__in=song_ids)
+    queryset = SongSerializer.sparse_queryset(queryset, request)
+    songs_by_id = {song.song_id: song for song in queryset}
+    songs = [songs_by_id[song_id] for song_id in song_ids if song_id in songs_by_id]
+    missing_ids = [song_id for song_id in song_ids if song_id not in songs_by_id]
+    
+    # file_url直接生成代理URL（与详情接口最终返回的一致），不生成签名URL
+    context = {'request': request, 'proxy_file_url': True}
+    if is_field_requested(request, 'file_size'):
+        context['file_sizes'] = _fetch_file_sizes(songs)
+    
+    data = SongSerializer(songs, many=True, context=context).data
+    
+    comments_counts = None
+    if is_field_requested(request, 'comments_count'):
+        comments_counts = dict(
+            Comment.objects.filter(song_id__in=songs_by_id.keys(), is_active=True)
+            .order_by()
+            .values('song_id')
+            .annotate(count=models.Count('comment_id'))
+            .values_list('song_id', 'count')
+        )
+    
+    for song, item in zip(songs, data):
+        song_id = song.song_id
+        if comments_counts is not None:
+            item['comments_count'] = comments_counts.get(song_id, 0)
+    
+    return Response({
+        'success': True,
+        'message': '获取成功',
+        'data': {
+            'songs': data,
+            'missing_ids': missing_ids
+        }
+    })
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def play_song(request, song_id):
@@ -148,8 +148,16 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # orjson渲染JSON；客户端可通过 Accept: application/msgpack 获取MessagePack响应
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'utils.renderers.ORJSONRenderer',
+        'utils.renderers.MessagePackRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'utils.parsers.ORJSONParser',
+        'utils.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
 }
 
@@ -180,6 +188,8 @@ REDIS_HOST = config('REDIS_HOST')
 REDIS_PORT = config('REDIS_PORT', cast=int)
 REDIS_PASSWORD = config('REDIS_PASSWORD')
 REDIS_DB = config('REDIS_DB', cast=int)
+# 应用层Redis操作（缓存、锁等）的超时时间（秒）
+REDIS_SOCKET_TIMEOUT = config('REDIS_SOCKET_TIMEOUT', default=2, cast=float)
 
 # Celery配置
 CELERY_BROKER_URL = f'redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
@@ -189,6 +199,61 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Celery队列划分（见 utils/task_queues.py）：ai_reply / text / image / video，
+# 以及批量任务的 text_bulk / image_bulk / video_bulk
+# AIGC生成任务按任务类型投递（apps.aigc.tasks.enqueue_generation），其余任务按下面的路由
+CELERY_TASK_DEFAULT_QUEUE = 'text'
+CELERY_TASK_ROUTES = {
+    'apps.comments.tasks.generate_ai_reply': {'queue': 'ai_reply'},
+    'apps.comments.tasks.generate_ai_reply_batch': {'queue': 'ai_reply'},
+    'apps.aigc.tasks.poll_video_generation': {'queue': 'video'},
+    'apps.aigc.tasks.publish_song_snapshots': {'queue': 'text'},
+    'apps.aigc.tasks.submit_batch_job': {'queue': 'text'},
+    'apps.aigc.tasks.poll_batch_job': {'queue': 'text'},
+    'apps.aigc.tasks.refresh_dirty_comment_summaries': {'queue': 'text'},
+    'apps.aigc.tasks.dispatch_campaign': {'queue': 'text'},
+}
+# 任务执行完成后再确认，worker异常退出时任务重新投递（任务均按检查点/幂等处理）
+CELERY_TASK_ACKS_LATE = config('CELERY_TASK_ACKS_LATE', default=True, cast=bool)
+CELERY_TASK_REJECT_ON_WORKER_LOST = CELERY_TASK_ACKS_LATE
+# 消息优先级（Redis中0最高、9最低）：交互任务0，批量任务9（进入 <队列>_bulk），未指定的任务为普通优先级
+CELERY_TASK_DEFAULT_PRIORITY = 5
+# 默认预取数量（各队列worker启动时通过 --prefetch-multiplier 覆盖）
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    # 未确认任务的重新投递时间（秒），需大于最长的任务执行时间和countdown
+    'visibility_timeout': config('CELERY_VISIBILITY_TIMEOUT', default=3600, cast=int),
+    # 每个优先级一个Redis列表，worker按优先级从高到低取消息（跨所监听的全部队列）
+    'priority_steps': list(range(10)),
+    # 按 -Q 中的顺序取队列（主队列在前），而不是在主队列和批量队列之间轮询
+    'queue_order_strategy': 'priority',
+}
+# 各队列任务的（软超时, 硬超时）（秒）
+TASK_QUEUE_TIME_LIMITS = {
+    'ai_reply': (
+        config('CELERY_AI_REPLY_SOFT_TIME_LIMIT', default=30, cast=int),
+        config('CELERY_AI_REPLY_TIME_LIMIT', default=60, cast=int),
+    ),
+    'text': (
+        config('CELERY_TEXT_SOFT_TIME_LIMIT', default=120, cast=int),
+        config('CELERY_TEXT_TIME_LIMIT', default=180, cast=int),
+    ),
+    'image': (
+        config('CELERY_IMAGE_SOFT_TIME_LIMIT', default=300, cast=int),
+        config('CELERY_IMAGE_TIME_LIMIT', default=360, cast=int),
+    ),
+    'video': (
+        config('CELERY_VIDEO_SOFT_TIME_LIMIT', default=600, cast=int),
+        config('CELERY_VIDEO_TIME_LIMIT', default=660, cast=int),
+    ),
+}
+# 按路由固定队列的任务使用所在队列的超时
+CELERY_TASK_ANNOTATIONS = {
+    name: {'soft_time_limit': TASK_QUEUE_TIME_LIMITS[route['queue']][0],
+           'time_limit': TASK_QUEUE_TIME_LIMITS[route['queue']][1]}
+    for name, route in CELERY_TASK_ROUTES.items()
+}
+
 # 阿里云OSS配置
 OSS_ACCESS_KEY_ID = config('OSS_ACCESS_KEY_ID')
 OSS_ACCESS_KEY_SECRET = config('OSS_ACCESS_KEY_SECRET')
@@ -203,3 +268,161 @@ ALIBABA_WANXIANG_MODEL_IMAGE = config('ALIBABA_WANXIANG_MODEL_IMAGE')
 ALIBABA_WANXIANG_MODEL_TEXT = config('ALIBABA_WANXIANG_MODEL_TEXT')
 ALIBABA_WANXIANG_MODEL_VIDEO = config('ALIBABA_WANXIANG_MODEL_VIDEO')
 
+
+# AIGC产物转存配置（从生成结果URL下载并写入OSS）
+# 并发下载/上传图片的线程数
+AIGC_IMAGE_FETCH_WORKERS = config('AIGC_IMAGE_FETCH_WORKERS', default=4, cast=int)
+# 流式传输的分块大小（字节）
+AIGC_TRANSFER_CHUNK_SIZE = config('AIGC_TRANSFER_CHUNK_SIZE', default=256 * 1024, cast=int)
+# 分片上传的分片大小（字节），不超过一个分片的文件直接上传
+AIGC_TRANSFER_PART_SIZE = config('AIGC_TRANSFER_PART_SIZE', default=8 * 1024 * 1024, cast=int)
+# 单个产物的大小上限（字节）
+AIGC_TRANSFER_MAX_SIZE = config('AIGC_TRANSFER_MAX_SIZE', default=500 * 1024 * 1024, cast=int)
+AIGC_TRANSFER_IMAGE_MAX_SIZE = config('AIGC_TRANSFER_IMAGE_MAX_SIZE', default=20 * 1024 * 1024, cast=int)
+
+# 生成结果缓存配置（相同模型+提示词+参数复用已生成的图片/文字）
+AIGC_GENERATION_CACHE_ENABLED = config('AIGC_GENERATION_CACHE_ENABLED', default=True, cast=bool)
+AIGC_GENERATION_CACHE_TTL = config('AIGC_GENERATION_CACHE_TTL', default=7 * 86400, cast=int)
+# 最多缓存条目数，超过时淘汰最早写入的条目
+AIGC_GENERATION_CACHE_MAX_ENTRIES = config('AIGC_GENERATION_CACHE_MAX_ENTRIES', default=5000, cast=int)
+
+# 相同任务合并配置（同一歌曲、任务类型、参数的任务同时只执行一个）
+AIGC_SINGLE_FLIGHT_ENABLED = config('AIGC_SINGLE_FLIGHT_ENABLED', default=True, cast=bool)
+# 合并键有效期（秒），应大于任务最长执行时间（含视频轮询）
+AIGC_SINGLE_FLIGHT_TTL = config('AIGC_SINGLE_FLIGHT_TTL', default=3600, cast=int)
+# 视频任务等待合并的配图任务时，重新检查的间隔（秒）
+AIGC_SINGLE_FLIGHT_WAIT = config('AIGC_SINGLE_FLIGHT_WAIT', default=15, cast=int)
+
+# @AI回复流式输出（SSE）
+AI_REPLY_STREAMING_ENABLED = config('AI_REPLY_STREAMING_ENABLED', default=True, cast=bool)
+# 回复流缓冲区保留时间（秒）
+AI_REPLY_STREAM_TTL = config('AI_REPLY_STREAM_TTL', default=300, cast=int)
+# SSE连接最长保持时间（秒）和心跳间隔（秒）
+AI_REPLY_STREAM_TIMEOUT = config('AI_REPLY_STREAM_TIMEOUT', default=120, cast=int)
+AI_REPLY_STREAM_HEARTBEAT = config('AI_REPLY_STREAM_HEARTBEAT', default=15, cast=int)
+
+# @AI问题答案缓存（按歌曲，SimHash相似问题复用回答）
+AI_ANSWER_CACHE_ENABLED = config('AI_ANSWER_CACHE_ENABLED', default=True, cast=bool)
+AI_ANSWER_CACHE_TTL = config('AI_ANSWER_CACHE_TTL', default=7 * 86400, cast=int)
+# 视为同一问题的最大汉明距离（64位指纹）
+AI_ANSWER_CACHE_MAX_DISTANCE = config('AI_ANSWER_CACHE_MAX_DISTANCE', default=3, cast=int)
+# 每首歌最多缓存的问题数
+AI_ANSWER_CACHE_MAX_ENTRIES = config('AI_ANSWER_CACHE_MAX_ENTRIES', default=200, cast=int)
+
+# @AI回复微批处理（按歌曲聚合窗口内的问题，一次模型调用回答多个问题）
+AI_REPLY_BATCH_ENABLED = config('AI_REPLY_BATCH_ENABLED', default=True, cast=bool)
+# 聚合窗口（毫秒）
+AI_REPLY_BATCH_WINDOW_MS = config('AI_REPLY_BATCH_WINDOW_MS', default=300, cast=int)
+# 每批最多问题数
+AI_REPLY_BATCH_MAX_SIZE = config('AI_REPLY_BATCH_MAX_SIZE', default=8, cast=int)
+# 批量调用的最大token数
+AI_REPLY_BATCH_MAX_TOKENS = config('AI_REPLY_BATCH_MAX_TOKENS', default=1500, cast=int)
+# 调度标记过期时间（秒），批处理任务丢失时的兜底
+AI_REPLY_BATCH_SCHEDULE_TTL = config('AI_REPLY_BATCH_SCHEDULE_TTL', default=30, cast=int)
+
+# 上游熔断器（OSS、DashScope）：窗口期内失败达到阈值后打开，恢复时间后放行一个探测请求
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = config('CIRCUIT_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+CIRCUIT_BREAKER_WINDOW = config('CIRCUIT_BREAKER_WINDOW', default=60, cast=int)
+CIRCUIT_BREAKER_RECOVERY_TIMEOUT = config('CIRCUIT_BREAKER_RECOVERY_TIMEOUT', default=30, cast=int)
+# 进程内缓存熔断器状态的时间（秒）
+CIRCUIT_BREAKER_STATE_CACHE = config('CIRCUIT_BREAKER_STATE_CACHE', default=1, cast=float)
+# OSS连接超时（秒）
+OSS_CONNECT_TIMEOUT = config('OSS_CONNECT_TIMEOUT', default=5, cast=int)
+
+# Celery任务重试退避（秒）：第n次重试等待 [上限/2, 上限]，上限 = min(MAX, BASE * 2^n)
+TASK_RETRY_BACKOFF_BASE = config('TASK_RETRY_BACKOFF_BASE', default=15, cast=int)
+TASK_RETRY_BACKOFF_MAX = config('TASK_RETRY_BACKOFF_MAX', default=600, cast=int)
+
+# DashScope调用限流（Redis令牌桶，所有worker共享，每个接口类型+模型一个桶）
+AIGC_RATE_LIMIT_ENABLED = config('AIGC_RATE_LIMIT_ENABLED', default=True, cast=bool)
+# 接口类型 -> (每秒令牌数, 桶容量)
+AIGC_RATE_LIMITS = {
+    'image': (
+        config('AIGC_RATE_LIMIT_IMAGE_QPS', default=1, cast=float),
+        config('AIGC_RATE_LIMIT_IMAGE_BURST', default=2, cast=int),
+    ),
+    'text': (
+        config('AIGC_RATE_LIMIT_TEXT_QPS', default=5, cast=float),
+        config('AIGC_RATE_LIMIT_TEXT_BURST', default=10, cast=int),
+    ),
+    'video': (
+        config('AIGC_RATE_LIMIT_VIDEO_QPS', default=0.5, cast=float),
+        config('AIGC_RATE_LIMIT_VIDEO_BURST', default=2, cast=int),
+    ),
+    'video_query': (
+        config('AIGC_RATE_LIMIT_VIDEO_QUERY_QPS', default=10, cast=float),
+        config('AIGC_RATE_LIMIT_VIDEO_QUERY_BURST', default=20, cast=int),
+    ),
+}
+# 令牌不足时的最长等待时间（秒），超过后任务稍后重新投递
+AIGC_RATE_LIMIT_MAX_WAIT = config('AIGC_RATE_LIMIT_MAX_WAIT', default=5, cast=float)
+
+# DashScope Files上传缓存（同一图片在有效期内复用file_id）
+AIGC_DASHSCOPE_FILE_TTL = config('AIGC_DASHSCOPE_FILE_TTL', default=2 * 86400, cast=int)
+# 上传前将视频首帧图片缩小到的最大边长（像素），0表示不缩小
+AIGC_VIDEO_FRAME_MAX_SIDE = config('AIGC_VIDEO_FRAME_MAX_SIDE', default=1280, cast=int)
+
+# 视频生成轮询配置（提交后由轮询任务重新入队查询，不占用worker等待）
+AIGC_VIDEO_POLL_INTERVAL = config('AIGC_VIDEO_POLL_INTERVAL', default=5, cast=int)
+AIGC_VIDEO_POLL_BACKOFF = config('AIGC_VIDEO_POLL_BACKOFF', default=1.5, cast=float)
+AIGC_VIDEO_POLL_MAX_INTERVAL = config('AIGC_VIDEO_POLL_MAX_INTERVAL', default=30, cast=int)
+# 从提交开始计算的最长等待时间（秒）
+AIGC_VIDEO_POLL_TIMEOUT = config('AIGC_VIDEO_POLL_TIMEOUT', default=1800, cast=int)
+
+# 批量推理配置（评论摘要等大批量回填走DashScope Batch接口，不占用实时接口配额）
+# 接口地址（OpenAI兼容模式），测试时可以指向本地的兼容服务
+AIGC_BATCH_API_BASE = config(
+    'AIGC_BATCH_API_BASE', default=f'https://{ALIBABA_WANXIANG_ENDPOINT}/compatible-mode/v1'
+)
+AIGC_BATCH_COMPLETION_WINDOW = config('AIGC_BATCH_COMPLETION_WINDOW', default='24h')
+# 每个作业的最大请求数（超过时拆分为多个作业）
+AIGC_BATCH_MAX_REQUESTS = config('AIGC_BATCH_MAX_REQUESTS', default=10000, cast=int)
+AIGC_BATCH_POLL_INTERVAL = config('AIGC_BATCH_POLL_INTERVAL', default=60, cast=int)
+# 从提交开始计算的最长等待时间（秒），需大于完成窗口
+AIGC_BATCH_POLL_TIMEOUT = config('AIGC_BATCH_POLL_TIMEOUT', default=26 * 3600, cast=int)
+AIGC_BATCH_HTTP_TIMEOUT = config('AIGC_BATCH_HTTP_TIMEOUT', default=120, cast=int)
+
+# 评论摘要增量刷新配置（评论有变化的歌曲由定时任务检查，选中评论变化时才重新生成）
+AIGC_SUMMARY_REFRESH_ENABLED = config('AIGC_SUMMARY_REFRESH_ENABLED', default=True, cast=bool)
+# 检查间隔（秒）和每次最多检查的歌曲数
+AIGC_SUMMARY_REFRESH_INTERVAL = config('AIGC_SUMMARY_REFRESH_INTERVAL', default=600, cast=int)
+AIGC_SUMMARY_REFRESH_BATCH = config('AIGC_SUMMARY_REFRESH_BATCH', default=200, cast=int)
+# 同一首歌两次自动生成的最短间隔（秒）
+AIGC_SUMMARY_MIN_INTERVAL = config('AIGC_SUMMARY_MIN_INTERVAL', default=6 * 3600, cast=int)
+AIGC_SUMMARY_COMMENT_RANGE = config('AIGC_SUMMARY_COMMENT_RANGE', default='hot')
+
+# 批量生成活动配置（按筛选条件为多首歌曲创建任务，限速投递）
+# 默认每分钟投递任务数（创建活动时可单独指定）
+AIGC_CAMPAIGN_RATE_PER_MINUTE = config('AIGC_CAMPAIGN_RATE_PER_MINUTE', default=10, cast=int)
+# 投递间隔（秒）
+AIGC_CAMPAIGN_TICK = config('AIGC_CAMPAIGN_TICK', default=60, cast=int)
+# 每个活动已投递但未结束的任务上限（达到时暂停投递，等待worker消化）
+AIGC_CAMPAIGN_MAX_IN_FLIGHT = config('AIGC_CAMPAIGN_MAX_IN_FLIGHT', default=50, cast=int)
+# 每个活动的最大歌曲数
+AIGC_CAMPAIGN_MAX_SONGS = config('AIGC_CAMPAIGN_MAX_SONGS', default=10000, cast=int)
+
+# Celery Beat定时任务
+CELERY_BEAT_SCHEDULE = {
+    'refresh-dirty-comment-summaries': {
+        'task': 'apps.aigc.tasks.refresh_dirty_comment_summaries',
+        'schedule': AIGC_SUMMARY_REFRESH_INTERVAL,
+    },
+}
+
+# 静态JSON快照配置（发布AIGC内容/保存歌曲时写入OSS，客户端可直接读取）
+SNAPSHOT_ENABLED = config('SNAPSHOT_ENABLED', default=True, cast=bool)
+SNAPSHOT_GZIP = config('SNAPSHOT_GZIP', default=True, cast=bool)
+# 版本化快照对象的缓存时长（秒）
+SNAPSHOT_MAX_AGE = config('SNAPSHOT_MAX_AGE', default=86400, cast=int)
+# manifest（指向最新版本）的缓存时长（秒）
+SNAPSHOT_MANIFEST_MAX_AGE = config('SNAPSHOT_MANIFEST_MAX_AGE', default=60, cast=int)
+# 快照访问域名（如CDN域名），为空时使用OSS bucket默认域名
+SNAPSHOT_BASE_URL = config('SNAPSHOT_BASE_URL', default='')
+# 评论变化后精彩评论快照的防抖时间（秒），期间的多次评论/点赞合并为一次发布
+SNAPSHOT_COMMENT_DEBOUNCE = config('SNAPSHOT_COMMENT_DEBOUNCE', default=30, cast=int)
+
+
+# 歌曲批量查询配置（/api/songs/batch/）
+SONG_BATCH_MAX_IDS = config('SONG_BATCH_MAX_IDS', default=100, cast=int)
+# 并发查询OSS文件大小的线程数
+SONG_BATCH_HEAD_WORKERS = config('SONG_BATCH_HEAD_WORKERS', default=8, cast=int)
@@ -11,8 +11,17 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
 def health_check(request):
-    """健康检查端点"""
-    return JsonResponse({"status": "healthy", "timestamp": "2025-12-28"})
+    """健康检查端点（附带DashScope调用限流的令牌桶饱和度、上游熔断器状态）"""
+    from apps.aigc.services.rate_limiter import rate_limiter
+    from utils.circuit_breaker import breaker_states
+    breakers = breaker_states()
+    return JsonResponse({
+        # 上游熔断时服务降级运行，但进程本身健康（不影响容器健康检查）
+        "status": "degraded" if any(b["state"] != "closed" for b in breakers.values()) else "healthy",
+        "timestamp": "2025-12-28",
+        "rate_limits": rate_limiter.stats(),
+        "circuit_breakers": breakers,
+    })
 from apps.songs.urls import api_urlpatterns
 from apps.users.urls import api_urlpatterns as users_api_urlpatterns
 from apps.comments.urls import urlpatterns as comments_urlpatterns
@@ -0,0 +1,193 @@
+"""
+熔断器
+每个上游服务（OSS、DashScope等）一个熔断器，状态保存在Redis中，所有进程共享：
+- closed：正常调用，固定窗口内（从第一次失败开始计时）失败次数达到阈值时打开，
+  窗口结束后计数自动过期（成功调用不写Redis，交替失败的上游也会在窗口内累计到阈值）
+- open：直接拒绝调用（抛出CircuitOpenError），不再等待上游超时
+- half_open：打开超过恢复时间后，只放行一个探测请求，成功则关闭，失败则重新打开
+Redis不可用时按closed处理（不熔断）。
+"""
+import importlib
+import logging
+import threading
+import time
+from django.conf import settings
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+# 所有熔断器（用于健康检查）
+_breakers = {}
+
+# 定义熔断器的模块（熔断器在模块导入时注册，查询状态前先导入）
+BREAKER_MODULES = (
+    'utils.storage.oss_storage',
+    'apps.aigc.services.wanxiang_service',
+)
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，拒绝调用（上游恢复后可以重试）"""
+    retryable = True
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f'{name} 熔断中，{retry_after:.0f}秒后重试')
+
+
+class CircuitBreaker:
+    """
+    基于Redis的熔断器
+
+    Args:
+        name: 上游名称（oss/dashscope等）
+        is_failure: 判断异常是否计为上游故障的函数，默认所有异常都计入
+    """
+
+    KEY_PREFIX = 'breaker:'
+
+    def __init__(self, name: str, is_failure=None):
+        self.name = name
+        self.is_failure = is_failure or (lambda exc: True)
+        self._cached = None  # (过期时间, 状态)
+        self._lock = threading.Lock()
+        _breakers[name] = self
+
+    @property
+    def _state_key(self):
+        return f'{self.KEY_PREFIX}{self.name}'
+
+    @property
+    def _failures_key(self):
+        return f'{self.KEY_PREFIX}{self.name}:failures'
+
+    @property
+    def _probe_key(self):
+        return f'{self.KEY_PREFIX}{self.name}:probe'
+
+    def _read_state(self) -> dict:
+        """读取状态（进程内缓存 CIRCUIT_BREAKER_STATE_CACHE 秒，减少Redis访问）"""
+        now = time.monotonic()
+        cached = self._cached
+        if cached and cached[0] > now:
+            return cached[1]
+        try:
+            state = get_redis().hgetall(self._state_key) or {}
+        except Exception as e:
+            logger.warning(f'读取熔断器 {self.name} 状态失败，按关闭处理: {str(e)}')
+            state = {}
+        with self._lock:
+            self._cached = (now + settings.CIRCUIT_BREAKER_STATE_CACHE, state)
+        return state
+
+    def _invalidate(self):
+        with self._lock:
+            self._cached = None
+
+    def state(self) -> str:
+        """当前状态（closed/open/half_open）"""
+        state = self._read_state()
+        if state.get('state') != STATE_OPEN:
+            return STATE_CLOSED
+        opened_at = float(state.get('opened_at', 0))
+        if time.time() - opened_at >= settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT:
+            return STATE_HALF_OPEN
+        return STATE_OPEN
+
+    def is_open(self) -> bool:
+        """是否拒绝调用（half_open时只有探测请求可以通过，这里视为未打开）"""
+        return self.state() == STATE_OPEN
+
+    def before_call(self):
+        """
+        调用上游前检查
+
+        Raises:
+            CircuitOpenError: 熔断中，或半开状态下已有其他探测请求
+        """
+        state = self.state()
+        if state == STATE_CLOSED:
+            return
+        recovery = settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT
+        if state == STATE_HALF_OPEN:
+            try:
+                if get_redis().set(self._probe_key, '1', nx=True, ex=recovery):
+                    logger.info(f'熔断器 {self.name} 半开，放行探测请求')
+                    return
+            except Exception as e:
+                logger.warning(f'熔断器 {self.name} 探测失败，放行请求: {str(e)}')
+                return
+        opened_at = float(self._read_state().get('opened_at', 0))
+        raise CircuitOpenError(self.name, max(1.0, opened_at + recovery - time.time()))
+
+    def record_success(self):
+        """调用成功：非关闭状态时关闭熔断器（关闭状态下只读进程内缓存的状态，不访问Redis）"""
+        if self._read_state().get('state') != STATE_OPEN:
+            return
+        try:
+            client = get_redis()
+            pipe = client.pipeline()
+            pipe.delete(self._state_key, self._failures_key, self._probe_key)
+            pipe.execute()
+            logger.info(f'熔断器 {self.name} 已关闭（上游恢复）')
+        except Exception as e:
+            logger.warning(f'更新熔断器 {self.name} 状态失败: {str(e)}')
+        self._invalidate()
+
+    def record_failure(self):
+        """调用失败：窗口期内失败次数达到阈值（或探测请求失败）时打开熔断器"""
+        try:
+            client = get_redis()
+            was_open = client.hget(self._state_key, 'state') == STATE_OPEN
+            # 只在计数器创建时设置过期时间（固定窗口），之后的失败不延长窗口
+            pipe = client.pipeline()
+            pipe.set(self._failures_key, 0, nx=True, ex=settings.CIRCUIT_BREAKER_WINDOW)
+            pipe.incr(self._failures_key)
+            _, failures = pipe.execute()
+            if was_open or failures >= settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD:
+                client.hset(self._state_key, mapping={'state': STATE_OPEN, 'opened_at': time.time()})
+                client.delete(self._probe_key)
+                if not was_open:
+                    logger.error(f'熔断器 {self.name} 已打开：{settings.CIRCUIT_BREAKER_WINDOW}秒内失败 {failures} 次')
+        except Exception as e:
+            logger.warning(f'更新熔断器 {self.name} 状态失败: {str(e)}')
+        self._invalidate()
+
+    def call(self, func, *args, **kwargs):
+        """经过熔断器调用函数（is_failure判定的异常计为失败）"""
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        """状态信息（健康检查用）"""
+        state = self._read_state()
+        try:
+            failures = int(get_redis().get(self._failures_key) or 0)
+        except Exception:
+            failures = None
+        return {
+            'state': self.state(),
+            'failures': failures,
+            'opened_at': float(state['opened_at']) if state.get('opened_at') else None,
+        }
+
+
+def breaker_states() -> dict:
+    """所有熔断器的状态"""
+    for module in BREAKER_MODULES:
+        importlib.import_module(module)
+    return {name: breaker.stats() for name, breaker in sorted(_breakers.items())}
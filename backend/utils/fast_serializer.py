@@ -0,0 +1,99 @@
+"""
+快速序列化器
+绕过DRF ModelSerializer的逐字段分发，直接从 .values() 行生成字典，
+用于热点列表接口。输出格式需与对应的DRF序列化器保持一致。
+"""
+from django.utils import timezone
+from .sparse_fields import select_fields
+
+
+def format_datetime(value):
+    """按DRF DateTimeField的默认规则格式化时间（转换到当前时区，ISO 8601，UTC以Z结尾）"""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class FastField:
+    """
+    快速序列化字段
+
+    Args:
+        column: 直接读取的列名（.values()中的键）
+        method: 序列化器上的取值方法名，以整行为参数
+        columns: 取值所依赖的列（method字段必须声明）
+    """
+    __slots__ = ('column', 'method', 'columns')
+
+    def __init__(self, column=None, method=None, columns=None):
+        self.column = column
+        self.method = method
+        if columns is not None:
+            self.columns = tuple(columns)
+        else:
+            self.columns = (column,) if column else ()
+
+
+class FastSerializer:
+    """
+    快速序列化器基类
+
+    子类通过 fields 声明输出字段（有序字典：输出键 -> FastField），
+    实例化时将字段编译为一个直接构造字典的函数，序列化时每行只调用一次。
+    context中带有request时按 ?fields=/?exclude= 裁剪字段，只查询所需的列。
+    需要批量查询关联数据的子类可重写 prepare(rows)，
+    prepare中用到的列声明在 required_columns 中（字段被裁剪时也会查询，但不输出）。
+    """
+    fields = {}
+    required_columns = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.field_names = select_fields(tuple(self.fields), self.context.get('request'))
+        self.columns = self._collect_columns(self.field_names)
+        self._serialize_row = self._compile(self.field_names)
+
+    def _collect_columns(self, field_names):
+        """收集字段依赖的列（去重并保持顺序）"""
+        columns = list(self.required_columns)
+        for name in field_names:
+            for column in self.fields[name].columns:
+                if column not in columns:
+                    columns.append(column)
+        return tuple(columns)
+
+    def _compile(self, field_names):
+        """生成 serialize_row(row) 函数"""
+        namespace = {}
+        parts = []
+        for idx, name in enumerate(field_names):
+            field = self.fields[name]
+            if field.method:
+                namespace[f'_m{idx}'] = getattr(self, field.method)
+                parts.append(f'{name!r}: _m{idx}(row)')
+            else:
+                parts.append(f'{name!r}: row[{field.column!r}]')
+
+        source = 'def serialize_row(row):\n    return {' + ', '.join(parts) + '}\n'
+        exec(compile(source, f'<{type(self).__name__}>', 'exec'), namespace)
+        return namespace['serialize_row']
+
+    def prepare(self, rows):
+        """序列化前的批量预处理（如批量查询关联数据），默认不处理"""
+        pass
+
+    def serialize_rows(self, rows) -> list:
+        """序列化已查询的行"""
+        rows = list(rows)
+        self.prepare(rows)
+        serialize_row = self._serialize_row
+        return [serialize_row(row) for row in rows]
+
+    def serialize(self, queryset) -> list:
+        """按需查询列并序列化"""
+        return self.serialize_rows(queryset.values(*self.columns))
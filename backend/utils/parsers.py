@@ -0,0 +1,46 @@
+"""
+高性能请求解析器
+- ORJSONParser: 基于orjson的JSON解析（未安装时回退到DRF标准JSONParser）
+- MessagePackParser: Content-Type: application/msgpack
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from .renderers import ORJSON_AVAILABLE, MSGPACK_AVAILABLE
+
+if ORJSON_AVAILABLE:
+    import orjson
+
+if MSGPACK_AVAILABLE:
+    import msgpack
+
+
+class ORJSONParser(JSONParser):
+    """orjson JSON解析器"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not ORJSON_AVAILABLE:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            body = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding).encode('utf-8')
+            return orjson.loads(body)
+        except (ValueError, UnicodeError) as exc:
+            raise ParseError(f'JSON解析失败 - {str(exc)}')
+
+
+class MessagePackParser(BaseParser):
+    """MessagePack解析器"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not MSGPACK_AVAILABLE:
+            raise ParseError('服务器未安装msgpack，无法解析MessagePack请求')
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except Exception as exc:
+            raise ParseError(f'MessagePack解析失败 - {str(exc)}')
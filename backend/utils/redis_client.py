@@ -0,0 +1,37 @@
+"""
+Redis客户端
+应用层直接使用的Redis连接（缓存、锁、限流等），与Celery broker共用配置
+"""
+import logging
+import threading
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    获取共享的Redis客户端（进程内单例，连接池线程安全）
+
+    Returns:
+        redis.Redis: decode_responses=True 的客户端
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis(
+                    host=settings.REDIS_HOST,
+                    port=settings.REDIS_PORT,
+                    password=settings.REDIS_PASSWORD or None,
+                    db=settings.REDIS_DB,
+                    decode_responses=True,
+                    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    health_check_interval=30,
+                )
+    return _client
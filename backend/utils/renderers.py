@@ -0,0 +1,72 @@
+"""
+高性能响应渲染器
+- ORJSONRenderer: 基于orjson的JSON渲染（未安装时回退到DRF标准JSONRenderer）
+- MessagePackRenderer: application/msgpack，客户端通过Accept头选择
+"""
+import logging
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入orjson
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.warning('orjson未安装，JSON渲染回退到标准库，请运行: pip install orjson')
+
+# 尝试导入msgpack
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    logger.warning('msgpack未安装，MessagePack渲染不可用，请运行: pip install msgpack')
+
+# 复用DRF编码器处理datetime/Decimal/UUID/惰性翻译字符串等类型，保证与标准JSONRenderer输出一致
+_drf_encoder = JSONEncoder()
+
+
+def default_encoder(obj):
+    """orjson/msgpack无法原生编码的类型交由DRF编码器处理"""
+    return _drf_encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    orjson JSON渲染器
+
+    datetime交由DRF编码器处理（毫秒精度、UTC以Z结尾），Decimal转为float，
+    与 rest_framework.renderers.JSONRenderer 输出一致
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not ORJSON_AVAILABLE:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=default_encoder, option=option)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack渲染器（Accept: application/msgpack 或 ?format=msgpack）"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not MSGPACK_AVAILABLE:
+            raise RuntimeError('msgpack未安装，无法渲染MessagePack响应')
+        return msgpack.packb(data, default=default_encoder, use_bin_type=True)
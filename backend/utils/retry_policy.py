@@ -0,0 +1,37 @@
+"""
+Celery任务重试策略
+- 只重试可能成功的错误：异常带 retryable 属性时以其为准（如阿里万相异常、转存异常），
+  参数错误（ValueError等）、对象不存在等永久错误直接失败，不占用队列
+- 重试间隔按指数退避，加随机抖动并设上限，避免大量任务同时重试
+"""
+import random
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+
+# 没有 retryable 属性时视为永久错误的异常类型
+PERMANENT_ERRORS = (ValueError, TypeError, KeyError, ObjectDoesNotExist, PermissionDenied)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """判断异常重试后是否可能成功"""
+    retryable = getattr(exc, 'retryable', None)
+    if retryable is not None:
+        return bool(retryable)
+    return not isinstance(exc, PERMANENT_ERRORS)
+
+
+def backoff_countdown(retries: int, base: float = None, cap: float = None) -> int:
+    """
+    第 retries 次重试前的等待时间（秒）
+
+    在 [上限的一半, 上限] 之间随机取值，上限为 min(cap, base * 2 ** retries)
+
+    Args:
+        retries: 已重试次数（self.request.retries）
+        base: 基础间隔，默认 TASK_RETRY_BACKOFF_BASE
+        cap: 最长间隔，默认 TASK_RETRY_BACKOFF_MAX
+    """
+    base = settings.TASK_RETRY_BACKOFF_BASE if base is None else base
+    cap = settings.TASK_RETRY_BACKOFF_MAX if cap is None else cap
+    ceiling = min(cap, base * (2 ** retries))
+    return max(1, int(random.uniform(ceiling / 2, ceiling)))
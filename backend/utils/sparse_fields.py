@@ -0,0 +1,106 @@
+"""
+稀疏字段集（?fields= / ?exclude=）
+客户端按需指定返回字段，序列化器裁剪未请求的字段（同时跳过其背后的OSS调用），
+并将裁剪下推到查询集（.only()），避免读取大字段（如歌词）
+"""
+
+
+def _parse_names(value):
+    """解析逗号分隔的字段名"""
+    if not value:
+        return []
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_field_params(request):
+    """
+    读取请求中的字段参数
+
+    Returns:
+        tuple: (fields列表或None, exclude集合)；未指定fields时为None，表示全部字段
+    """
+    if request is None:
+        return None, set()
+    params = getattr(request, 'query_params', None) or getattr(request, 'GET', {})
+    fields = _parse_names(params.get('fields'))
+    exclude = set(_parse_names(params.get('exclude')))
+    return (fields or None), exclude
+
+
+def select_fields(available, request):
+    """
+    按请求参数筛选字段（保持声明顺序，未知字段名忽略）
+
+    Args:
+        available: 可用字段名（有序）
+        request: 请求对象（可为None）
+
+    Returns:
+        tuple: 选中的字段名
+    """
+    fields, exclude = get_field_params(request)
+    wanted = set(fields) if fields is not None else None
+    return tuple(
+        name for name in available
+        if (wanted is None or name in wanted) and name not in exclude
+    )
+
+
+def is_field_requested(request, name):
+    """判断某个字段（包括视图额外附加的字段）是否被请求"""
+    fields, exclude = get_field_params(request)
+    if name in exclude:
+        return False
+    return fields is None or name in fields
+
+
+def is_sparse_request(request):
+    """请求是否指定了字段裁剪"""
+    fields, exclude = get_field_params(request)
+    return fields is not None or bool(exclude)
+
+
+class SparseFieldsetMixin:
+    """
+    DRF序列化器混入：根据 context['request'] 的 fields/exclude 参数裁剪字段
+
+    只作用于直接传入request上下文的序列化器（嵌套序列化器不受影响）。
+    子类可在 Meta.field_columns 中声明计算字段依赖的模型列，
+    供 sparse_queryset() 生成 .only() 查询。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or not is_sparse_request(request):
+            return
+        selected = set(select_fields(list(self.fields), request))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def required_columns(cls, field_names):
+        """
+        计算输出指定字段所需的模型列
+
+        Meta.field_columns 中声明的字段使用声明的依赖列；
+        其余与模型字段同名的字段依赖自身；无法映射的字段不依赖任何列
+        """
+        model = cls.Meta.model
+        field_columns = getattr(cls.Meta, 'field_columns', {})
+        concrete = {field.name for field in model._meta.concrete_fields}
+        columns = [model._meta.pk.name]
+        for name in field_names:
+            for column in field_columns.get(name, (name,) if name in concrete else ()):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    @classmethod
+    def sparse_queryset(cls, queryset, request):
+        """按请求字段对查询集应用 .only()（未指定字段裁剪时原样返回）"""
+        if not is_sparse_request(request):
+            return queryset
+        declared = list(cls.Meta.fields)
+        return queryset.only(*cls.required_columns(select_fields(declared, request)))
@@ -9,6 +9,38 @@ from django.core.files.base import ContentFile
 from django.utils.deconstruct import deconstructible
 from django.utils import timezone
 from datetime import datetime
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _is_oss_failure(exc):
+    """OSS故障：网络异常、超时、5xx（NoSuchKey等4xx是正常业务结果，不计入）"""
+    if isinstance(exc, oss2.exceptions.OssError):
+        return exc.status < 0 or exc.status >= 500
+    return True
+
+
+# OSS熔断器（所有存储实例共用）
+oss_breaker = CircuitBreaker('oss', is_failure=_is_oss_failure)
+
+
+class _GuardedBucket:
+    """
+    oss2.Bucket代理：访问OSS的方法经过熔断器调用，
+    只在本地计算的方法（签名URL）直接调用，熔断时仍可生成URL
+    """
+    LOCAL_METHODS = ('sign_url',)
+
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def __getattr__(self, name):
+        attr = getattr(self._bucket, name)
+        if name in self.LOCAL_METHODS or not callable(attr):
+            return attr
+
+        def guarded(*args, **kwargs):
+            return oss_breaker.call(attr, *args, **kwargs)
+        return guarded
 
 
 @deconstructible
@@ -26,9 +58,16 @@ class OSSStorage(Storage):
         # 延迟初始化bucket，避免在导入时就需要配置
         self._bucket = None
     
+    def _new_bucket(self, auth, endpoint):
+        """创建经过熔断器的Bucket对象（连接超时较短，OSS故障时快速失败）"""
+        return _GuardedBucket(oss2.Bucket(
+            auth, endpoint, self.bucket_name,
+            connect_timeout=settings.OSS_CONNECT_TIMEOUT
+        ))
+    
     @property
     def bucket(self):
-        """延迟初始化OSS bucket"""
+        """延迟初始化OSS bucket（OSS熔断时抛出CircuitOpenError，不再等待连接超时）"""
         if self._bucket is None:
             import logging
             logger = logging.getLogger(__name__)
@@ -47,10 +86,10 @@ class OSSStorage(Storage):
             logger.info(f'初始化OSS Bucket: bucket={self.bucket_name}, endpoint={endpoint_clean}')
             
             # 创建Bucket对象，明确指定endpoint
-            self._bucket = oss2.Bucket(auth, endpoint_clean, self.bucket_name)
+            self._bucket = self._new_bucket(auth, endpoint_clean)
             self._actual_endpoint = endpoint_clean  # 默认使用配置的endpoint
             
-            # 测试连接并获取bucket信息
+            # 测试连接并获取bucket信息（get_bucket_info只经过一次熔断器检查，半开时由它占用探测名额）
             try:
                 bucket_info = self._bucket.get_bucket_info()
                 logger.info(f'OSS Bucket连接成功: {self.bucket_name}, Location: {bucket_info.location}')
@@ -70,11 +109,15 @@ class OSSStorage(Storage):
                     if endpoint_clean != region_endpoint and 'oss-rg-china-mainland' in endpoint_clean:
                         logger.warning(f'Endpoint不匹配，bucket Location: {bucket_info.location}, 当前endpoint: {endpoint_clean}, 切换到: {region_endpoint}')
                         # 重新创建bucket对象使用正确的endpoint
-                        self._bucket = oss2.Bucket(auth, region_endpoint, self.bucket_name)
+                        self._bucket = self._new_bucket(auth, region_endpoint)
                         self._actual_endpoint = region_endpoint  # 保存实际使用的endpoint
                         logger.info(f'已切换到区域endpoint: {region_endpoint}')
                     else:
                         self._actual_endpoint = endpoint_clean  # 保存实际使用的endpoint
+            except CircuitOpenError:
+                # 初始化过程中熔断器打开，下次访问时重新初始化
+                self._bucket = None
+                raise
             except Exception as e:
                 logger.error(f'OSS Bucket连接失败: {str(e)}')
                 # 如果跨区域endpoint失败，尝试使用区域endpoint
@@ -95,7 +138,7 @@ class OSSStorage(Storage):
                         # 或者根据bucket_name推断（这里简化处理，使用配置的endpoint）
                         region_endpoint = endpoint_clean.replace('oss-rg-china-mainland', 'oss-cn-beijing')
                     logger.info(f'尝试使用区域endpoint: {region_endpoint}')
-                    self._bucket = oss2.Bucket(auth, region_endpoint, self.bucket_name)
+                    self._bucket = self._new_bucket(auth, region_endpoint)
                     try:
                         bucket_info = self._bucket.get_bucket_info()
                         self._actual_endpoint = region_endpoint  # 保存实际使用的endpoint
@@ -107,6 +150,22 @@ class OSSStorage(Storage):
                     raise
         return self._bucket
     
+    def _signing_bucket(self):
+        """
+        用于生成签名URL的Bucket（签名在本地完成）
+        
+        OSS熔断且bucket尚未初始化时，不做连接测试，直接使用配置的endpoint，
+        避免生成URL的Web请求阻塞在OSS连接上
+        """
+        if self._bucket is not None or not oss_breaker.is_open():
+            try:
+                return self.bucket
+            except CircuitOpenError:
+                pass
+        endpoint_clean = self.endpoint.replace('https://', '').replace('http://', '').strip('/')
+        auth = oss2.Auth(self.access_key_id, self.access_key_secret)
+        return oss2.Bucket(auth, endpoint_clean, self.bucket_name)
+    
     def _get_full_path(self, name):
         """获取完整路径"""
         if self.base_path:
@@ -154,6 +213,49 @@ class OSSStorage(Storage):
             logger.error(f'文件上传失败: {full_path}, 错误: {str(e)}')
             raise
     
+    def put_object(self, name, data, headers=None):
+        """
+        直接写入对象（不经过Storage.save的文件名处理，可自定义响应头）
+
+        Args:
+            name: 相对于base_path的对象名
+            data: bytes或文件对象
+            headers: OSS请求头（Content-Type、Cache-Control、Content-Encoding等）
+
+        Returns:
+            str: 对象ETag
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+
+        full_path = self._get_full_path(name)
+        try:
+            result = self.bucket.put_object(full_path, data, headers=headers or {})
+            logger.info(f'对象写入成功: {full_path}, ETag: {result.etag}')
+            return result.etag
+        except Exception as e:
+            logger.error(f'对象写入失败: {full_path}, 错误: {str(e)}')
+            raise
+
+    def public_url(self, name, base_url=''):
+        """
+        获取对象的公共访问URL（不签名，适用于public-read对象或CDN回源）
+
+        Args:
+            name: 相对于base_path的对象名
+            base_url: 自定义域名（如CDN域名），为空时使用bucket默认域名
+        """
+        from urllib.parse import quote
+
+        full_path = self._get_full_path(name)
+        encoded_path = '/'.join(quote(part, safe='') for part in full_path.split('/'))
+        if base_url:
+            return f"{base_url.rstrip('/')}/{encoded_path}"
+
+        endpoint_clean = getattr(self, '_actual_endpoint', None) or \
+            self.endpoint.replace('https://', '').replace('http://', '').strip('/')
+        return f"https://{self.bucket_name}.{endpoint_clean}/{encoded_path}"
+
     def exists(self, name):
         """检查文件是否存在"""
         full_path = self._get_full_path(name)
@@ -173,9 +275,10 @@ class OSSStorage(Storage):
         # 优先使用实际连接时确定的endpoint，确保URL使用正确的区域endpoint
         if hasattr(self, '_actual_endpoint') and self._actual_endpoint:
             endpoint_clean = self._actual_endpoint
+            signing_bucket = self._bucket or self._signing_bucket()
         else:
-            # 如果还未初始化bucket，先初始化以获取正确的endpoint
-            _ = self.bucket  # 触发初始化
+            # 如果还未初始化bucket，先初始化以获取正确的endpoint（OSS熔断时跳过连接测试）
+            signing_bucket = self._signing_bucket()
             if hasattr(self, '_actual_endpoint') and self._actual_endpoint:
                 endpoint_clean = self._actual_endpoint
             else:
@@ -192,7 +295,7 @@ class OSSStorage(Storage):
                     'response-content-disposition': 'inline'
                 }
                 # 使用原始路径，让sign_url自己处理编码
-                url = self.bucket.sign_url('GET', full_path, 24 * 3600, params=params)
+                url = signing_bucket.sign_url('GET', full_path, 24 * 3600, params=params)
                 # 确保URL使用HTTPS协议
                 if url.startswith('http://'):
                     url = url.replace('http://', 'https://', 1)
@@ -210,7 +313,7 @@ class OSSStorage(Storage):
             # 图片文件也使用签名URL（因为OSS bucket是私有的）
             # 签名URL有效期7天，减少签名生成频率
             try:
-                url = self.bucket.sign_url('GET', full_path, 7 * 24 * 3600)
+                url = signing_bucket.sign_url('GET', full_path, 7 * 24 * 3600)
                 # 确保URL使用HTTPS协议
                 if url.startswith('http://'):
                     url = url.replace('http://', 'https://', 1)
@@ -227,7 +330,7 @@ class OSSStorage(Storage):
             # 其他文件类型（如视频）也使用签名URL
             # 签名URL有效期7天
             try:
-                url = self.bucket.sign_url('GET', full_path, 7 * 24 * 3600)
+                url = signing_bucket.sign_url('GET', full_path, 7 * 24 * 3600)
                 # 确保URL使用HTTPS协议
                 if url.startswith('http://'):
                     url = url.replace('http://', 'https://', 1)
@@ -274,3 +377,6 @@ video_storage = OSSStorage(base_path='videos')
 # 文件存储（用于歌词文件等）
 file_storage = OSSStorage(base_path='files')
 
+# 静态快照存储（发布后的歌曲/AIGC JSON快照，客户端直接从OSS读取）
+snapshot_storage = OSSStorage(base_path='snapshots')
+
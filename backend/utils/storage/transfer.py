@@ -0,0 +1,173 @@
+"""
+流式转存：将HTTP响应体直接写入OSS
+边下载边上传，内存占用只与分片大小有关，与文件大小无关：
+- 小文件（不超过一个分片）一次put_object
+- 大文件使用分片上传（multipart upload），失败时取消分片上传
+- 传输过程中计算SHA-256，并校验大小上限
+"""
+import hashlib
+import logging
+from dataclasses import dataclass
+import oss2
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# OSS分片上传要求除最后一片外每片至少100KB
+MIN_PART_SIZE = 100 * 1024
+
+
+class TransferError(Exception):
+    """转存失败（网络或OSS异常，可以重试）"""
+    retryable = True
+
+
+class TransferTooLarge(TransferError):
+    """文件超过大小上限（重试不会成功）"""
+    retryable = False
+
+
+@dataclass
+class TransferResult:
+    """转存结果"""
+    name: str
+    size: int
+    sha256: str
+    etag: str
+    content_type: str
+    multipart: bool
+
+    def as_metadata(self) -> dict:
+        """写入内容元数据的字段"""
+        return {
+            'file_size': self.size,
+            'sha256': self.sha256,
+        }
+
+
+def transfer_url_to_storage(url: str, storage, name: str, session=None, content_type: str = None,
+                            max_size: int = None, chunk_size: int = None, part_size: int = None,
+                            timeout=(10, 60)) -> TransferResult:
+    """
+    流式下载URL并写入OSS存储
+
+    Args:
+        url: 源文件URL
+        storage: OSSStorage实例
+        name: 相对于storage.base_path的对象名
+        session: requests.Session（可选，复用连接池）
+        content_type: 对象Content-Type，默认使用响应头
+        max_size: 大小上限（字节），默认 AIGC_TRANSFER_MAX_SIZE
+        chunk_size: 读取响应的分块大小，默认 AIGC_TRANSFER_CHUNK_SIZE
+        part_size: 分片大小（也是单次上传的阈值），默认 AIGC_TRANSFER_PART_SIZE
+        timeout: requests超时（连接, 读取）
+
+    Returns:
+        TransferResult
+
+    Raises:
+        TransferTooLarge: 超过大小上限
+        TransferError: 下载或上传失败
+    """
+    max_size = max_size or settings.AIGC_TRANSFER_MAX_SIZE
+    chunk_size = chunk_size or settings.AIGC_TRANSFER_CHUNK_SIZE
+    part_size = max(part_size or settings.AIGC_TRANSFER_PART_SIZE, MIN_PART_SIZE)
+
+    http = session or requests
+    try:
+        response = http.get(url, stream=True, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        raise TransferError(f'下载失败: {str(e)}') from e
+
+    try:
+        content_length = response.headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > max_size:
+            raise TransferTooLarge(f'文件大小 {content_length} 字节超过上限 {max_size} 字节')
+
+        content_type = content_type or response.headers.get('Content-Type') or 'application/octet-stream'
+        return _StreamUploader(storage, name, content_type, max_size, part_size).upload(
+            response.iter_content(chunk_size=chunk_size)
+        )
+    except requests.RequestException as e:
+        raise TransferError(f'下载失败: {str(e)}') from e
+    finally:
+        response.close()
+
+
+class _StreamUploader:
+    """按分片缓冲数据并上传到OSS"""
+
+    def __init__(self, storage, name, content_type, max_size, part_size):
+        self.storage = storage
+        self.name = name
+        self.key = storage._get_full_path(name)
+        self.headers = {'Content-Type': content_type}
+        self.content_type = content_type
+        self.max_size = max_size
+        self.part_size = part_size
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.upload_id = None
+        self.parts = []
+
+    def upload(self, chunks) -> TransferResult:
+        bucket = self.storage.bucket
+        buffer = bytearray()
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                self.size += len(chunk)
+                if self.size > self.max_size:
+                    raise TransferTooLarge(f'文件大小超过上限 {self.max_size} 字节')
+                self.digest.update(chunk)
+                buffer.extend(chunk)
+                if len(buffer) >= self.part_size:
+                    self._upload_part(bucket, bytes(buffer[:self.part_size]))
+                    del buffer[:self.part_size]
+
+            if self.upload_id is None:
+                # 不超过一个分片，直接上传
+                result = bucket.put_object(self.key, bytes(buffer), headers=self.headers)
+                etag = result.etag
+            else:
+                if buffer:
+                    self._upload_part(bucket, bytes(buffer))
+                result = bucket.complete_multipart_upload(self.key, self.upload_id, self.parts)
+                etag = result.etag
+        except (TransferError, requests.RequestException):
+            self._abort(bucket)
+            raise
+        except Exception as e:
+            self._abort(bucket)
+            raise TransferError(f'上传OSS失败: {str(e)}') from e
+
+        logger.info(
+            f'转存完成: {self.key}, 大小: {self.size} 字节, '
+            f'分片: {len(self.parts) or 1}, SHA-256: {self.digest.hexdigest()[:16]}'
+        )
+        return TransferResult(
+            name=self.name,
+            size=self.size,
+            sha256=self.digest.hexdigest(),
+            etag=etag,
+            content_type=self.content_type,
+            multipart=self.upload_id is not None,
+        )
+
+    def _upload_part(self, bucket, data):
+        if self.upload_id is None:
+            self.upload_id = bucket.init_multipart_upload(self.key, headers=self.headers).upload_id
+        part_number = len(self.parts) + 1
+        result = bucket.upload_part(self.key, self.upload_id, part_number, data)
+        self.parts.append(oss2.models.PartInfo(part_number, result.etag, size=len(data)))
+
+    def _abort(self, bucket):
+        if self.upload_id is None:
+            return
+        try:
+            bucket.abort_multipart_upload(self.key, self.upload_id)
+        except Exception as e:
+            logger.warning(f'取消分片上传失败: {self.key}, upload_id: {self.upload_id}, 错误: {str(e)}')
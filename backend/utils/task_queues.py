@@ -0,0 +1,54 @@
+"""
+Celery队列划分
+@AI回复、文字生成、图片生成、视频生成分别进入独立队列，由各自的worker消费，
+互不占用预取槽位：耗时数分钟的视频任务不会阻塞秒级的@AI回复。
+各队列任务的软/硬超时见 settings.TASK_QUEUE_TIME_LIMITS，
+并发数和预取数量在启动worker时指定（见 docker-compose.yml 中的worker配置）。
+
+优先级通道：AIGC生成任务带Celery消息优先级（Redis中数值越小越先取出），
+批量任务（活动、回填、自动刷新）另外进入 <队列>_bulk 批量队列。
+各类型worker同时监听主队列和批量队列，按优先级先取交互任务、最后取批量任务；
+celery-bulk worker只监听批量队列，保证交互任务很多时批量任务也有最低处理能力，不会饿死。
+"""
+from django.conf import settings
+
+QUEUE_AI_REPLY = 'ai_reply'
+QUEUE_TEXT = 'text'
+QUEUE_IMAGE = 'image'
+QUEUE_VIDEO = 'video'
+
+BULK_QUEUE_SUFFIX = '_bulk'
+
+# AIGC任务类型 -> 队列
+AIGC_TASK_TYPE_QUEUES = {
+    'comment_summary': QUEUE_TEXT,
+    'lyric_image': QUEUE_IMAGE,
+    'lyric_video': QUEUE_VIDEO,
+    'text_to_video': QUEUE_VIDEO,
+}
+
+
+def queue_for_task_type(task_type: str, bulk: bool = False) -> str:
+    """AIGC任务类型对应的队列（未知类型进入文字队列，批量任务进入对应的批量队列）"""
+    queue = AIGC_TASK_TYPE_QUEUES.get(task_type, QUEUE_TEXT)
+    return f'{queue}{BULK_QUEUE_SUFFIX}' if bulk else queue
+
+
+def queue_options(queue: str, priority: int = None) -> dict:
+    """
+    投递到指定队列时的apply_async参数（队列及该队列的软/硬超时，批量队列与主队列相同）
+
+    Args:
+        queue: 队列名称
+        priority: Celery消息优先级（0最高），为None时使用默认优先级
+
+    Returns:
+        dict: {'queue', 'soft_time_limit', 'time_limit', 'priority'}
+    """
+    options = {'queue': queue}
+    limits = settings.TASK_QUEUE_TIME_LIMITS.get(queue.removesuffix(BULK_QUEUE_SUFFIX))
+    if limits:
+        options['soft_time_limit'], options['time_limit'] = limits
+    if priority is not None:
+        options['priority'] = priority
+    return options